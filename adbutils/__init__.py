@@ -1,5 +1,6 @@
 from adbutils.adb import ADBClient, ADBDevice
+from adbutils.aio import AsyncADBClient, AsyncADBDevice
+from adbutils._tracker import DeviceTracker
 
 
-__all__ = ['ADBDevice', 'ADBClient']
-
+__all__ = ['ADBDevice', 'ADBClient', 'AsyncADBClient', 'AsyncADBDevice', 'DeviceTracker']
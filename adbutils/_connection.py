@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+import re
+import socket
+import struct
+from typing import Optional, Tuple, Final
+
+from adbutils._utils import SafeSocket
+from adbutils.exceptions import AdbError, AdbDeviceConnectError
+
+
+class AdbConnection(object):
+    """
+    与adb server之间的smart-socket连接
+
+    协议说明 https://android.googlesource.com/platform/packages/modules/adb/+/refs/heads/master/SERVICES.TXT
+    """
+    OKAY: Final[bytes] = b'OKAY'
+    FAIL: Final[bytes] = b'FAIL'
+
+    # shell protocol v2 数据包id
+    SHELL_ID_STDIN: Final[int] = 0
+    SHELL_ID_STDOUT: Final[int] = 1
+    SHELL_ID_STDERR: Final[int] = 2
+    SHELL_ID_EXIT: Final[int] = 3
+    SHELL_ID_CLOSE_STDIN: Final[int] = 4
+
+    def __init__(self, host: str, port: int, timeout: Optional[float] = None):
+        """
+        Args:
+            host: adb server地址
+            port: adb server端口
+            timeout: socket超时时间
+        """
+        sock = socket.create_connection((host, port), timeout=timeout)
+        # 请求/应答都是小数据包,关闭Nagle算法降低延迟
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock = SafeSocket(sock)
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def send(self, request: str) -> None:
+        """
+        发送一条请求, 格式为<4位16进制长度><请求内容>
+
+        Args:
+            request: 请求内容,例如'host:devices'
+
+        Returns:
+            None
+        """
+        data = request.encode('utf-8')
+        self.sock.send(b'%04x' % len(data) + data)
+
+    def check_okay(self) -> None:
+        """
+        读取adb server的应答
+
+        Raises:
+            AdbDeviceConnectError: 设备连接异常
+            AdbError: adb server返回FAIL
+        Returns:
+            None
+        """
+        status = self.sock.recv(4)
+        if status == self.OKAY:
+            return
+        if status == self.FAIL:
+            self.raise_fail(self.read_string())
+        raise AdbError(stdout=None, stderr=None, message=f'unexpected response from adb server: {status!r}')
+
+    def request(self, request: str) -> None:
+        """
+        发送请求并检查应答
+
+        Args:
+            request: 请求内容
+
+        Returns:
+            None
+        """
+        self.send(request)
+        self.check_okay()
+
+    def read_string(self) -> str:
+        """
+        读取一段以4位16进制长度开头的字符串
+
+        Returns:
+            字符串
+        """
+        length = int(self.sock.recv(4), 16)
+        return self.sock.recv(length).decode('utf-8', errors='replace')
+
+    def read_until_close(self) -> bytes:
+        """
+        读取全部数据,直到adb server关闭连接
+
+        Returns:
+            读取到的数据
+        """
+        return self.sock.recv_all()
+
+    def read_shell_packet(self) -> Tuple[int, bytes]:
+        """
+        读取一个shell protocol v2数据包, 格式为<1字节id><4字节小端长度><数据>
+
+        Returns:
+            (id, 数据)
+        """
+        packet_id, length = struct.unpack('<BI', self.sock.recv(5))
+        return packet_id, self.sock.recv(length) if length else b''
+
+    def send_shell_packet(self, packet_id: int, data: bytes = b'') -> None:
+        """
+        发送一个shell protocol v2数据包
+
+        Args:
+            packet_id: 数据包id
+            data: 数据
+
+        Returns:
+            None
+        """
+        self.sock.send(struct.pack('<BI', packet_id, len(data)) + data)
+
+    def read_shell_v2(self) -> Tuple[bytes, bytes, Optional[int]]:
+        """
+        读取shell protocol v2的全部输出,直到收到退出码
+
+        Returns:
+            (stdout, stderr, 退出码)
+        """
+        stdout, stderr = [], []
+        returncode = None
+        while True:
+            try:
+                packet_id, data = self.read_shell_packet()
+            except socket.error:
+                break
+            if packet_id == self.SHELL_ID_STDOUT:
+                stdout.append(data)
+            elif packet_id == self.SHELL_ID_STDERR:
+                stderr.append(data)
+            elif packet_id == self.SHELL_ID_EXIT:
+                returncode = data[0] if data else 0
+                break
+        return b''.join(stdout), b''.join(stderr), returncode
+
+    @staticmethod
+    def raise_fail(message: str) -> None:
+        """
+        根据adb server返回的FAIL信息,弹出对应的异常
+
+        Raises:
+            AdbDeviceConnectError: 设备连接异常
+            AdbError: 其他异常
+        """
+        if re.search(AdbDeviceConnectError.SERVER_FAIL, message):
+            raise AdbDeviceConnectError(message)
+        raise AdbError(stdout=None, stderr=message, message=message)
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self.sock.close()
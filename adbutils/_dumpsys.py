@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from typing import Optional, Dict, Tuple, Callable, List, Final
+
+
+class _Flight(object):
+    """ 一次正在进行的dumpsys调用,同一个key的并发请求共享它的结果 """
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+
+class DumpsysCache(object):
+    """
+    dumpsys结果缓存
+
+    每个服务可以设置不同的缓存时间; 同一条dumpsys命令的并发请求只会运行一次,其他线程等待并共享结果
+    """
+    DEFAULT_TTL: Final[float] = 1.0
+    # 服务名-缓存时间(秒), 0表示不缓存,只合并并发请求
+    SERVICE_TTL: Final[Dict[str, float]] = {
+        'SurfaceFlinger': 1.0,
+        'activity': 0.5,
+        'window': 0.5,
+        'input': 1.0,
+        'input_method': 0.5,
+        'display': 5.0,
+        'meminfo': 1.0,
+    }
+    # 点击/滑动/输入文字后内容可能变化的服务
+    INPUT_SERVICES: Final[Tuple[str, ...]] = ('activity', 'window', 'input_method', 'SurfaceFlinger')
+
+    def __init__(self, shell: Callable[[List[str]], str]):
+        """
+        Args:
+            shell: 运行shell命令并返回stdout的函数
+        """
+        self.shell = shell
+        self.ttl: Dict[str, float] = dict(self.SERVICE_TTL)
+        self._cache: Dict[Tuple[str, ...], Tuple[float, str]] = {}
+        self._flights: Dict[Tuple[str, ...], _Flight] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, service: str, *args: str, ttl: Optional[float] = None) -> str:
+        """
+        command 'adb shell dumpsys <service> <args>', 缓存未过期时直接返回缓存
+
+        Args:
+            service: 服务名
+            *args: 参数
+            ttl: 缓存时间,默认使用服务对应的缓存时间
+
+        Returns:
+            dumpsys输出
+        """
+        key = (service,) + args
+        ttl = self.ttl.get(service, self.DEFAULT_TTL) if ttl is None else ttl
+        with self._lock:
+            if (cache := self._cache.get(key)) and time.time() - cache[0] <= ttl:
+                return cache[1]
+            if leader := key not in self._flights:
+                self._flights[key] = _Flight()
+            flight = self._flights[key]
+            generation = self._generation
+
+        if not leader:
+            flight.event.wait()
+            if flight.error:
+                raise flight.error
+            return flight.result
+
+        start_time = time.time()
+        try:
+            flight.result = self.shell(['dumpsys', *key])
+        except BaseException as err:
+            flight.error = err
+            raise
+        else:
+            with self._lock:
+                # 运行期间缓存被清除时,结果可能是旧的,不写入缓存
+                if generation == self._generation:
+                    self._cache[key] = (start_time, flight.result)
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.event.set()
+        return flight.result
+
+    def invalidate(self, service: Optional[str] = None) -> None:
+        """
+        清除缓存
+
+        Args:
+            service: 需要清除的服务名,为None时清除全部
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._generation += 1
+            if service is None:
+                self._cache.clear()
+            else:
+                for key in [key for key in self._cache if key[0] == service]:
+                    del self._cache[key]
@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+import threading
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Optional, Union, List, Tuple, Deque, TYPE_CHECKING, Final
+
+from loguru import logger
+
+from adbutils.constant import ADB_DEFAULT_KEYBOARD
+from adbutils.exceptions import AdbShellError, AdbTimeout
+
+if TYPE_CHECKING:
+    from adbutils.adb import ADBDevice
+
+
+class _Action(object):
+    """ 队列中的一个输入操作, keycodes不为None时表示可以与相邻操作合并的keyevent """
+    def __init__(self, cmds: List[str], keycodes: Optional[List[str]] = None):
+        self.cmds = cmds
+        self.keycodes = keycodes
+        self.future: Future = Future()
+
+
+class InputQueue(object):
+    """
+    输入命令队列
+
+    tap/swipe/keyevent/text会按提交顺序放入队列,由后台线程取出后通过device.batch在一次shell中运行,
+    相邻的keyevent会合并成一条'input keyevent k1 k2 ...'。
+    每个操作返回Future,可以不等待结果继续提交;需要确认执行完成时调用flush()或者Future.result()
+    """
+    MAX_BATCH: Final[int] = 64  # 一次shell中最多运行的命令数量
+    MULTI_KEYEVENT_SDK: Final[int] = 23  # input keyevent支持多个keycode的最低sdk版本
+    CLEAR_KEYEVENTS: Final[int] = 255  # 没有使用AdbKeyboard时, #CLEAR#发送KEYCODE_CLEAR的次数
+    RESULT_TIMEOUT: Final[float] = 120  # 同步调用等待操作完成的默认超时时间(秒), 包含排队时间
+
+    def __init__(self, device: 'ADBDevice'):
+        """
+        Args:
+            device: 设备类
+        """
+        self.device = device
+        self._queue: Deque[_Action] = deque()
+        self._cond = threading.Condition()
+        self._busy = False
+        self._kill_event = threading.Event()
+        self._t: Optional[threading.Thread] = None
+
+    def __str__(self):
+        return f"<InputQueue ({self.running and 'Start' or 'Close'})> device:{self.device.device_id}" \
+               f"\tpending:{len(self._queue)}"
+
+    @property
+    def running(self) -> bool:
+        return self._t is not None and self._t.is_alive()
+
+    def tap(self, point) -> Future:
+        """
+        点击屏幕
+
+        Args:
+            point: 坐标(x,y)
+
+        Returns:
+            Future
+        """
+        x, y = self.device._get_xy(point)
+        return self._submit(_Action([f'input tap {x} {y}']))
+
+    def swipe(self, start_point, end_point, duration: int = 500) -> Future:
+        """
+        滑动屏幕
+
+        Args:
+            start_point: 起点坐标
+            end_point: 终点坐标
+            duration: 滑动时长(毫秒)
+
+        Returns:
+            Future
+        """
+        return self._submit(_Action([self.device._swipe_cmd(start_point, end_point, duration)]))
+
+    def keyevent(self, *keycodes: Union[str, int]) -> Future:
+        """
+        按键, 可以一次传入多个keycode
+
+        Args:
+            *keycodes: key code number or name
+
+        Returns:
+            Future
+        """
+        keycodes = [str(keycode) for keycode in keycodes]
+        return self._submit(_Action([f'input keyevent {keycode}' for keycode in keycodes], keycodes=keycodes))
+
+    def text(self, text: str, enter: Optional[bool] = False) -> Future:
+        """
+        输入文字, 支持预置命令#CLEAR#
+
+        Args:
+            text: 需要输入的字符
+            enter: press 'Enter' key
+
+        Returns:
+            Future
+        """
+        if text == '#CLEAR#' and self.device.default_ime != ADB_DEFAULT_KEYBOARD:
+            logger.warning('建议使用AdbKeyboard')
+            futures = [self.keyevent(*['KEYCODE_CLEAR'] * self.CLEAR_KEYEVENTS)]
+        else:
+            futures = [self._submit(_Action([self.device._text_cmd(text)]))]
+        if enter:
+            futures.append(self.keyevent('ENTER'))
+        return self._gather(futures)
+
+    def wait(self, future: Future, timeout: Optional[float] = RESULT_TIMEOUT) -> None:
+        """
+        等待操作完成, 用于同步调用
+
+        Args:
+            future: tap/swipe/keyevent/text返回的Future
+            timeout: 等待超时时间
+
+        Raises:
+            AdbTimeout: 等待超时
+            AdbBaseError: 操作运行失败
+        Returns:
+            None
+        """
+        try:
+            future.result(timeout=timeout)
+        except FutureTimeoutError:
+            raise AdbTimeout(f'{self} wait input action timeout ({timeout}s)')
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待队列中的操作全部执行完成
+
+        Args:
+            timeout: 等待超时时间
+
+        Returns:
+            是否在超时前全部完成
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._queue and not self._busy, timeout)
+
+    def start(self) -> None:
+        """
+        启动后台线程, 提交操作时会自动启动
+
+        Returns:
+            None
+        """
+        with self._cond:
+            if self.running:
+                return
+            self._kill_event.clear()
+            self._t = threading.Thread(target=self._run, name=f'input_queue_{self.device.device_id}', daemon=True)
+            self._t.start()
+
+    def stop(self) -> None:
+        """
+        执行完队列中剩余的操作后停止后台线程
+
+        Returns:
+            None
+        """
+        self._kill_event.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._t and self._t is not threading.current_thread():
+            self._t.join()
+        self._t = None
+
+    def _submit(self, action: _Action) -> Future:
+        with self._cond:
+            self._queue.append(action)
+            self._cond.notify_all()
+        if not self.running:
+            self.start()
+        return action.future
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or self._kill_event.is_set())
+                if not self._queue:
+                    return
+                actions = []
+                while self._queue and len(actions) < self.MAX_BATCH:
+                    actions.append(self._queue.popleft())
+                self._busy = True
+
+            try:
+                self._execute(actions)
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    @staticmethod
+    def _gather(futures: List[Future]) -> Future:
+        """ 返回一个在全部futures完成后完成的Future, 有一个失败时设置为第一个失败的异常 """
+        if len(futures) == 1:
+            return futures[0]
+
+        gathered = Future()
+
+        def done(_):
+            if all(future.done() for future in futures) and not gathered.done():
+                if error := next((future.exception() for future in futures if future.exception()), None):
+                    gathered.set_exception(error)
+                else:
+                    gathered.set_result(None)
+
+        for future in futures:
+            future.add_done_callback(done)
+        return gathered
+
+    def _execute(self, actions: List[_Action]) -> None:
+        try:
+            self._run_batch(actions)
+        except Exception as err:
+            # 任何异常都不能让后台线程退出, 否则取出的操作永远不会完成
+            logger.error(f'{self} run {len(actions)} actions error: {err!r}')
+            for action in actions:
+                if not action.future.done():
+                    action.future.set_exception(err)
+
+    def _run_batch(self, actions: List[_Action]) -> None:
+        cmds, owners = self._merge(actions)
+        # batch会丢弃stderr, input命令的stdout没有用处,把stderr输出到stdout用于报错
+        try:
+            results = self.device.batch([f'{{ {cmd}; }} 2>&1 >/dev/null' for cmd in cmds], skip_error=True)
+        finally:
+            # 出错时命令也可能已经运行了一部分
+            if any(action.keycodes is not None for action in actions):
+                # keyevent可能改变任意状态(音量/电源等), 其他操作只清除界面相关的服务
+                self.device.invalidate_dumpsys()
+            else:
+                self.device.invalidate_input_dumpsys()
+
+        # 一个操作可能对应多条命令, 只要有一条失败就认为操作失败
+        errors = {}
+        for (stderr, returncode), cmd_owners in zip(results, owners):
+            if returncode:
+                for action in cmd_owners:
+                    errors.setdefault(id(action), AdbShellError('', stderr, message=f'exit code {returncode}'))
+
+        retry = []
+        if (index := len(results)) < len(cmds):
+            # 第index条命令没有输出结束标记,shell被中断; 它之后的操作一定没有运行,可以重新运行
+            for action in owners[index]:
+                errors.setdefault(id(action), AdbShellError('', '', message=f'{cmds[index]!r} interrupted the batch'))
+            finished = {id(action) for cmd_owners in owners[:index + 1] for action in cmd_owners}
+            retry = [action for action in actions if id(action) not in finished]
+
+        retry_ids = {id(action) for action in retry}
+        for action in actions:
+            if id(action) in retry_ids:
+                continue
+            if error := errors.get(id(action)):
+                action.future.set_exception(error)
+            else:
+                action.future.set_result(None)
+        if retry:
+            self._execute(retry)
+
+    def _merge(self, actions: List[_Action]) -> Tuple[List[str], List[List[_Action]]]:
+        """ 合并相邻的keyevent, 返回命令列表和每条命令所属的操作 """
+        multi_keyevent = self.device.sdk_version >= self.MULTI_KEYEVENT_SDK
+        cmds: List[str] = []
+        owners: List[List[_Action]] = []
+        keycodes: List[str] = []
+        keyevent_owners: List[_Action] = []
+
+        for action in actions:
+            if multi_keyevent and action.keycodes is not None:
+                keycodes.extend(action.keycodes)
+                keyevent_owners.append(action)
+                continue
+            if keycodes:
+                cmds.append(f"input keyevent {' '.join(keycodes)}")
+                owners.append(keyevent_owners)
+                keycodes, keyevent_owners = [], []
+            cmds.extend(action.cmds)
+            owners.extend([[action]] * len(action.cmds))
+
+        if keycodes:
+            cmds.append(f"input keyevent {' '.join(keycodes)}")
+            owners.append(keyevent_owners)
+        return cmds, owners
+
+
+__all__ = ['InputQueue']
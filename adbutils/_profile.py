@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+import copy
+import json
+import os
+import re
+import threading
+from typing import Optional, Dict, Any, Callable
+
+from loguru import logger
+
+from adbutils.constant import ADB_PROFILE_PATH
+
+
+class DeviceProfile(object):
+    """
+    设备静态信息的本地缓存
+
+    以设备名+ro.build.fingerprint作为键保存为json文件,刷机/系统升级后fingerprint改变,缓存自动失效
+    """
+    def __init__(self, serial: str, fingerprint: Optional[str], path: Optional[str] = None):
+        """
+        Args:
+            serial: 设备名
+            fingerprint: 设备的ro.build.fingerprint,为空时只在内存中缓存
+            path: 缓存目录,默认为ADB_PROFILE_PATH
+        """
+        self.serial = serial
+        self.fingerprint = fingerprint
+        self.path = os.path.join(path or ADB_PROFILE_PATH, re.sub(r'[^\w.-]', '_', serial) + '.json')
+        self._lock = threading.Lock()
+        self._data: Dict[str, Any] = self._load()
+
+    def __str__(self):
+        return f"<DeviceProfile {self.serial}> {self.path}"
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        读取缓存的值, 返回的是副本,修改不会影响缓存
+
+        Args:
+            key: 键名
+            default: 不存在时返回的默认值
+
+        Returns:
+            缓存的值
+        """
+        with self._lock:
+            if key not in self._data:
+                return default
+            return copy.deepcopy(self._data[key])
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        写入缓存,并保存到文件
+
+        Args:
+            key: 键名
+            value: 可以被json序列化的值
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._data[key] = copy.deepcopy(value)
+            self._save()
+
+    def get_or_set(self, key: str, func: Callable[[], Any]) -> Any:
+        """
+        读取缓存的值,不存在时通过func获取并写入缓存; func返回None时不会写入
+        返回的是副本,修改不会影响缓存
+
+        Args:
+            key: 键名
+            func: 获取值的函数
+
+        Returns:
+            缓存的值
+        """
+        if (value := self.get(key)) is None:
+            if (value := func()) is not None:
+                self.set(key, value)
+        return value
+
+    def clear(self) -> None:
+        """
+        清除缓存,并删除文件
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._data.clear()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def _load(self) -> Dict[str, Any]:
+        if not self.fingerprint or not os.path.isfile(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                profile = json.load(f)
+        except (OSError, ValueError) as err:
+            logger.warning(f'{self} load error: {err!r}')
+            return {}
+
+        if profile.get('fingerprint') != self.fingerprint:
+            logger.debug(f'{self} fingerprint changed, drop cache')
+            return {}
+        return profile.get('data', {})
+
+    def _save(self) -> None:
+        if not self.fingerprint:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f'{self.path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'serial': self.serial, 'fingerprint': self.fingerprint, 'data': self._data}, f)
+            # 先写入临时文件再替换,避免多个进程同时写入时读到不完整的文件
+            os.replace(tmp_path, self.path)
+        except OSError as err:
+            logger.warning(f'{self} save error: {err!r}')
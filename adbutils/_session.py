@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+import re
+import shlex
+import socket
+import threading
+import time
+from typing import Optional, Union, Tuple, List, TYPE_CHECKING, Final
+
+from loguru import logger
+
+from adbutils._connection import AdbConnection
+from adbutils._utils import split_cmd
+from adbutils.exceptions import AdbBaseError, AdbTimeout
+
+if TYPE_CHECKING:
+    from adbutils.adb import ADBClient
+
+
+class ShellSession(object):
+    """
+    长连接shell会话,多条命令依次复用同一个shell通道
+
+    每条命令在子shell中运行,运行结束后通过printf输出标记行与退出码,用于切分stdout/stderr。
+    设备支持shell protocol v2时,stdout与stderr分开读取;否则stderr会合并到stdout中。
+    """
+    # 标记分成两段输出,避免设备回显的命令本身被误认为标记
+    MARK_HEAD: Final[str] = '__ADBUTILS_'
+    MARK_TAIL: Final[str] = 'SESSION_END__'
+    DEFAULT_TIMEOUT: Final[float] = 60  # 单条命令的默认超时时间(秒)
+    # 命令分段写入时每行的最大字符数; pty的一行最多4095字节,超出的部分会被丢弃
+    LINE_CHUNK: Final[int] = 512
+
+    def __init__(self, client: 'ADBClient', timeout: Optional[float] = DEFAULT_TIMEOUT):
+        """
+        Args:
+            client: adb客户端,需要指定device_id
+            timeout: 单条命令的默认超时时间,从发送命令到读取到结束标记的总时间
+        """
+        self.client = client
+        self.timeout = timeout
+        self.shell_v2 = False
+        self._conn: Optional[AdbConnection] = None
+        self._index = 0
+        self._lock = threading.Lock()
+
+    def __str__(self):
+        return f"<ShellSession ({self._conn and 'Open' or 'Close'})> device:{self.client.device_id}" \
+               f"\tshell_v2:{self.shell_v2}"
+
+    @property
+    def connected(self) -> bool:
+        return self._conn is not None
+
+    def connect(self) -> None:
+        """
+        打开shell通道
+
+        Returns:
+            None
+        """
+        self.shell_v2 = 'shell_v2' in self.client.features
+        if self.shell_v2:
+            self._conn = self.client.transport_connection('shell,v2,raw:')
+        else:
+            # 旧版本adbd会分配pty,需要关闭回显和提示符
+            self._conn = self.client.transport_connection('shell:')
+            self._write(b"stty -echo 2>/dev/null; PS1=''; PS2=''\n")
+            self._run_command('true', timeout=10)
+        logger.debug(f'{self} connect')
+
+    def close(self) -> None:
+        """
+        关闭shell通道
+
+        Returns:
+            None
+        """
+        if self._conn:
+            try:
+                if self.shell_v2:
+                    self._conn.send_shell_packet(AdbConnection.SHELL_ID_CLOSE_STDIN)
+            except socket.error:
+                pass
+            self._conn.close()
+            self._conn = None
+
+    def execute(self, cmds: Union[list, str], timeout: Optional[float] = None) -> Tuple[bytes, bytes, int]:
+        """
+        在会话中运行一条命令,设备断开后会自动重连一次
+
+        Args:
+            cmds: 需要运行的参数
+            timeout: 超时时间,默认使用初始化时的timeout
+
+        Raises:
+            AdbTimeout: 命令超时,超时后会关闭当前会话
+        Returns:
+            (stdout, stderr, 退出码)
+        """
+        cmds = ' '.join(split_cmd(cmds))
+        timeout = timeout if timeout is not None else self.timeout
+        with self._lock:
+            for tries_remaining in (1, 0):
+                if not self._conn:
+                    self.connect()
+                try:
+                    return self._run_command(cmds, timeout=timeout)
+                except socket.timeout:
+                    self.close()
+                    raise AdbTimeout(f"shell session command '{cmds}' time out")
+                except (socket.error, AdbBaseError) as err:
+                    self.close()
+                    if tries_remaining == 0:
+                        raise
+                    logger.warning(f'shell session broken, reconnect. {err}')
+
+    def _write(self, data: bytes) -> None:
+        if self.shell_v2:
+            self._conn.send_shell_packet(AdbConnection.SHELL_ID_STDIN, data)
+        else:
+            self._conn.sock.send(data)
+
+    def _run_command(self, cmds: str, timeout: Optional[float] = None) -> Tuple[bytes, bytes, int]:
+        self._index += 1
+        mark = f'{self.MARK_HEAD}{self.MARK_TAIL}{self._index}'.encode('ascii')
+        head, tail = self.MARK_HEAD, f'{self.MARK_TAIL}{self._index}'
+        # 命令经过引号转义后分段保存到变量中,再交给sh -c运行:
+        # 命令中的引号不配对时只会让sh -c报语法错误并返回退出码,不会让会话一直等待后续输入;
+        # 每一行的长度也不会超过pty的行缓冲区
+        chunks = [shlex.quote(cmds[i:i + self.LINE_CHUNK]) for i in range(0, len(cmds), self.LINE_CHUNK)] or ["''"]
+        command = f"__adbutils_cmd={chunks[0]}\n" + \
+                  ''.join(f'__adbutils_cmd="$__adbutils_cmd"{chunk}\n' for chunk in chunks[1:])
+        if self.shell_v2:
+            command += f"sh -c \"$__adbutils_cmd\" </dev/null; printf '\\n%s%s %d\\n' '{head}' '{tail}' $?; " \
+                       f"printf '\\n%s%s\\n' '{head}' '{tail}' >&2\n"
+        else:
+            command += f"sh -c \"$__adbutils_cmd\" </dev/null 2>&1; printf '\\n%s%s %d\\n' '{head}' '{tail}' $?\n"
+
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        self._conn.sock.sock.settimeout(timeout)
+        try:
+            self._write(command.encode('utf-8'))
+            return self._read_result(mark, deadline)
+        finally:
+            if self._conn:
+                self._conn.sock.sock.settimeout(None)
+
+    def _read_result(self, mark: bytes, deadline: Optional[float] = None) -> Tuple[bytes, bytes, int]:
+        stdout_pattern = re.compile(b'\n' + re.escape(mark) + rb' (\d+)\r?\n')
+        stderr_mark = b'\n' + mark
+        stdout, stderr = bytearray(), bytearray()
+        stdout_match: Optional[re.Match] = None
+        stderr_end = -1 if self.shell_v2 else 0
+
+        while stdout_match is None or stderr_end < 0:
+            if deadline is not None:
+                # 命令一直有输出时socket不会超时,需要按总时间限制
+                if (remaining := deadline - time.monotonic()) <= 0:
+                    raise socket.timeout('shell session command time out')
+                self._conn.sock.sock.settimeout(remaining)
+            if self.shell_v2:
+                packet_id, data = self._conn.read_shell_packet()
+                if packet_id == AdbConnection.SHELL_ID_STDOUT:
+                    start = max(0, len(stdout) - len(mark) - 16)
+                    stdout += data
+                    stdout_match = stdout_pattern.search(stdout, start)
+                elif packet_id == AdbConnection.SHELL_ID_STDERR:
+                    start = max(0, len(stderr) - len(stderr_mark))
+                    stderr += data
+                    stderr_end = stderr.find(stderr_mark, start)
+                elif packet_id == AdbConnection.SHELL_ID_EXIT:
+                    raise socket.error('shell session exited')
+            else:
+                data = self._conn.sock.sock.recv(65536)
+                if data == b'':
+                    raise socket.error('shell session closed')
+                start = max(0, len(stdout) - len(mark) - 16)
+                stdout += data
+                stdout_match = stdout_pattern.search(stdout, start)
+
+        returncode = int(stdout_match.group(1))
+        stdout = bytes(stdout[:stdout_match.start()])
+        stderr = bytes(stderr[:stderr_end]) if self.shell_v2 else b''
+        if not self.shell_v2:
+            # pty会把换行转换为\r\n, 需要原始二进制数据时使用exec:服务,参考ADBShell.raw_shell
+            stdout = stdout.replace(b'\r\n', b'\n')
+            if stdout.endswith(b'\r'):
+                stdout = stdout[:-1]
+        return stdout, stderr, returncode
+
+
+class ShellSessionPool(object):
+    """
+    设备的shell会话池, 空闲会话会被复用, 所有会话都在忙时新建会话, 直到达到max_sessions
+    """
+    def __init__(self, client: 'ADBClient', max_sessions: int = 4,
+                 timeout: Optional[float] = ShellSession.DEFAULT_TIMEOUT):
+        """
+        Args:
+            client: adb客户端,需要指定device_id
+            max_sessions: 最多同时打开的会话数量
+            timeout: 单条命令的默认超时时间, 超时后会话会被关闭,下次使用时重新连接
+        """
+        self.client = client
+        self.max_sessions = max_sessions
+        self.timeout = timeout
+        self._sessions: List[ShellSession] = []
+        self._idle: List[ShellSession] = []
+        self._cond = threading.Condition()
+
+    def execute(self, cmds: Union[list, str], timeout: Optional[float] = None) -> Tuple[bytes, bytes, int]:
+        """
+        取一个空闲会话运行命令
+
+        Args:
+            cmds: 需要运行的参数
+            timeout: 超时时间
+
+        Returns:
+            (stdout, stderr, 退出码)
+        """
+        session = self._acquire()
+        try:
+            return session.execute(cmds, timeout=timeout)
+        finally:
+            self._release(session)
+
+    def close(self) -> None:
+        """
+        关闭所有会话
+
+        Returns:
+            None
+        """
+        with self._cond:
+            # 正在使用的会话在归还时关闭
+            for session in self._idle:
+                session.close()
+            self._sessions.clear()
+            self._idle.clear()
+            self._cond.notify_all()
+
+    def _acquire(self) -> ShellSession:
+        with self._cond:
+            while not self._idle and len(self._sessions) >= self.max_sessions:
+                self._cond.wait()
+            if self._idle:
+                return self._idle.pop()
+            session = ShellSession(self.client, timeout=self.timeout)
+            self._sessions.append(session)
+            return session
+
+    def _release(self, session: ShellSession) -> None:
+        with self._cond:
+            if session in self._sessions:
+                self._idle.append(session)
+            else:
+                # 会话池已经被关闭
+                session.close()
+            self._cond.notify()
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import stat
+import struct
+import time
+from typing import Optional, Union, Tuple, List, Callable, Generator, IO, Final
+
+from adbutils._connection import AdbConnection
+from adbutils.exceptions import AdbError, AdbBaseError
+
+# (已传输字节数, 总字节数, 传输速度byte/s)
+SyncProgressCallback = Callable[[int, Optional[int], float], None]
+SyncSource = Union[str, bytes, bytearray, memoryview, IO]
+SyncTarget = Union[str, bytearray, memoryview, IO, None]
+
+
+class SyncConnection(object):
+    """
+    adb sync协议,在一个连接中完成push/pull/stat/list
+
+    协议说明 https://android.googlesource.com/platform/packages/modules/adb/+/refs/heads/master/SYNC.TXT
+    """
+    DATA_MAX_LENGTH: Final[int] = 64 * 1024
+    DEFAULT_MODE: Final[int] = 0o644
+
+    def __init__(self, conn: AdbConnection):
+        """
+        Args:
+            conn: 已经发送过'sync:'请求的连接
+        """
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def stat(self, remote: str) -> Tuple[int, int, int]:
+        """
+        获取设备上文件的信息
+
+        Args:
+            remote: 设备上的路径
+
+        Returns:
+            (mode, size, mtime), 文件不存在时mode为0
+        """
+        self._send_request(b'STAT', remote.encode('utf-8'))
+        sync_id, mode, size, mtime = struct.unpack('<4sIII', self.conn.sock.recv(16))
+        if sync_id != b'STAT':
+            raise AdbError(stdout=None, stderr=None, message=f'sync stat unexpected response {sync_id!r}')
+        return mode, size, mtime
+
+    def exists(self, remote: str) -> bool:
+        """
+        判断设备上文件是否存在
+
+        Args:
+            remote: 设备上的路径
+
+        Returns:
+            文件是否存在
+        """
+        return self.stat(remote)[0] != 0
+
+    def list(self, remote: str) -> List[Tuple[str, int, int, int]]:
+        """
+        列出设备上文件夹的内容
+
+        Args:
+            remote: 设备上的文件夹路径
+
+        Returns:
+            列表,每个参数都是tuple(name, mode, size, mtime)
+        """
+        ret = []
+        self._send_request(b'LIST', remote.encode('utf-8'))
+        while True:
+            sync_id, mode, size, mtime, name_length = struct.unpack('<4sIIII', self.conn.sock.recv(20))
+            if sync_id == b'DONE':
+                break
+            if sync_id != b'DENT':
+                raise AdbError(stdout=None, stderr=None, message=f'sync list unexpected response {sync_id!r}')
+            name = self.conn.sock.recv(name_length).decode('utf-8', errors='replace')
+            if name not in ('.', '..'):
+                ret.append((name, mode, size, mtime))
+        return ret
+
+    def push(self, src: SyncSource, remote: str, mode: Optional[int] = None,
+             callback: Optional[SyncProgressCallback] = None) -> int:
+        """
+        发送数据到设备上
+
+        Args:
+            src: 本地文件路径,或者bytes/bytearray/memoryview,或者任意可读的文件对象
+            remote: 设备上的路径
+            mode: 文件权限,默认使用本地文件权限,非文件时为0o644
+            callback: 进度回调函数 callback(已传输字节数, 总字节数, 传输速度byte/s)
+
+        Returns:
+            发送的字节数
+        """
+        return self._consume(self.iter_push(src, remote, mode), callback)
+
+    def pull(self, remote: str, dst: SyncTarget = None,
+             callback: Optional[SyncProgressCallback] = None) -> Union[int, bytes]:
+        """
+        从设备上读取文件
+
+        Args:
+            remote: 设备上的路径
+            dst: 本地文件路径/bytearray(追加写入)/memoryview(从头写入)/可写的文件对象;
+                 为None时直接返回bytes
+            callback: 进度回调函数 callback(已传输字节数, 总字节数, 传输速度byte/s)
+
+        Returns:
+            dst为None时返回文件内容,否则返回读取的字节数
+        """
+        if dst is None:
+            buf = bytearray()
+            self._consume(self.iter_pull(remote, buf), callback)
+            return bytes(buf)
+        return self._consume(self.iter_pull(remote, dst), callback)
+
+    def iter_push(self, src: SyncSource, remote: str, mode: Optional[int] = None) \
+            -> Generator[Tuple[int, Optional[int]], None, int]:
+        """
+        push的生成器版本,每发送一个DATA数据包返回一次(已传输字节数, 总字节数)
+
+        Args:
+            src: 本地文件路径,或者bytes/bytearray/memoryview,或者任意可读的文件对象
+            remote: 设备上的路径
+            mode: 文件权限
+
+        Raises:
+            AdbBaseError: 设备返回FAIL
+        Returns:
+            生成器
+        """
+        close_src = False
+        if isinstance(src, str):
+            if not os.path.isfile(src):
+                raise RuntimeError(f"file: {src} does not exists")
+            if mode is None:
+                mode = stat.S_IMODE(os.stat(src).st_mode)
+            src = open(src, 'rb')
+            close_src = True
+        elif isinstance(src, (bytes, bytearray, memoryview)):
+            src = io.BytesIO(src)
+        mode = self.DEFAULT_MODE if mode is None else mode
+
+        total = self._get_readable_size(src)
+        transferred = 0
+        try:
+            self._send_request(b'SEND', f'{remote},{mode}'.encode('utf-8'))
+            while True:
+                chunk = src.read(self.DATA_MAX_LENGTH)
+                if not chunk:
+                    break
+                self.conn.sock.send(struct.pack('<4sI', b'DATA', len(chunk)) + chunk)
+                transferred += len(chunk)
+                yield transferred, total
+        finally:
+            if close_src:
+                src.close()
+
+        self.conn.sock.send(struct.pack('<4sI', b'DONE', int(time.time())))
+        sync_id, length = struct.unpack('<4sI', self.conn.sock.recv(8))
+        if sync_id == b'FAIL':
+            raise AdbBaseError(f"sync push '{remote}' failed: {self._read_message(length)}")
+        if sync_id != b'OKAY':
+            raise AdbError(stdout=None, stderr=None, message=f'sync push unexpected response {sync_id!r}')
+        return transferred
+
+    def iter_pull(self, remote: str, dst: SyncTarget) -> Generator[Tuple[int, Optional[int]], None, int]:
+        """
+        pull的生成器版本,每收到一个DATA数据包返回一次(已传输字节数, 总字节数)
+
+        Args:
+            remote: 设备上的路径
+            dst: 本地文件路径/bytearray/memoryview/可写的文件对象
+
+        Raises:
+            AdbBaseError: 设备返回FAIL,或者memoryview空间不足
+        Returns:
+            生成器
+        """
+        total = self.stat(remote)[1] or None
+        close_dst = False
+        if isinstance(dst, str):
+            dst = open(dst, 'wb')
+            close_dst = True
+        elif isinstance(dst, memoryview):
+            dst = dst.cast('B')
+
+        transferred = 0
+        chunk = None
+        try:
+            self._send_request(b'RECV', remote.encode('utf-8'))
+            while True:
+                sync_id, length = struct.unpack('<4sI', self.conn.sock.recv(8))
+                if sync_id == b'DONE':
+                    break
+                if sync_id == b'FAIL':
+                    raise AdbBaseError(f"sync pull '{remote}' failed: {self._read_message(length)}")
+                if sync_id != b'DATA':
+                    raise AdbError(stdout=None, stderr=None, message=f'sync pull unexpected response {sync_id!r}')
+
+                # 数据直接读取到目标缓冲区中,不产生中间bytes
+                if isinstance(dst, bytearray):
+                    offset = len(dst)
+                    dst.extend(bytes(length))
+                    with memoryview(dst) as view:
+                        self.conn.sock.recv_into(view[offset:], length)
+                elif isinstance(dst, memoryview):
+                    if transferred + length > len(dst):
+                        raise AdbBaseError(f"sync pull '{remote}' memoryview too small ({len(dst)} bytes)")
+                    self.conn.sock.recv_into(dst[transferred:], length)
+                else:
+                    chunk = chunk or memoryview(bytearray(self.DATA_MAX_LENGTH))
+                    self.conn.sock.recv_into(chunk, length)
+                    dst.write(chunk[:length])
+                transferred += length
+                yield transferred, total
+        finally:
+            if close_dst:
+                dst.close()
+        return transferred
+
+    def close(self) -> None:
+        if not self.conn.closed:
+            try:
+                self.conn.sock.send(struct.pack('<4sI', b'QUIT', 0))
+            except OSError:
+                pass
+            self.conn.close()
+
+    def _send_request(self, sync_id: bytes, data: bytes) -> None:
+        self.conn.sock.send(struct.pack('<4sI', sync_id, len(data)) + data)
+
+    def _read_message(self, length: int) -> str:
+        return self.conn.sock.recv(length).decode('utf-8', errors='replace')
+
+    @staticmethod
+    def _get_readable_size(src: IO) -> Optional[int]:
+        try:
+            position = src.tell()
+            size = src.seek(0, os.SEEK_END)
+            src.seek(position)
+            return size - position
+        except (AttributeError, OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _consume(progress: Generator[Tuple[int, Optional[int]], None, int],
+                 callback: Optional[SyncProgressCallback] = None) -> int:
+        """
+        运行生成器直到结束,并把进度传给回调函数
+
+        Returns:
+            传输的字节数
+        """
+        start_time = time.time()
+        while True:
+            try:
+                transferred, total = next(progress)
+            except StopIteration as ret:
+                return ret.value
+            if callback:
+                elapsed = time.time() - start_time
+                callback(transferred, total, elapsed and transferred / elapsed or 0.0)
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+import threading
+import traceback
+from typing import Optional, Dict, Callable, List, Tuple, TYPE_CHECKING
+
+from loguru import logger
+
+from adbutils._connection import AdbConnection
+
+if TYPE_CHECKING:
+    from adbutils.adb import ADBClient
+
+# callback(device_id, 变化前的设备信息, 变化后的设备信息), 新增设备时变化前为None, 移除设备时变化后为None
+TrackerCallback = Callable[[str, Optional[Dict[str, str]], Optional[Dict[str, str]]], None]
+
+_TRACKERS: Dict[Tuple[str, int], 'DeviceTracker'] = {}
+_TRACKERS_LOCK = threading.Lock()
+
+
+class DeviceTracker(object):
+    """
+    通过adb server的'host:track-devices-l'服务监控设备变化,在内存中维护设备表
+
+    设备信息是一个字典,包含state/product/model/device/transport_id等字段
+    """
+    RECONNECT_DELAY = 1
+
+    def __init__(self, client: 'ADBClient'):
+        """
+        Args:
+            client: 用于连接adb server的客户端
+        """
+        self.client = client
+        self._devices: Dict[str, Dict[str, str]] = {}
+        self._callbacks: List[TrackerCallback] = []
+        self._lock = threading.Lock()
+        self._ready_event = threading.Event()
+        self._kill_event = threading.Event()
+        self._conn: Optional[AdbConnection] = None
+        self._t: Optional[threading.Thread] = None
+
+    def __str__(self):
+        return f"<DeviceTracker ({self.connected and 'Connected' or 'Disconnected'})> " \
+               f"adb server:{self.client.host}:{self.client.port}"
+
+    @classmethod
+    def get_tracker(cls, client: 'ADBClient') -> 'DeviceTracker':
+        """
+        获取adb server对应的tracker,同一个adb server只会创建一个tracker
+
+        Args:
+            client: 用于连接adb server的客户端
+
+        Returns:
+            DeviceTracker, 只在第一次获取时启动,不会等待设备表; 还没有收到设备表时connected为False
+        """
+        key = (client.host, client.port)
+        with _TRACKERS_LOCK:
+            if not (tracker := _TRACKERS.get(key)):
+                tracker = _TRACKERS[key] = cls(client)
+                tracker.start(timeout=0)
+        return tracker
+
+    @property
+    def connected(self) -> bool:
+        """ 与adb server的连接是否正常,断开时设备表可能不是最新的 """
+        return self._ready_event.is_set()
+
+    @property
+    def devices(self) -> Dict[str, Dict[str, str]]:
+        """
+        当前设备表
+
+        Returns:
+            devices dict key[device_name]-value[设备信息]
+        """
+        with self._lock:
+            return {device_id: dict(info) for device_id, info in self._devices.items()}
+
+    def get_state(self, device_id: str) -> Optional[str]:
+        """
+        获取设备状态
+
+        Args:
+            device_id: 设备名
+
+        Returns:
+            设备状态,设备不存在时返回None
+        """
+        with self._lock:
+            if info := self._devices.get(device_id):
+                return info['state']
+        return None
+
+    def reg_callback(self, callback: TrackerCallback) -> None:
+        """
+        注册设备变化时的回调函数
+
+        Args:
+            callback: callback(device_id, 变化前的设备信息, 变化后的设备信息)
+
+        Returns:
+            None
+        """
+        self._callbacks.append(callback)
+
+    def unreg_callback(self, callback: TrackerCallback) -> None:
+        if callback in self._callbacks:
+            self._callbacks.remove(callback)
+
+    def start(self, timeout: Optional[float] = 5) -> bool:
+        """
+        启动监控线程,并等待收到第一份设备表
+
+        Args:
+            timeout: 等待超时时间
+
+        Returns:
+            是否已经收到设备表
+        """
+        if not self._t or not self._t.is_alive():
+            self._kill_event.clear()
+            self._t = threading.Thread(target=self._run, name='device_tracker', daemon=True)
+            self._t.start()
+        return self._ready_event.wait(timeout)
+
+    def stop(self) -> None:
+        """
+        停止监控线程
+
+        Returns:
+            None
+        """
+        self._kill_event.set()
+        if self._conn:
+            self._conn.close()
+
+    def _run(self) -> None:
+        while not self._kill_event.is_set():
+            try:
+                self._conn = self.client.create_connection()
+                self._conn.request('host:track-devices-l')
+                while not self._kill_event.is_set():
+                    self._update(self._parse(self._conn.read_string()))
+                    self._ready_event.set()
+            except Exception as err:
+                if not self._kill_event.is_set():
+                    logger.warning(f'{self} track-devices error: {err!r}')
+            finally:
+                self._ready_event.clear()
+                if self._conn:
+                    self._conn.close()
+                    self._conn = None
+            self._kill_event.wait(self.RECONNECT_DELAY)
+
+    def _update(self, devices: Dict[str, Dict[str, str]]) -> None:
+        with self._lock:
+            old_devices, self._devices = self._devices, devices
+
+        for device_id in set(old_devices) | set(devices):
+            old, new = old_devices.get(device_id), devices.get(device_id)
+            if old == new:
+                continue
+            logger.debug(f'device {device_id} {old and old["state"]} -> {new and new["state"]}')
+            for callback in list(self._callbacks):
+                try:
+                    callback(device_id, old, new)
+                except Exception:
+                    logger.error('callback: {} error'.format(callback))
+                    traceback.print_exc()
+
+    @staticmethod
+    def _parse(payload: str) -> Dict[str, Dict[str, str]]:
+        """
+        解析track-devices-l的输出
+
+        like:
+            emulator-5554          device product:sdk_gphone_x86 model:Android_SDK device:generic_x86 transport_id:1
+            1234567890abcdef       unauthorized usb:1-1 transport_id:2
+
+        Args:
+            payload: 一次推送的设备列表
+
+        Returns:
+            devices dict key[device_name]-value[设备信息]
+        """
+        devices = {}
+        for line in payload.splitlines():
+            fields = line.split()
+            if len(fields) < 2:
+                continue
+            device_id, state, info = fields[0], [], {}
+            for field in fields[1:]:
+                if ':' in field and state:
+                    key, _, value = field.partition(':')
+                    info[key] = value
+                elif not info:
+                    state.append(field)
+            info['state'] = ' '.join(state)
+            devices[device_id] = info
+        return devices
@@ -180,13 +180,82 @@ class SafeSocket(object):
             totalsent += sent
 
     def recv(self, size):
-        while len(self.buf) < size:
-            trunk = self.sock.recv(min(size-len(self.buf), 4096))
+        if len(self.buf) >= size:
+            ret, self.buf = self.buf[:size], self.buf[size:]
+            return ret
+        return bytes(self.recv_exact(size))
+
+    def recv_exact(self, size: int) -> bytearray:
+        """
+        读取size字节到新分配的bytearray中
+
+        Args:
+            size: 需要读取的字节数
+
+        Returns:
+            读取到的数据
+        """
+        buf = bytearray(size)
+        self.recv_into(buf)
+        return buf
+
+    def recv_into(self, buffer, nbytes: int = 0) -> int:
+        """
+        通过memoryview把数据直接读取到buffer中,直到读满nbytes字节
+        读取中途超时/出错时,已经读取的数据会放回缓冲区,下次读取时返回
+
+        Args:
+            buffer: 可写的buffer,例如bytearray/memoryview/numpy数组
+            nbytes: 需要读取的字节数,为0时读满整个buffer
+
+        Raises:
+            socket.error: 连接已经断开
+        Returns:
+            读取的字节数
+        """
+        view = memoryview(buffer).cast('B')
+        nbytes = nbytes or len(view)
+        offset = min(len(self.buf), nbytes)
+        if offset:
+            view[:offset], self.buf = self.buf[:offset], self.buf[offset:]
+        try:
+            while offset < nbytes:
+                n = self.sock.recv_into(view[offset:nbytes])
+                if n == 0:
+                    raise socket.error("socket connection broken")
+                offset += n
+        except BaseException:
+            self.buf = bytes(view[:offset]) + self.buf
+            raise
+        return nbytes
+
+    def readinto(self, buffer) -> int:
+        """
+        读取一次数据到buffer中, 与io.RawIOBase.readinto相同
+
+        Args:
+            buffer: 可写的buffer
+
+        Returns:
+            读取的字节数, 对端关闭连接时为0
+        """
+        view = memoryview(buffer).cast('B')
+        if self.buf:
+            n = min(len(self.buf), len(view))
+            view[:n], self.buf = self.buf[:n], self.buf[n:]
+            return n
+        return self.sock.recv_into(view)
+
+    def recv_all(self) -> bytes:
+        """一直读取数据,直到对端关闭连接"""
+        chunks = [self.buf]
+        self.buf = b""
+        while True:
+            trunk = self.sock.recv(65536)
             if trunk == b"":
-                raise socket.error("socket connection broken")
-            self.buf += trunk
-        ret, self.buf = self.buf[:size], self.buf[size:]
-        return ret
+                break
+            chunks.append(trunk)
+        return b"".join(chunks)
 
     def recv_with_timeout(self, size, timeout=2):
         self.sock.settimeout(timeout)
@@ -1,7 +1,9 @@
 import queue
+import struct
 import random
 import subprocess
 import re
+import shlex
 import socket
 import os
 import threading
@@ -12,6 +14,13 @@ from baseImage import Rect, Point
 
 from adbutils._utils import (get_adb_exe, split_cmd, _popen_kwargs, get_std_encoding, check_file,
                              NonBlockingStreamReader, reg_cleanup)
+from adbutils._connection import AdbConnection
+from adbutils._session import ShellSession, ShellSessionPool
+from adbutils._sync import SyncConnection
+from adbutils._tracker import DeviceTracker
+from adbutils._profile import DeviceProfile
+from adbutils._dumpsys import DumpsysCache
+from adbutils._input import InputQueue
 from adbutils.constant import (ANDROID_ADB_SERVER_HOST, ANDROID_ADB_SERVER_PORT, ADB_CAP_RAW_REMOTE_PATH,
                                ADB_CAP_RAW_LOCAL_PATH, IP_PATTERN, ADB_DEFAULT_KEYBOARD, ANDROID_TMP_PATH,
                                ADB_KEYBOARD_APK_PATH)
@@ -20,7 +29,7 @@ from adbutils.exceptions import (AdbError, AdbShellError, AdbBaseError, AdbTimeo
 from adbutils._wraps import retries
 from loguru import logger
 
-from typing import Union, List, Optional, Tuple, Dict, Match, Iterator, Final, Generator, Any
+from typing import Union, List, Optional, Tuple, Dict, Match, Iterator, Final, Generator, Any, Callable
 
 
 class ADBClient(object):
@@ -28,16 +37,19 @@ class ADBClient(object):
 
     def __init__(self, device_id: Optional[str] = None, adb_path: Optional[str] = None,
                  host: Optional[str] = ANDROID_ADB_SERVER_HOST,
-                 port: Optional[int] = ANDROID_ADB_SERVER_PORT):
+                 port: Optional[int] = ANDROID_ADB_SERVER_PORT,
+                 use_socket: Optional[bool] = False):
         """
         Args:
             device_id (str): 指定设备名
             adb_path (str): 指定adb路径
             host (str): 指定连接地址
             port (int): 指定连接端口
+            use_socket (bool): 如果为True,则通过socket直接与adb server通讯,不再为每条命令创建adb进程
         """
         self.device_id = device_id
         self.adb_path = adb_path or get_adb_exe()
+        self.use_socket = use_socket
         self._set_cmd_options(host, port)
         self.connect()
 
@@ -71,6 +83,9 @@ class ADBClient(object):
         Returns:
             adb server版本
         """
+        if self.use_socket:
+            return int(self.host_request('host:version'), 16)
+
         ret = self.cmd('version', devices=False)
         pattern = re.compile(r'Android Debug Bridge version \d.\d.(\d+)')
         if version := pattern.findall(ret):
@@ -85,9 +100,31 @@ class ADBClient(object):
             devices dict key[device_name]-value[device_state]
         """
         pattern = re.compile(r'([\S]+)\t([\w]+)\n?')
-        ret = self.cmd("devices", devices=False)
+        if self.use_socket:
+            # tracker还没有收到设备表时不等待, 直接查询一次
+            if self.tracker.connected:
+                devices = self.tracker.devices
+            else:
+                devices = DeviceTracker._parse(self.host_request('host:devices-l'))
+            return {device_id: info['state'] for device_id, info in devices.items()}
+        else:
+            ret = self.cmd("devices", devices=False)
         return {value[0]: value[1] for value in pattern.findall(ret)}
 
+    @property
+    def tracker(self) -> DeviceTracker:
+        """
+        adb server的设备监控,use_socket为True时devices/status直接读取它维护的设备表
+        tracker在后台连接, 还没有收到设备表时devices/status会直接查询adb server
+
+        Examples:
+            client.tracker.reg_callback(lambda device_id, old, new: print(device_id, old, new))
+
+        Returns:
+            DeviceTracker
+        """
+        return DeviceTracker.get_tracker(self)
+
     def get_device_id(self, decode: bool = False) -> str:
         return decode and self.device_id.replace(':', '_') or self.device_id
 
@@ -147,6 +184,11 @@ class ADBClient(object):
         Returns:
             None
         """
+        if self.use_socket:
+            service = no_rebind and f'forward:norebind:{local};{remote}' or f'forward:{local};{remote}'
+            self.host_request(service, devices=True, response=False)
+            return
+
         cmds = ['forward']
         if no_rebind:
             cmds += ['--no-rebind']
@@ -162,6 +204,11 @@ class ADBClient(object):
         Returns:
             None
         """
+        if self.use_socket:
+            service = local and f'killforward:{local}' or 'killforward-all'
+            self.host_request(service, devices=True, response=False)
+            return
+
         if local:
             cmds = ['forward', '--remove', local]
         else:
@@ -179,7 +226,10 @@ class ADBClient(object):
         """
         forwards = {}
         pattern = re.compile(r'([\S]+)\s([\S]+)\s([\S]+)\n?')
-        ret = self.cmd(['forward', '--list'], devices=False, skip_error=True)
+        if self.use_socket:
+            ret = self.host_request('host:list-forward')
+        else:
+            ret = self.cmd(['forward', '--list'], devices=False, skip_error=True)
         for value in pattern.findall(ret):
             if device_id and device_id != value[0]:
                 continue
@@ -229,13 +279,14 @@ class ADBClient(object):
             return port
         return self.get_available_forward_local()
 
-    def push(self, local: str, remote: str) -> None:
+    def push(self, local: str, remote: str, mode: Optional[int] = None) -> None:
         """
         command 'adb push <local> <remote>'
 
         Args:
             local: 发送文件的路径
             remote: 发送到设备上的路径
+            mode: 设备上文件的权限,例如0o755
 
         Raises:
             RuntimeError:文件不存在
@@ -245,7 +296,13 @@ class ADBClient(object):
         """
         if not check_file(local):
             raise RuntimeError(f"file: {local} does not exists")
+        if self.use_socket:
+            with self.sync() as sync:
+                sync.push(local, remote, mode=mode)
+            return
         self.cmd(['push', local, remote], decode=False)
+        if mode is not None:
+            self.cmd(['shell', 'chmod', f'{mode:o}', remote])
 
     def push_with_progress(self, local: str, remote: str) -> Generator[Union[str, bool], Any, None]:
         """
@@ -258,6 +315,12 @@ class ADBClient(object):
         Returns:
             生成器
         """
+        if self.use_socket:
+            with self.sync() as sync:
+                yield from self._sync_progress(sync.iter_push(local, remote))
+            yield True
+            return
+
         proc = self.start_cmd(cmds=['push', local, remote])
 
         nbsp = NonBlockingStreamReader(proc.stdout)
@@ -285,6 +348,10 @@ class ADBClient(object):
         Returns:
             None
         """
+        if self.use_socket:
+            with self.sync() as sync:
+                sync.pull(remote, local)
+            return
         self.cmd(['pull', remote, local], decode=False)
 
     def pull_with_progress(self, local: str, remote: str) -> Generator[Union[str, bool], Any, None]:
@@ -298,6 +365,12 @@ class ADBClient(object):
         Returns:
             生成器
         """
+        if self.use_socket:
+            with self.sync() as sync:
+                yield from self._sync_progress(sync.iter_pull(remote, local))
+            yield True
+            return
+
         proc = self.start_cmd(cmds=['pull', remote, local])
 
         nbsp = NonBlockingStreamReader(proc.stdout)
@@ -314,6 +387,38 @@ class ADBClient(object):
         yield True
         reg_cleanup(proc.kill)
 
+    def sync(self) -> SyncConnection:
+        """
+        打开一个adb sync连接,可以直接在内存与设备之间push/pull数据
+
+        Examples:
+            with device.sync() as sync:
+                data = sync.pull('/sdcard/a.png')
+                sync.push(io.BytesIO(data), '/sdcard/b.png', callback=print)
+
+        Returns:
+            SyncConnection
+        """
+        return SyncConnection(self.transport_connection('sync:'))
+
+    @staticmethod
+    def _sync_progress(progress: Generator[Tuple[int, Optional[int]], None, int]) -> Generator[str, Any, None]:
+        """
+        将sync传输进度转换为与adb push/pull输出一致的百分比
+
+        Args:
+            progress: SyncConnection.iter_push/iter_pull
+
+        Returns:
+            生成器
+        """
+        last_percent = None
+        for transferred, total in progress:
+            percent = str(total and int(transferred * 100 / total) or 0)
+            if percent != last_percent:
+                last_percent = percent
+                yield percent
+
     def install(self, local: str, install_options: Union[str, list, None] = None) -> bool:
         """
         command 'adb install <local>'
@@ -381,6 +486,16 @@ class ADBClient(object):
         Returns:
             当前设备状态
         """
+        if self.use_socket and self.tracker.connected:
+            return self.tracker.get_state(self.device_id)
+        elif self.use_socket:
+            try:
+                return self.host_request('get-state', devices=True)
+            except AdbDeviceConnectError as err:
+                if 'offline' in err.message:
+                    return 'offline'
+                return None
+
         proc = self.start_cmd('get-state')
         stdout, stderr = proc.communicate()
 
@@ -471,10 +586,120 @@ class ADBClient(object):
         )
         return proc
 
+    @property
+    def features(self) -> List[str]:
+        """
+        获取adb server与设备共同支持的特性,例如shell_v2/cmd/stat_v2
+
+        Returns:
+            特性列表
+        """
+        if not hasattr(self, '_features'):
+            setattr(self, '_features', self.host_request('features', devices=True).split(','))
+
+        return getattr(self, '_features')
+
+    def create_connection(self, timeout: Optional[float] = None) -> AdbConnection:
+        """
+        创建一个连接到adb server的socket,adb server未启动时会尝试启动
+
+        Args:
+            timeout: socket超时时间
+
+        Returns:
+            AdbConnection
+        """
+        try:
+            return AdbConnection(self.host, self.port, timeout=timeout)
+        except ConnectionRefusedError:
+            self.start_server()
+            return AdbConnection(self.host, self.port, timeout=timeout)
+
+    def host_request(self, service: str, devices: Optional[bool] = False,
+                     response: Optional[bool] = True) -> Optional[str]:
+        """
+        通过socket向adb server发送host请求
+
+        Args:
+            service: 请求内容, devices为False时需要自带'host:'前缀
+            devices: 如果为True,则需要指定device-id,请求会以'host-serial:<device_id>:'开头
+            response: 是否读取adb server返回的字符串
+        Raises:
+            NoDeviceSpecifyError:没有指定设备
+            AdbDeviceConnectError: 设备连接异常
+            AdbError: adb server返回FAIL
+        Returns:
+            adb server返回的字符串
+        """
+        if devices:
+            if not self.device_id:
+                raise NoDeviceSpecifyError('must set device_id')
+            service = f'host-serial:{self.device_id}:{service}'
+
+        logger.info(f'adb socket {service}')
+        with self.create_connection() as conn:
+            conn.request(service)
+            if response:
+                return conn.read_string()
+            # forward/killforward 在转发结果确定后还会返回一次OKAY或FAIL
+            ret = conn.read_until_close()
+            if ret.startswith(AdbConnection.FAIL):
+                conn.raise_fail(ret[8:].decode('utf-8', errors='replace'))
+            return None
+
+    def transport_connection(self, service: str, timeout: Optional[float] = None) -> AdbConnection:
+        """
+        创建一个切换到当前设备的连接,并打开设备上的服务
+
+        Args:
+            service: 设备服务,例如'shell:ls'/'sync:'
+            timeout: socket超时时间
+        Raises:
+            NoDeviceSpecifyError:没有指定设备
+            AdbDeviceConnectError: 设备连接异常
+        Returns:
+            AdbConnection
+        """
+        if not self.device_id:
+            raise NoDeviceSpecifyError('must set device_id')
+
+        logger.info(f'adb socket -s {self.device_id} {service}')
+        conn = self.create_connection(timeout=timeout)
+        try:
+            conn.request(f'host:transport:{self.device_id}')
+            conn.request(service)
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    def socket_shell(self, cmds: Union[list, str]) -> Tuple[bytes, bytes, Optional[int]]:
+        """
+        通过socket运行shell命令。设备支持shell_v2时,可以分别获取stdout/stderr和退出码
+
+        Args:
+            cmds: 需要运行的参数
+
+        Returns:
+            (stdout, stderr, 退出码),不支持shell_v2时stderr为空,退出码为None
+        """
+        cmds = ' '.join(split_cmd(cmds))
+        if 'shell_v2' in self.features:
+            with self.transport_connection(f'shell,v2,raw:{cmds}') as conn:
+                return conn.read_shell_v2()
+
+        with self.transport_connection(f'shell:{cmds}') as conn:
+            return conn.read_until_close(), b'', None
+
 
 class ADBShell(ADBClient):
     SHELL_ENCODING: Final[str] = 'utf-8'  # adb shell的编码
     PS_HEAD: Final[List[str]] = ['user', 'pid', 'ppid', 'vsize', 'rss', '', 'wchan', 'pc', 'name']  # adb shell ps
+    PROP_TTL: Optional[float] = 60  # getprop缓存有效时间(秒),为None时不过期
+    BATCH_MARK: Final[str] = '__ADBUTILS_BATCH_'  # batch命令之间的分隔标记
+    _dumpsys_lock = threading.Lock()
+    _input_queue_lock = threading.Lock()
+    USE_PROFILE: bool = True  # 是否把设备静态信息缓存到本地文件
 
     @property
     def line_breaker(self) -> str:
@@ -502,7 +727,7 @@ class ADBShell(ADBClient):
         Returns:
             单位MB
         """
-        ret = self.shell(['dumpsys', 'meminfo'])
+        ret = self.dumpsys('meminfo')
         pattern = re.compile(r'.*Total RAM:\s+(\S+)\s+', re.DOTALL)
         if m := pattern.search(ret):
             memory = m.group(1)
@@ -525,10 +750,8 @@ class ADBShell(ADBClient):
         Returns:
             cpu核心数量
         """
-        if not hasattr(self, '_cpu_coreNum'):
-            setattr(self, '_cpu_coreNum', int(self.shell("cat /proc/cpuinfo").strip().count('processor')))
-
-        return getattr(self, '_cpu_coreNum')
+        return self.profile.get_or_set('cpu_coreNum',
+                                       lambda: int(self.shell("cat /proc/cpuinfo").strip().count('processor')))
 
     @property
     def cpu_max_freq(self) -> List[Optional[int]]:
@@ -540,18 +763,39 @@ class ADBShell(ADBClient):
         Returns:
             包含核心最高频率的列表
         """
-        _cores = []
-        cmds = [f"cat /sys/devices/system/cpu/cpu{i}/cpufreq/scaling_max_freq" for i in range(self.cpu_coreNum)]
-        cmds = '&'.join(cmds)
+        return self._get_persistent_cpu_freq('cpu_max_freq', 'scaling_max_freq')
 
-        ret = self.shell(cmds)
-        if not ret:
-            raise AdbBaseError('get cpufreq error')
+    def _get_persistent_cpu_freq(self, key: str, name: str) -> List[Optional[int]]:
+        """ 只在所有核心都读取成功时写入缓存, 有核心离线时结果不完整,下次重新读取 """
+        if freq := self.profile.get(key):
+            return freq
+        freq = self._get_cpu_freq(name)
+        if all(v is not None for v in freq):
+            self.profile.set(key, freq)
+        return freq
 
-        pattern = re.compile('(\d+)')
-        if ret := pattern.findall(ret):
-            _cores = [int(int(core) / 1000) for core in ret]
-        else:
+    def _get_cpu_freq(self, name: str) -> List[Optional[int]]:
+        """
+        读取cpu各核心cpufreq目录下的频率文件
+
+        Args:
+            name: 文件名,例如scaling_max_freq
+
+        Raises:
+            AdbBaseError: 获取cpu信息失败
+        Returns:
+            包含核心频率的列表,离线的核心为None
+        """
+        cmds = [f"cat /sys/devices/system/cpu/cpu{i}/cpufreq/{name}" for i in range(self.cpu_coreNum)]
+        pattern = re.compile(r'(\d+)')
+
+        _cores = []
+        for stdout, returncode in self.batch(cmds):
+            # 离线的核心读取失败,对应的值为None
+            m = not returncode and pattern.search(stdout)
+            _cores.append(m and int(int(m.group(1)) / 1000) or None)
+
+        if not any(_cores):
             raise AdbBaseError('get cpufreq error')
 
         return _cores
@@ -566,21 +810,7 @@ class ADBShell(ADBClient):
         Returns:
             包含核心最低频率的列表
         """
-        _cores = []
-        cmds = [f"cat /sys/devices/system/cpu/cpu{i}/cpufreq/scaling_min_freq" for i in range(self.cpu_coreNum)]
-        cmds = '&'.join(cmds)
-
-        ret = self.shell(cmds)
-        if not ret:
-            raise AdbBaseError('get cpufreq error')
-
-        pattern = re.compile('(\d+)')
-        if ret := pattern.findall(ret):
-            _cores = [int(int(core) / 1000) for core in ret]
-        else:
-            raise AdbBaseError('get cpufreq error')
-
-        return _cores
+        return self._get_persistent_cpu_freq('cpu_min_freq', 'scaling_min_freq')
 
     @property
     def cpu_cur_freq(self) -> List[Optional[int]]:
@@ -592,21 +822,7 @@ class ADBShell(ADBClient):
         Returns:
             包含核心当前频率的列表
         """
-        _cores = []
-        cmds = [f"cat /sys/devices/system/cpu/cpu{i}/cpufreq/scaling_cur_freq" for i in range(self.cpu_coreNum)]
-        cmds = '&'.join(cmds)
-
-        ret = self.shell(cmds)
-        if not ret:
-            raise AdbBaseError('get cpufreq error')
-
-        pattern = re.compile('(\d+)')
-        if ret := pattern.findall(ret):
-            _cores = [int(int(core) / 1000) for core in ret]
-        else:
-            raise AdbBaseError('get cpufreq error')
-
-        return _cores
+        return self._get_cpu_freq('scaling_cur_freq')
 
     @property
     def cpu_abi(self) -> str:
@@ -616,10 +832,7 @@ class ADBShell(ADBClient):
         Returns:
             cpu构建
         """
-        if not hasattr(self, '_cpu_adi'):
-            setattr(self, '_cpu_adi', self.shell("getprop ro.product.cpu.abi").strip())
-
-        return getattr(self, '_cpu_adi')
+        return self.props.get('ro.product.cpu.abi', '')
 
     @property
     def gpu_model(self):
@@ -629,8 +842,8 @@ class ADBShell(ADBClient):
         Returns:
             gpu型号
         """
-        if not hasattr(self, '_gpu_model'):
-            ret = self.shell('dumpsys SurfaceFlinger')
+        def _get_gpu_model() -> Optional[str]:
+            ret = self.dumpsys('SurfaceFlinger')
             pattern = re.compile(r'GLES:\s+(.*)')
             m = pattern.search(ret)
             if not m:
@@ -640,9 +853,9 @@ class ADBShell(ADBClient):
 
             if len(_list) > 0:
                 gpuModel = _list[1].strip()
-            setattr(self, '_gpu_model', gpuModel)
+            return gpuModel
 
-        return getattr(self, '_gpu_model')
+        return self.profile.get_or_set('gpu_model', _get_gpu_model)
 
     @property
     def opengl_version(self):
@@ -652,8 +865,8 @@ class ADBShell(ADBClient):
         Returns:
             opengl版本
         """
-        if not hasattr(self, '_opengl'):
-            ret = self.shell('dumpsys SurfaceFlinger')
+        def _get_opengl_version() -> Optional[str]:
+            ret = self.dumpsys('SurfaceFlinger')
             pattern = re.compile(r'GLES:\s+(.*)')
             m = pattern.search(ret)
             if not m:
@@ -665,9 +878,9 @@ class ADBShell(ADBClient):
                 m2 = re.search(r'(\S+\s+\S+\s+\S+).*', _list[2])
                 if m2:
                     opengl = m2.group(1)
-            setattr(self, '_opengl', opengl)
+            return opengl
 
-        return getattr(self, '_opengl')
+        return self.profile.get_or_set('opengl_version', _get_opengl_version)
 
     @property
     def model(self) -> str:
@@ -677,10 +890,7 @@ class ADBShell(ADBClient):
         Returns:
             手机型号
         """
-        if not hasattr(self, '_model'):
-            setattr(self, '_model', self.getprop('ro.product.model'))
-
-        return getattr(self, '_model')
+        return self.props.get('ro.product.model', '')
 
     @property
     def manufacturer(self) -> str:
@@ -690,10 +900,7 @@ class ADBShell(ADBClient):
         Returns:
             手机厂商名
         """
-        if not hasattr(self, '_manufacturer'):
-            setattr(self, '_manufacturer', self.getprop('ro.product.manufacturer'))
-
-        return getattr(self, '_manufacturer')
+        return self.props.get('ro.product.manufacturer', '')
 
     @property
     def android_version(self) -> str:
@@ -703,10 +910,7 @@ class ADBShell(ADBClient):
         Returns:
             安卓版本
         """
-        if not hasattr(self, '_android_version'):
-            setattr(self, '_android_version', self.getprop('ro.build.version.release'))
-
-        return getattr(self, '_android_version')
+        return self.props.get('ro.build.version.release', '')
 
     @property
     def sdk_version(self) -> int:
@@ -715,11 +919,18 @@ class ADBShell(ADBClient):
 
         Returns:
             sdk版本号
-        """
-        if not hasattr(self, '_sdk_version'):
-            setattr(self, '_sdk_version', int(self.getprop('ro.build.version.sdk')))
 
-        return getattr(self, '_sdk_version')
+        Raises:
+            AdbBaseError: 获取不到sdk版本
+        """
+        sdk = self.props.get('ro.build.version.sdk')
+        if not sdk:
+            # getprop全量输出可能为空或不完整,单独查询一次
+            sdk = self.getprop('ro.build.version.sdk')
+        try:
+            return int(sdk)
+        except (TypeError, ValueError):
+            raise AdbBaseError(f"{self.device_id} get sdk version failed, ro.build.version.sdk={sdk!r}")
 
     @property
     def abi_version(self) -> str:
@@ -729,10 +940,7 @@ class ADBShell(ADBClient):
         Returns:
             abi版本
         """
-        if not hasattr(self, '_abi_version'):
-            setattr(self, '_abi_version', self.getprop('ro.product.cpu.abi'))
-
-        return getattr(self, '_abi_version')
+        return self.props.get('ro.product.cpu.abi', '')
 
     @property
     def displayInfo(self) -> Dict[str, Union[int, float]]:
@@ -742,22 +950,87 @@ class ADBShell(ADBClient):
         Returns:
             width/height/density/orientation/rotation/max_x/max_y
         """
-        display_info = self.getPhysicalDisplayInfo()
         orientation = self.orientation
         max_x, max_y = self.getMaxXY()
-        display_info.update({
+        return {
+            **self.getPhysicalDisplayInfo(),
             "orientation": orientation,
             "rotation": orientation * 90,
             "max_x": max_x,
             "max_y": max_y,
-        })
-        return display_info
+        }
+
+    @property
+    def profile(self) -> DeviceProfile:
+        """
+        设备静态信息的缓存,以设备名+ro.build.fingerprint为键保存在本地文件中
+        USE_PROFILE为False时只在内存中缓存
+
+        Returns:
+            DeviceProfile
+        """
+        if not hasattr(self, '_profile'):
+            fingerprint = self.USE_PROFILE and self.props.get('ro.build.fingerprint') or None
+            setattr(self, '_profile', DeviceProfile(self.device_id, fingerprint))
+
+        return getattr(self, '_profile')
 
     @property
     def dpi(self) -> int:
-        if ret := self.getprop('ro.sf.lcd_density', True):
+        """
+        获取屏幕dpi
+
+        Returns:
+            dpi
+        """
+        if ret := self.props.get('ro.sf.lcd_density'):
             return int(ret)
 
+    @property
+    def props(self) -> Dict[str, str]:
+        """
+        command 'adb shell getprop', 一次获取设备的全部属性
+        结果会被缓存,超过PROP_TTL秒后再次访问时重新获取
+
+        Returns:
+            属性字典 key[属性名]-value[属性值]
+        """
+        props_time = getattr(self, '_props_time', None)
+        if props_time is None or (self.PROP_TTL is not None and time.time() - props_time > self.PROP_TTL):
+            return self.refresh_props()
+
+        return getattr(self, '_props')
+
+    def refresh_props(self) -> Dict[str, str]:
+        """
+        重新获取设备的全部属性
+
+        Returns:
+            属性字典 key[属性名]-value[属性值]
+        """
+        props = self.parse_props(self.raw_shell(['getprop']))
+        setattr(self, '_props', props)
+        setattr(self, '_props_time', time.time())
+        return props
+
+    @staticmethod
+    def parse_props(ret: str) -> Dict[str, str]:
+        """
+        解析getprop的输出
+
+        like:
+            [ro.build.version.sdk]: [30]
+            [ro.product.model]: [Pixel 5]
+
+        Args:
+            ret: getprop的输出
+
+        Returns:
+            属性字典 key[属性名]-value[属性值]
+        """
+        pattern = re.compile(r'^\[(?P<key>[^\]]+)\]:\s*\[(?P<value>.*?)\]\r?$', re.M | re.S)
+        return {m.group('key'): m.group('value') for m in pattern.finditer(ret)}
+
     @property
     def orientation(self) -> int:
         """
@@ -777,45 +1050,37 @@ class ADBShell(ADBClient):
             未找到则返回None,找到则返回IP address
         """
 
-        def get_ip_address_from_interface(interface):
+        interfaces = ('eth0', 'eth1', 'wlan0')
+        # 所有查询方式在一次adb shell中完成
+        cmds = ['ifconfig', 'netcfg']
+        for interface in interfaces:
+            cmds += [f'ip -f inet addr show {interface}', f'getprop dhcp.{interface}.ipaddress']
+        ret = [stdout for stdout, _ in self.batch(cmds)]
+        ifconfig, netcfg = ret[:2]
+
+        def get_ip_address_from_interface(index, interface):
+            ip_addr, dhcp = ret[2 + index * 2:4 + index * 2]
             # android >= 6.0: ip -f inet addr show {interface}
-            try:
-                res = self.shell(f'ip -f inet addr show {interface}')
-            except AdbShellError:
-                res = ''
-            if matcher := re.search(r"inet (?P<ip>(\d+\.){3}\d+)", res):
+            if matcher := re.search(r"inet (?P<ip>(\d+\.){3}\d+)", ip_addr):
                 return matcher.group('ip')
 
             # android >= 6.0 backup method: ifconfig
-            try:
-                res = self.shell('ifconfig')
-            except AdbShellError:
-                res = ''
-            if matcher := re.search(interface + r'.*?inet addr:((\d+\.){3}\d+)', res, re.DOTALL):
+            if matcher := re.search(interface + r'.*?inet addr:((\d+\.){3}\d+)', ifconfig, re.DOTALL):
                 return matcher.group(1)
 
             # android <= 6.0: netcfg
-            try:
-                res = self.shell('netcfg')
-            except AdbShellError:
-                res = ''
-            if matcher := re.search(interface + r'.* ((\d+\.){3}\d+)/\d+', res):
+            if matcher := re.search(interface + r'.* ((\d+\.){3}\d+)/\d+', netcfg):
                 return matcher.group(1)
 
             # android <= 6.0 backup method: getprop dhcp.{}.ipaddress
-            try:
-                res = self.shell('getprop dhcp.{}.ipaddress'.format(interface))
-            except AdbShellError:
-                res = ''
-            if matcher := IP_PATTERN.search(res):
+            if matcher := IP_PATTERN.search(dhcp):
                 return matcher.group(0)
 
             # sorry, no more methods...
             return None
 
-        interfaces = ('eth0', 'eth1', 'wlan0')
-        for i in interfaces:
-            ip = get_ip_address_from_interface(i)
+        for index, interface in enumerate(interfaces):
+            ip = get_ip_address_from_interface(index, interface)
             if ip and not ip.startswith('172.') and not ip.startswith('127.') and not ip.startswith('169.'):
                 return ip
         return None
@@ -913,7 +1178,7 @@ class ADBShell(ADBClient):
             True显示键盘/False未显示键盘
         """
 
-        if ret := self.shell(['dumpsys', 'input_method']):
+        if ret := self.dumpsys('input_method'):
             return 'mInputShown=true' in ret
         return False
 
@@ -927,14 +1192,14 @@ class ADBShell(ADBClient):
             True屏幕打开/False屏幕关闭
         """
         pattern = re.compile(r'mScreenOnFully=(?P<Bool>true|false)')
-        ret = self.shell(['dumpsys', 'window', 'policy'])
+        ret = self.dumpsys('window', 'policy')
 
         if m := pattern.search(ret):
             return m.group('Bool') == 'true'
         else:
             # MIUI11
             screenOnRE = re.compile('screenState=(SCREEN_STATE_ON|SCREEN_STATE_OFF)')
-            m = screenOnRE.search(self.shell('dumpsys window policy'))
+            m = screenOnRE.search(ret)
             if m:
                 return m.group(1) == 'SCREEN_STATE_ON'
         raise AdbBaseError('Could not determine screen ON state')
@@ -948,7 +1213,7 @@ class ADBShell(ADBClient):
         Returns:
             True屏幕锁定/False屏幕未锁定
         """
-        ret = self.shell('dumpsys window policy')
+        ret = self.dumpsys('window', 'policy')
         pattern = re.compile(r'(?:mShowingLockscreen|isStatusBarKeyguard|showing)=(?P<Bool>true|false)')
 
         if m := pattern.search(ret):
@@ -1005,8 +1270,7 @@ class ADBShell(ADBClient):
             包含了多个Match的列表, Match可以使用memory/user/packageName/activity/task
         """
         running_activities = []
-        cmds = ['dumpsys', 'activity', 'activities']
-        activities = self.shell(cmds)
+        activities = self.dumpsys('activity', 'activities')
         # 获取Stack
         pattern = re.compile(r'Stack #([\d]+):')
         stack = pattern.findall(activities)
@@ -1038,8 +1302,7 @@ class ADBShell(ADBClient):
         Returns:
             Match,可以使用memory/user/packageName/activity/task
         """
-        cmds = ['dumpsys', 'activity', 'activities']
-        ret = self.shell(cmds)
+        ret = self.dumpsys('activity', 'activities')
         pattern = re.compile(
             rf'{key}: '
             r'ActivityRecord\{(?P<memory>.*) (?P<user>.*) (?P<packageName>.*)/\.?(?P<activity>.*) (?P<task>.*)}[\n\r]')
@@ -1130,6 +1393,9 @@ class ADBShell(ADBClient):
         Returns:
             max_x,max_y
         """
+        if max_xy := self.profile.get('max_xy'):
+            return tuple(max_xy)
+
         ret = self.shell(['getevent', '-p']).split('\n')
         max_x, max_y = None, None
         pattern = re.compile(r'max ([0-9]+)')
@@ -1141,6 +1407,9 @@ class ADBShell(ADBClient):
             if i.find('0036') != -1:
                 if ret := pattern.findall(i):
                     max_y = int(ret[0])
+
+        if max_x is not None and max_y is not None:
+            self.profile.set('max_xy', [max_x, max_y])
         return max_x, max_y
 
     def getPhysicalDisplayInfo(self) -> Dict[str, Union[int, float]]:
@@ -1151,9 +1420,15 @@ class ADBShell(ADBClient):
             physical display info for dimension and density
 
         """
+        if info := self.profile.get_or_set('physical_display_info', lambda: self._getPhysicalDisplayInfo() or None):
+            return info
+        # 旧版本只能从dumpsys window获取, 横屏时宽高会互换,每次重新获取
+        return self._getWindowDisplayInfo()
+
+    def _getPhysicalDisplayInfo(self) -> Dict[str, Union[int, float]]:
         phyDispRE = re.compile(
             r'.*PhysicalDisplayInfo{(?P<width>\d+) x (?P<height>\d+), .*, density (?P<density>[\d.]+).*')
-        ret = self.raw_shell('dumpsys display')
+        ret = self.dumpsys('display')
         if m := phyDispRE.search(ret):
             displayInfo = {}
             for prop in ['width', 'height']:
@@ -1163,11 +1438,29 @@ class ADBShell(ADBClient):
                 displayInfo[prop] = float(m.group(prop))
             return displayInfo
 
+        # gets C{mPhysicalDisplayInfo} values from dumpsys. This is a method to obtain display dimensions and density
+        phyDispRE = re.compile(r'Physical size: (?P<width>\d+)x(?P<height>\d+).*Physical density: (?P<density>\d+)',
+                               re.S)
+        # 旧版本没有wm命令
+        ret = self.raw_shell('wm size; wm density', skip_error=True)
+
+        if m := phyDispRE.search(ret):
+            displayInfo = {}
+            for prop in ['width', 'height']:
+                displayInfo[prop] = int(m.group(prop))
+            for prop in ['density']:
+                displayInfo[prop] = float(m.group(prop))
+            return displayInfo
+
+        return {}
+
+    def _getWindowDisplayInfo(self) -> Dict[str, Union[int, float]]:
+        """ 从dumpsys window获取屏幕大小, 结果与当前屏幕方向有关,不能缓存 """
         # This could also be mSystem or mOverscanScreen
         phyDispRE = re.compile('\s*mUnrestrictedScreen=\((?P<x>\d+),(?P<y>\d+)\) (?P<width>\d+)x(?P<height>\d+)')
         # This is known to work on older versions (i.e. API 10) where mrestrictedScreen is not available
         dispWHRE = re.compile(r'\s*DisplayWidth=(?P<width>\d+) *DisplayHeight=(?P<height>\d+)')
-        ret = self.raw_shell('dumpsys window')
+        ret = self.dumpsys('window')
         m = phyDispRE.search(ret, 0)
         if not m:
             m = dispWHRE.search(ret, 0)
@@ -1184,19 +1477,6 @@ class ADBShell(ADBClient):
                     displayInfo[prop] = -1.0
             return displayInfo
 
-        # gets C{mPhysicalDisplayInfo} values from dumpsys. This is a method to obtain display dimensions and density
-        phyDispRE = re.compile(r'Physical size: (?P<width>\d+)x(?P<height>\d+).*Physical density: (?P<density>\d+)',
-                               re.S)
-        ret = self.raw_shell('wm size; wm density')
-
-        if m := phyDispRE.search(ret):
-            displayInfo = {}
-            for prop in ['width', 'height']:
-                displayInfo[prop] = int(m.group(prop))
-            for prop in ['density']:
-                displayInfo[prop] = float(m.group(prop))
-            return displayInfo
-
         return {}
 
     def _getDisplayDensity(self, strip=True) -> Union[float, int]:
@@ -1210,10 +1490,10 @@ class ADBShell(ADBClient):
         """
         BASE_DPI = 160.0
 
-        if density := self.getprop('ro.sf.lcd_density', strip):
+        if density := self.props.get('ro.sf.lcd_density'):
             return float(density) / BASE_DPI
 
-        if density := self.getprop('qemu.sf.lcd_density', strip):
+        if density := self.props.get('qemu.sf.lcd_density'):
             return float(density) / BASE_DPI
         return -1.0
 
@@ -1227,14 +1507,14 @@ class ADBShell(ADBClient):
         """
         # another way to get orientation, for old sumsung device(sdk version 15)
         SurfaceFlingerRE = re.compile(r'orientation=(\d+)')
-        ret = self.shell('dumpsys SurfaceFlinger')
+        ret = self.dumpsys('SurfaceFlinger')
         if m := SurfaceFlingerRE.search(ret):
             return int(m.group(1))
 
         # Fallback method to obtain the orientation
         # See https://github.com/dtmilano/AndroidViewClient/issues/128
         surfaceOrientationRE = re.compile(r'SurfaceOrientation:\s+(\d+)')
-        ret = self.shell('dumpsys input')
+        ret = self.dumpsys('input')
         if m := surfaceOrientationRE.search(ret):
             return int(m.group(1))
         # We couldn't obtain the orientation
@@ -1250,7 +1530,7 @@ class ADBShell(ADBClient):
         Returns:
             None
         """
-        self.shell(['input', 'keyevent', str(keycode)])
+        self.input_queue.wait(self.input_queue.keyevent(keycode))
 
     def getprop(self, key: str, strip: Optional[bool] = True) -> Optional[str]:
         """
@@ -1346,6 +1626,13 @@ class ADBShell(ADBClient):
         Returns:
             命令返回结果
         """
+        if self.use_socket:
+            # 长连接shell会话可以直接获取退出码
+            try:
+                return self.raw_shell(cmds, decode=decode, skip_error=skip_error)
+            except AdbError as err:
+                raise AdbShellError(err.stdout, err.stderr)
+
         if self.sdk_version < 25:
             # sdk_version < 25, adb shell 不返回错误
             # https://issuetracker.google.com/issues/36908392
@@ -1383,8 +1670,20 @@ class ADBShell(ADBClient):
         Returns:
             命令返回结果
         """
-        cmds = ['shell'] + split_cmd(cmds)
-        stdout = self.cmd(cmds, decode=False, skip_error=skip_error)
+        if self.use_socket:
+            if not decode and 'shell_v2' not in self.features and self.sdk_version >= 21:
+                # 旧版本adbd的shell会话通过pty运行,会把\n转换为\r\n; 需要原始数据时通过exec:读取
+                # exec:没有退出码, 只能返回stdout; sdk<21没有exec:服务, 与adb shell一样返回pty转换后的数据
+                with self.transport_connection(f"exec:{' '.join(split_cmd(cmds))}",
+                                               timeout=ShellSession.DEFAULT_TIMEOUT) as conn:
+                    return conn.read_until_close()
+            stdout, stderr, returncode = self.shell_session.execute(cmds)
+            if returncode and not skip_error:
+                raise AdbError(stdout, stderr)
+        else:
+            cmds = ['shell'] + split_cmd(cmds)
+            stdout = self.cmd(cmds, decode=False, skip_error=skip_error)
+
         if not decode:
             return stdout
 
@@ -1393,28 +1692,164 @@ class ADBShell(ADBClient):
         except UnicodeDecodeError:
             return str(repr(stdout))
 
+    def batch(self, cmds: List[Union[list, str]], skip_error: Optional[bool] = False) -> List[Tuple[str, int]]:
+        """
+        在一次adb shell中依次运行多条命令,并按顺序返回每条命令的结果
+        每条命令在子shell中运行,stderr会被丢弃,运行结束后输出标记行与退出码用于切分stdout
+
+        Examples:
+            device.batch(['cat /proc/stat', 'cat /proc/1/stat'])
+            >>> [('cpu  ...', 0), ('1 (init) ...', 0)]
+
+        Args:
+            cmds: 需要运行的命令列表
+            skip_error: 为True时没有获取到全部结果不报错, 只返回已经运行完成的命令的结果
+
+        Raises:
+            AdbBaseError: 没有获取到全部命令的结果
+        Returns:
+            列表,每个参数都是tuple(stdout, 退出码)
+        """
+        if not cmds:
+            return []
+
+        # 标记分两段输出,并带上随机数,避免与命令本身的输出混淆
+        mark = f'{self.BATCH_MARK}{random.randint(0, 0xffffffff):08x}__'
+        head, tail = mark[:len(mark) // 2], mark[len(mark) // 2:]
+        script = ' '.join(
+            f"( {cmd if isinstance(cmd, str) else ' '.join(cmd)} ) </dev/null 2>/dev/null; "
+            f"printf '\\n%s%s %d %d\\n' '{head}' '{tail}' {index} $?;"
+            for index, cmd in enumerate(cmds))
+
+        ret = self.raw_shell([script], decode=False, skip_error=True)
+        if not self.use_socket and self.sdk_version < 24:
+            # 旧版本adb shell通过pty输出, 换行会被转换为\r\n
+            ret = ret.replace(b'\r\n', b'\n')
+
+        results = []
+        pattern = re.compile(rb'\n' + mark.encode('ascii') + rb' (\d+) (\d+)\n')
+        start = 0
+        for m in pattern.finditer(ret):
+            stdout = ret[start:m.start()]
+            start = m.end()
+            results.append((stdout.decode(self.SHELL_ENCODING, errors='replace'), int(m.group(2))))
+
+        if len(results) != len(cmds) and not skip_error:
+            raise AdbBaseError(f'batch get {len(results)} results, expected {len(cmds)}')
+        return results
+
+    @property
+    def dumpsys_cache(self) -> DumpsysCache:
+        """
+        dumpsys结果缓存,可以通过dumpsys_cache.ttl修改各服务的缓存时间
+
+        Returns:
+            DumpsysCache
+        """
+        if not hasattr(self, '_dumpsys_cache'):
+            with self._dumpsys_lock:
+                if not hasattr(self, '_dumpsys_cache'):
+                    setattr(self, '_dumpsys_cache', DumpsysCache(self.shell))
+
+        return getattr(self, '_dumpsys_cache')
+
+    def dumpsys(self, service: str, *args: str, ttl: Optional[float] = None) -> str:
+        """
+        command 'adb shell dumpsys <service> <args>'
+        结果会按服务缓存一段时间,多个线程同时请求同一条命令时只运行一次
+
+        Args:
+            service: 服务名,例如SurfaceFlinger/window/activity
+            *args: 参数
+            ttl: 缓存时间(秒),默认使用DumpsysCache.SERVICE_TTL中的设置, 0表示不使用缓存
+
+        Returns:
+            dumpsys输出
+        """
+        return self.dumpsys_cache.get(service, *args, ttl=ttl)
+
+    def invalidate_dumpsys(self, service: Optional[str] = None) -> None:
+        """
+        清除dumpsys缓存
+
+        Args:
+            service: 需要清除的服务名,为None时清除全部
+
+        Returns:
+            None
+        """
+        self.dumpsys_cache.invalidate(service)
+
+    def invalidate_input_dumpsys(self) -> None:
+        """
+        清除输入操作后可能变化的dumpsys缓存(activity/window/input_method/SurfaceFlinger)
+
+        Returns:
+            None
+        """
+        for service in DumpsysCache.INPUT_SERVICES:
+            self.dumpsys_cache.invalidate(service)
+
+    @property
+    def shell_session(self) -> ShellSessionPool:
+        """
+        设备的长连接shell会话池,use_socket为True时shell/raw_shell通过它运行命令
+
+        Returns:
+            shell会话池
+        """
+        if not hasattr(self, '_shell_session'):
+            setattr(self, '_shell_session', ShellSessionPool(self))
+
+        return getattr(self, '_shell_session')
+
+    @property
+    def input_queue(self) -> InputQueue:
+        """
+        输入命令队列,tap/swipe/keyevent/text通过它运行; 直接使用时可以不等待结果连续提交
+
+        Examples:
+            device.input_queue.tap((100, 100))
+            device.input_queue.text('hello', enter=True)
+            device.input_queue.flush()
+
+        Returns:
+            InputQueue
+        """
+        if not hasattr(self, '_input_queue'):
+            with self._input_queue_lock:
+                if not hasattr(self, '_input_queue'):
+                    setattr(self, '_input_queue', InputQueue(self))
+
+        return getattr(self, '_input_queue')
+
     def start_shell(self, cmds: Union[list, str]):
         cmds = ['shell'] + split_cmd(cmds)
         return self.start_cmd(cmds)
 
 
 class ADBDevice(ADBShell):
+    SCREENCAP_MAX_SIDE: Final[int] = 16384  # 获取不到屏幕大小时,screencap宽高的最大值
+
     def __init__(self, device_id: Optional[str] = None, adb_path: Optional[str] = None,
                  host: Optional[str] = ANDROID_ADB_SERVER_HOST,
-                 port: Optional[int] = ANDROID_ADB_SERVER_PORT):
+                 port: Optional[int] = ANDROID_ADB_SERVER_PORT,
+                 use_socket: Optional[bool] = False):
         """
         Args:
             device_id (str): 指定设备名
             adb_path (str): 指定adb路径
             host (str): 指定连接地址
             port (int): 指定连接端口
+            use_socket (bool): 如果为True,则通过socket直接与adb server通讯,不再为每条命令创建adb进程
         """
-        super(ADBDevice, self).__init__(device_id=device_id, adb_path=adb_path, host=host, port=port)
+        super(ADBDevice, self).__init__(device_id=device_id, adb_path=adb_path, host=host, port=port,
+                                        use_socket=use_socket)
         self.set_input_method(ime_method=ADB_DEFAULT_KEYBOARD, ime_apk_path=ADB_KEYBOARD_APK_PATH)
 
     def screenshot(self, rect: Union[Rect, Tuple[int, int, int, int], List[int]] = None) -> np.ndarray:
         """
-        command 'adb screencap'
+        command 'adb exec-out screencap', 截图数据直接读取到内存中,不经过设备和本地的临时文件
 
         Args:
             rect: 自定义截取范围 Rect/(x, y, width, height)
@@ -1425,24 +1860,120 @@ class ADBDevice(ADBShell):
         Returns:
             图像数据
         """
+        if self.sdk_version < 21:
+            # exec-out需要android 5.0以上
+            return self.parse_screencap(self._screencap_by_file(), rect)
+
+        # 头部的宽高来自设备输出, 分配缓冲区前检查是否超出屏幕大小
+        display_info = self.getPhysicalDisplayInfo()
+        max_side = max(display_info['width'], display_info['height']) if display_info else self.SCREENCAP_MAX_SIDE
+
+        if self.use_socket:
+            with self.transport_connection('exec:screencap') as conn:
+                img_data = self._read_screencap(conn.sock.readinto, max_side)
+        else:
+            proc = self.start_cmd(['exec-out', 'screencap'])
+            try:
+                img_data = self._read_screencap(proc.stdout.readinto, max_side)
+            except AdbBaseError as err:
+                proc.kill()
+                stderr = proc.stderr.read()
+                raise AdbError(stdout=None, stderr=stderr.decode(get_std_encoding(stderr)), message=err.message)
+            finally:
+                for pipe in (proc.stdin, proc.stdout, proc.stderr):
+                    pipe.close()
+                proc.wait()
+
+        return self.parse_screencap(img_data, rect)
+
+    @staticmethod
+    def _read_screencap(readinto: Callable[[memoryview], int], max_side: int) -> np.ndarray:
+        """
+        读取screencap输出,先读取头部获得宽高,再把图像数据读取到预先分配的缓冲区
+
+        Args:
+            readinto: 把数据读取到memoryview中并返回读取长度的函数,例如socket.recv_into
+            max_side: 宽高的最大值, 超出时认为头部错误
+
+        Raises:
+            AdbBaseError: 数据不完整或者头部的宽高错误
+        Returns:
+            screencap的raw数据
+        """
+        def _readinto(view: memoryview) -> int:
+            offset = 0
+            while offset < len(view):
+                if not (n := readinto(view[offset:])):
+                    break
+                offset += n
+            return offset
+
+        header = bytearray(12)
+        if _readinto(memoryview(header)) != len(header):
+            raise AdbBaseError('screencap header incomplete')
+        width, height, _ = struct.unpack('<3I', header)
+        if not (0 < width <= max_side and 0 < height <= max_side):
+            # 设备输出了错误信息而不是图像时, 头部会被解析成很大的宽高
+            raise AdbBaseError(f'screencap header invalid, width={width} height={height} max={max_side}')
+
+        # API>=28时头部多了4字节的color space, 按最大头部分配,读取完毕后再截取实际长度
+        image_size = width * height * 4
+        buf = bytearray(16 + image_size)
+        buf[:12] = header
+        length = 12 + _readinto(memoryview(buf)[12:])
+        if length < 12 + image_size:
+            raise AdbBaseError(f'screencap data incomplete, got {length} bytes, expected {12 + image_size}')
+        return np.frombuffer(buf, dtype=np.uint8, count=length)
+
+    def _screencap_by_file(self) -> np.ndarray:
+        """
+        截图到设备上的文件,再读取到本地, 用于不支持exec-out的设备
+
+        Returns:
+            screencap的raw数据
+        """
         remote_path = ADB_CAP_RAW_REMOTE_PATH
         raw_local_path = ADB_CAP_RAW_LOCAL_PATH.format(device_id=self.get_device_id(True))
 
         self.raw_shell(['screencap', remote_path])
+        if self.use_socket:
+            # 通过sync直接读取到内存,不经过本地文件
+            with self.sync() as sync:
+                return np.frombuffer(sync.pull(remote_path), dtype=np.uint8)
+
         self.start_shell(['chmod', '755', remote_path])
         self.pull(local=raw_local_path, remote=remote_path)
+        img_data = np.fromfile(raw_local_path, dtype=np.uint8)
+        # 删除raw临时文件
+        os.remove(raw_local_path)
+        return img_data
 
+    @staticmethod
+    def parse_screencap(raw: Union[bytes, bytearray, memoryview, np.ndarray],
+                        rect: Union[Rect, Tuple[int, int, int, int], List[int]] = None) -> np.ndarray:
+        """
+        解析screencap输出的raw数据
+        头部为width/height/format(API>=28时还有color space),之后是RGBA数据
+
+        Args:
+            raw: screencap输出的raw数据
+            rect: 自定义截取范围 Rect/(x, y, width, height)
+
+        Raises:
+                ValueError:传入参数rect错误
+                OverflowError:rect超出屏幕边界范围
+        Returns:
+            图像数据
+        """
+        img_data = raw if isinstance(raw, np.ndarray) else np.frombuffer(raw, dtype=np.uint8)
         # read size
-        img_data = np.fromfile(raw_local_path, dtype=np.uint16)
-        width, height = img_data[2], img_data[0]
-        _data = img_data
+        width, height = (int(v) for v in img_data[:8].view(np.uint32))
         # read raw
         _line = 4  # 色彩通道数
-        img_data = np.fromfile(raw_local_path, dtype=np.uint8)
-        img_data = img_data[slice(_line * 3, len(img_data))]
+        header_size = len(img_data) - width * height * _line
+        img_data = img_data[header_size:]
         # 范围截取
-        img_data = img_data.reshape(width, height, _line)
-        width, height = img_data.shape[1::-1]
+        img_data = img_data.reshape(height, width, _line)
         if rect:
             if isinstance(rect, Rect):
                 pass
@@ -1462,8 +1993,6 @@ class ADBDevice(ADBShell):
             img_data = img_data[y_min:y_max, x_min:x_max]
 
         img_data = img_data[:, :, ::-1][:, :, 1:4]  # imgData中rgbA转为ABGR,并截取bgr
-        # 删除raw临时文件
-        os.remove(raw_local_path)
         return img_data
 
     def start_app(self, package: str, activity: Optional[str] = None):
@@ -1483,6 +2012,7 @@ class ADBDevice(ADBShell):
         else:
             cmds = ['am', 'start', '-n', f'{package}/{package}.{activity}']
         self.shell(cmds)
+        self.invalidate_dumpsys('activity')
 
     def stop_app(self, package: str) -> None:
         """
@@ -1495,6 +2025,7 @@ class ADBDevice(ADBShell):
             None
         """
         self.shell(['am', 'force-stop', package])
+        self.invalidate_dumpsys('activity')
 
     def clear_app(self, package: str) -> None:
         """
@@ -1589,12 +2120,7 @@ class ADBDevice(ADBShell):
         Returns:
             None
         """
-        x, y = None, None
-        if isinstance(point, Point):
-            x, y = point.x, point.y
-        elif isinstance(point, (tuple, list)):
-            x, y = point[0], point[1]
-        self.shell(f'input tap {x} {y}')
+        self.input_queue.wait(self.input_queue.tap(point))
 
     def swipe(self, start_point: Union[Tuple[int, int], Point], end_point: Union[Tuple[int, int], Point],
               duration: int = 500) -> None:
@@ -1604,27 +2130,31 @@ class ADBDevice(ADBShell):
         Args:
             start_point: 起点坐标
             end_point: 重点坐标
-            duration: 操作后延迟
+            duration: 滑动时长(毫秒)
         Returns:
             None
         """
+        self.input_queue.wait(self.input_queue.swipe(start_point, end_point, duration),
+                              timeout=InputQueue.RESULT_TIMEOUT + duration / 1000)
 
-        def _handle(point):
-            if isinstance(point, Point):
-                return point.x, point.y
-            elif isinstance(point, (tuple, list)):
-                return point
+    @staticmethod
+    def _get_xy(point: Union[Tuple[int, int], Point]) -> Tuple[int, int]:
+        if isinstance(point, Point):
+            return point.x, point.y
+        return point[0], point[1]
 
-        start_x, start_y = _handle(start_point)
-        end_x, end_y = _handle(end_point)
+    def _swipe_cmd(self, start_point: Union[Tuple[int, int], Point], end_point: Union[Tuple[int, int], Point],
+                   duration: int) -> str:
+        start_x, start_y = self._get_xy(start_point)
+        end_x, end_y = self._get_xy(end_point)
 
         version = self.sdk_version
         if version <= 15:
             raise AdbSDKVersionError(f'swipe: API <= 15 not supported (version={version})')
         elif version <= 17:
-            self.shell(f'input swipe {start_x} {start_y} {end_x} {end_y} {duration}')
+            return f'input swipe {start_x} {start_y} {end_x} {end_y} {duration}'
         else:
-            self.shell(f'input touchscreen swipe {start_x} {start_y} {end_x} {end_y}')
+            return f'input touchscreen swipe {start_x} {start_y} {end_x} {end_y} {duration}'
 
     def set_input_method(self, ime_method: str, ime_apk_path: Optional[str] = None) -> None:
         """
@@ -1655,22 +2185,15 @@ class ADBDevice(ADBShell):
         Returns:
             None
         """
+        self.input_queue.wait(self.input_queue.text(text, enter=enter))
+
+    def _text_cmd(self, text: str) -> str:
         if self.default_ime == ADB_DEFAULT_KEYBOARD:
             if text == '#CLEAR#':
-                self.broadcast('ADB_CLEAR_TEXT')
-            else:
-                self.shell(f"am broadcast -a ADB_INPUT_TEXT --es msg '{str(text)}'")
-        else:
-            if text == '#CLEAR#':
-                logger.warning('建议使用AdbKeyboard')
-                for i in range(255):
-                    self.keyevent('KEYCODE_CLEAR')
-            else:
-                self.shell(['input', 'text', str(text)])
-
-        if enter:
-            time.sleep(1)
-            self.keyevent('ENTER')
+                return 'am broadcast -a ADB_CLEAR_TEXT'
+            return f"am broadcast -a ADB_INPUT_TEXT --es msg {shlex.quote(str(text))}"
+        # input text不支持空格, 需要转义为%s
+        return f"input text {shlex.quote(str(text).replace(' ', '%s'))}"
 
 
 __all__ = ['ADBClient', 'ADBDevice']
@@ -0,0 +1,840 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import os
+import re
+import stat
+import struct
+import time
+from typing import Union, List, Optional, Tuple, Dict, Final
+
+import numpy as np
+from baseImage import Rect
+from loguru import logger
+
+from adbutils.adb import ADBDevice
+from adbutils._connection import AdbConnection
+from adbutils._sync import SyncConnection, SyncProgressCallback, SyncSource, SyncTarget
+from adbutils._utils import get_adb_exe, split_cmd, get_std_encoding
+from adbutils.constant import ANDROID_ADB_SERVER_HOST, ANDROID_ADB_SERVER_PORT
+from adbutils.exceptions import (AdbError, AdbShellError, AdbBaseError, AdbTimeout, NoDeviceSpecifyError,
+                                 AdbDeviceConnectError)
+
+
+class AsyncAdbConnection(object):
+    """
+    基于asyncio stream的adb server smart-socket连接
+    """
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, host: str, port: int) -> 'AsyncAdbConnection':
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def send(self, data: bytes) -> None:
+        self.writer.write(data)
+        await self.writer.drain()
+
+    async def recv(self, size: int) -> bytes:
+        try:
+            return await self.reader.readexactly(size)
+        except asyncio.IncompleteReadError as err:
+            raise ConnectionError('socket connection broken') from err
+
+    async def request(self, request: str) -> None:
+        """
+        发送请求并检查应答
+
+        Args:
+            request: 请求内容
+
+        Raises:
+            AdbDeviceConnectError: 设备连接异常
+            AdbError: adb server返回FAIL
+        Returns:
+            None
+        """
+        data = request.encode('utf-8')
+        await self.send(b'%04x' % len(data) + data)
+        status = await self.recv(4)
+        if status == AdbConnection.OKAY:
+            return
+        if status == AdbConnection.FAIL:
+            AdbConnection.raise_fail(await self.read_string())
+        raise AdbError(stdout=None, stderr=None, message=f'unexpected response from adb server: {status!r}')
+
+    async def read_string(self) -> str:
+        length = int(await self.recv(4), 16)
+        return (await self.recv(length)).decode('utf-8', errors='replace')
+
+    async def read_until_close(self) -> bytes:
+        return await self.reader.read()
+
+    async def read_shell_v2(self) -> Tuple[bytes, bytes, Optional[int]]:
+        """
+        读取shell protocol v2的全部输出,直到收到退出码
+
+        Returns:
+            (stdout, stderr, 退出码)
+        """
+        stdout, stderr = [], []
+        while True:
+            try:
+                packet_id, length = struct.unpack('<BI', await self.recv(5))
+                data = await self.recv(length) if length else b''
+            except ConnectionError:
+                return b''.join(stdout), b''.join(stderr), None
+            if packet_id == AdbConnection.SHELL_ID_STDOUT:
+                stdout.append(data)
+            elif packet_id == AdbConnection.SHELL_ID_STDERR:
+                stderr.append(data)
+            elif packet_id == AdbConnection.SHELL_ID_EXIT:
+                return b''.join(stdout), b''.join(stderr), data[0] if data else 0
+
+    async def close(self) -> None:
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
+
+
+class AsyncSyncConnection(object):
+    """
+    adb sync协议的asyncio版本, 与SyncConnection的参数一致
+    """
+    DATA_MAX_LENGTH: Final[int] = SyncConnection.DATA_MAX_LENGTH
+
+    def __init__(self, conn: AsyncAdbConnection):
+        self.conn = conn
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def stat(self, remote: str) -> Tuple[int, int, int]:
+        """
+        获取设备上文件的信息
+
+        Args:
+            remote: 设备上的路径
+
+        Returns:
+            (mode, size, mtime), 文件不存在时mode为0
+        """
+        await self._send_request(b'STAT', remote.encode('utf-8'))
+        sync_id, mode, size, mtime = struct.unpack('<4sIII', await self.conn.recv(16))
+        if sync_id != b'STAT':
+            raise AdbError(stdout=None, stderr=None, message=f'sync stat unexpected response {sync_id!r}')
+        return mode, size, mtime
+
+    async def push(self, src: SyncSource, remote: str, mode: Optional[int] = None,
+                   callback: Optional[SyncProgressCallback] = None) -> int:
+        """
+        发送数据到设备上
+
+        Args:
+            src: 本地文件路径,或者bytes/bytearray/memoryview,或者任意可读的文件对象
+            remote: 设备上的路径
+            mode: 文件权限,默认使用本地文件权限,非文件时为0o644
+            callback: 进度回调函数 callback(已传输字节数, 总字节数, 传输速度byte/s)
+
+        Returns:
+            发送的字节数
+        """
+        close_src = False
+        if isinstance(src, str):
+            if not os.path.isfile(src):
+                raise RuntimeError(f"file: {src} does not exists")
+            if mode is None:
+                mode = stat.S_IMODE(os.stat(src).st_mode)
+            # 按块从文件读取,不把整个文件读入内存
+            src = open(src, 'rb')
+            close_src = True
+        if isinstance(src, (bytes, bytearray, memoryview)):
+            src = memoryview(src).cast('B')
+            total = len(src)
+        else:
+            total = SyncConnection._get_readable_size(src)
+        mode = SyncConnection.DEFAULT_MODE if mode is None else mode
+
+        start_time = time.time()
+        transferred = 0
+        try:
+            await self._send_request(b'SEND', f'{remote},{mode}'.encode('utf-8'))
+            while True:
+                if isinstance(src, memoryview):
+                    chunk = src[transferred:transferred + self.DATA_MAX_LENGTH]
+                else:
+                    chunk = src.read(self.DATA_MAX_LENGTH)
+                if not len(chunk):
+                    break
+                self.conn.writer.write(struct.pack('<4sI', b'DATA', len(chunk)))
+                self.conn.writer.write(chunk)
+                await self.conn.writer.drain()
+                transferred += len(chunk)
+                self._callback(callback, transferred, total, start_time)
+        finally:
+            if close_src:
+                src.close()
+
+        await self.conn.send(struct.pack('<4sI', b'DONE', int(time.time())))
+        sync_id, length = struct.unpack('<4sI', await self.conn.recv(8))
+        if sync_id == b'FAIL':
+            message = (await self.conn.recv(length)).decode('utf-8', errors='replace')
+            raise AdbBaseError(f"sync push '{remote}' failed: {message}")
+        if sync_id != b'OKAY':
+            raise AdbError(stdout=None, stderr=None, message=f'sync push unexpected response {sync_id!r}')
+        return transferred
+
+    async def pull(self, remote: str, dst: SyncTarget = None,
+                   callback: Optional[SyncProgressCallback] = None) -> Union[int, bytes]:
+        """
+        从设备上读取文件
+
+        Args:
+            remote: 设备上的路径
+            dst: 本地文件路径/bytearray(追加写入)/memoryview(从头写入)/可写的文件对象;
+                 为None时直接返回bytes
+            callback: 进度回调函数 callback(已传输字节数, 总字节数, 传输速度byte/s)
+
+        Returns:
+            dst为None时返回文件内容,否则返回读取的字节数
+        """
+        total = (await self.stat(remote))[1] or None
+        close_buf = False
+        if dst is None:
+            buf = bytearray()
+        elif isinstance(dst, str):
+            # 每收到一个DATA数据包直接写入文件,不在内存中缓存整个文件
+            buf = open(dst, 'wb')
+            close_buf = True
+        elif isinstance(dst, memoryview):
+            buf = dst.cast('B')
+        else:
+            buf = dst
+
+        start_time = time.time()
+        transferred = 0
+        try:
+            await self._send_request(b'RECV', remote.encode('utf-8'))
+            while True:
+                sync_id, length = struct.unpack('<4sI', await self.conn.recv(8))
+                if sync_id == b'DONE':
+                    break
+                if sync_id == b'FAIL':
+                    message = (await self.conn.recv(length)).decode('utf-8', errors='replace')
+                    raise AdbBaseError(f"sync pull '{remote}' failed: {message}")
+                if sync_id != b'DATA':
+                    raise AdbError(stdout=None, stderr=None, message=f'sync pull unexpected response {sync_id!r}')
+                chunk = await self.conn.recv(length)
+                if isinstance(buf, bytearray):
+                    buf += chunk
+                elif isinstance(buf, memoryview):
+                    if transferred + length > len(buf):
+                        raise AdbBaseError(f"sync pull '{remote}' memoryview too small ({len(buf)} bytes)")
+                    buf[transferred:transferred + length] = chunk
+                else:
+                    buf.write(chunk)
+                transferred += length
+                self._callback(callback, transferred, total, start_time)
+        finally:
+            if close_buf:
+                buf.close()
+
+        if dst is None:
+            return bytes(buf)
+        return transferred
+
+    async def close(self) -> None:
+        try:
+            await self.conn.send(struct.pack('<4sI', b'QUIT', 0))
+        except (ConnectionError, OSError):
+            pass
+        await self.conn.close()
+
+    async def _send_request(self, sync_id: bytes, data: bytes) -> None:
+        await self.conn.send(struct.pack('<4sI', sync_id, len(data)) + data)
+
+    @staticmethod
+    def _callback(callback: Optional[SyncProgressCallback], transferred: int, total: Optional[int],
+                  start_time: float) -> None:
+        if callback:
+            elapsed = time.time() - start_time
+            callback(transferred, total, elapsed and transferred / elapsed or 0.0)
+
+
+class AsyncADBClient(object):
+    def __init__(self, device_id: Optional[str] = None, adb_path: Optional[str] = None,
+                 host: Optional[str] = ANDROID_ADB_SERVER_HOST,
+                 port: Optional[int] = ANDROID_ADB_SERVER_PORT):
+        """
+        ADBClient的asyncio版本, 通过socket直接与adb server通讯, 一个事件循环可以同时驱动大量设备
+
+        Args:
+            device_id (str): 指定设备名
+            adb_path (str): 指定adb路径
+            host (str): 指定连接地址
+            port (int): 指定连接端口
+        """
+        self.device_id = device_id
+        self.adb_path = adb_path or get_adb_exe()
+        self.__host = host
+        self.__port = port
+        self.cmd_options = [self.adb_path]
+        if self.host not in ('127.0.0.1', 'localhost'):
+            self.cmd_options += ['-H', self.host]
+        if self.port != ANDROID_ADB_SERVER_PORT:
+            self.cmd_options += ['-P', str(self.port)]
+
+    @property
+    def host(self) -> str:
+        return self.__host
+
+    @property
+    def port(self) -> int:
+        return self.__port
+
+    def get_device_id(self, decode: bool = False) -> str:
+        return decode and self.device_id.replace(':', '_') or self.device_id
+
+    async def server_version(self) -> int:
+        """
+        获得adb server版本
+
+        Returns:
+            adb server版本
+        """
+        return int(await self.host_request('host:version'), 16)
+
+    async def devices(self) -> Dict[str, str]:
+        """
+        request 'host:devices'
+
+        Returns:
+            devices dict key[device_name]-value[device_state]
+        """
+        pattern = re.compile(r'([\S]+)\t([\w]+)\n?')
+        ret = await self.host_request('host:devices')
+        return {value[0]: value[1] for value in pattern.findall(ret)}
+
+    async def status(self) -> Optional[str]:
+        """
+        request 'host-serial:<device_id>:get-state',返回当前设备状态
+
+        Returns:
+            当前设备状态
+        """
+        try:
+            return await self.host_request('get-state', devices=True)
+        except AdbDeviceConnectError as err:
+            if 'offline' in err.message:
+                return 'offline'
+            return None
+
+    async def features(self) -> List[str]:
+        """
+        获取adb server与设备共同支持的特性
+
+        Returns:
+            特性列表
+        """
+        if not hasattr(self, '_features'):
+            setattr(self, '_features', (await self.host_request('features', devices=True)).split(','))
+
+        return getattr(self, '_features')
+
+    async def forward(self, local: str, remote: str, no_rebind: Optional[bool] = True) -> None:
+        """
+        request 'host-serial:<device_id>:forward'
+
+        Args:
+            local:  要转发的本地端口
+            remote: 要与local绑定的设备端口
+            no_rebind: if True,如果local端已经绑定则失败
+
+        Returns:
+            None
+        """
+        service = no_rebind and f'forward:norebind:{local};{remote}' or f'forward:{local};{remote}'
+        await self.host_request(service, devices=True, response=False)
+
+    async def remove_forward(self, local: Optional[str] = None) -> None:
+        """
+        request 'host-serial:<device_id>:killforward'
+
+        Args:
+            local: 本地端口。如果未指定local,则默认清除所有连接
+
+        Returns:
+            None
+        """
+        service = local and f'killforward:{local}' or 'killforward-all'
+        await self.host_request(service, devices=True, response=False)
+
+    async def get_forwards(self, device_id: Optional[str] = None) -> Dict[str, List[Tuple[str, str]]]:
+        """
+        request 'host:list-forward'
+
+        Args:
+            device_id (str): 获取指定设备下的端口
+        Returns:
+            forwards dict key[device_name]-value[Tuple[local, remote]]
+        """
+        forwards = {}
+        pattern = re.compile(r'([\S]+)\s([\S]+)\s([\S]+)\n?')
+        for value in pattern.findall(await self.host_request('host:list-forward')):
+            if device_id and device_id != value[0]:
+                continue
+            forwards.setdefault(value[0], []).append((value[1], value[2]))
+        return forwards
+
+    async def push(self, local: SyncSource, remote: str, mode: Optional[int] = None,
+                   callback: Optional[SyncProgressCallback] = None) -> int:
+        """
+        通过sync协议发送数据到设备上
+
+        Args:
+            local: 本地文件路径,或者bytes/bytearray/memoryview,或者任意可读的文件对象
+            remote: 设备上的路径
+            mode: 文件权限
+            callback: 进度回调函数
+
+        Returns:
+            发送的字节数
+        """
+        async with await self.sync() as sync:
+            return await sync.push(local, remote, mode=mode, callback=callback)
+
+    async def pull(self, remote: str, local: SyncTarget = None,
+                   callback: Optional[SyncProgressCallback] = None) -> Union[int, bytes]:
+        """
+        通过sync协议从设备上读取文件
+
+        Args:
+            remote: 设备上的路径
+            local: 本地文件路径/bytearray/memoryview/可写的文件对象,为None时直接返回bytes
+            callback: 进度回调函数
+
+        Returns:
+            local为None时返回文件内容,否则返回读取的字节数
+        """
+        async with await self.sync() as sync:
+            return await sync.pull(remote, local, callback=callback)
+
+    async def sync(self) -> AsyncSyncConnection:
+        """
+        打开一个adb sync连接
+
+        Returns:
+            AsyncSyncConnection
+        """
+        return AsyncSyncConnection(await self.transport_connection('sync:'))
+
+    async def cmd(self, cmds: Union[list, str], devices: Optional[bool] = True, decode: Optional[bool] = True,
+                  timeout: Optional[float] = None, skip_error: Optional[bool] = False):
+        """
+        通过asyncio子进程运行adb命令, 并返回命令返回值
+
+        Args:
+            cmds (list,str): 需要运行的参数
+            devices (bool): 如果为True,则需要指定device-id,命令中会传入-s
+            decode (bool): 是否解码stdout,stderr
+            timeout (int): 设置命令超时时间
+            skip_error (bool): 是否跳过报错
+        Raises:
+            AdbDeviceConnectError: 设备连接异常
+            AdbTimeout:输入命令超时
+        Returns:
+            返回命令结果stdout
+        """
+        cmds = split_cmd(cmds)
+        if devices:
+            if not self.device_id:
+                raise NoDeviceSpecifyError('must set device_id')
+            cmds = self.cmd_options + ['-s', self.device_id] + cmds
+        else:
+            cmds = self.cmd_options + cmds
+
+        logger.info(' '.join(cmds))
+        proc = await asyncio.create_subprocess_exec(*cmds, stdin=asyncio.subprocess.PIPE,
+                                                    stdout=asyncio.subprocess.PIPE,
+                                                    stderr=asyncio.subprocess.PIPE)
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.communicate()
+            raise AdbTimeout(f"cmd command {' '.join(cmds)} time out")
+
+        if decode:
+            stdout = stdout.decode(get_std_encoding(stdout))
+            stderr = stderr.decode(get_std_encoding(stderr))
+
+        if proc.returncode > 0:
+            pattern = AdbDeviceConnectError.CONNECT_ERROR
+            if isinstance(stderr, bytes):
+                pattern = pattern.encode("utf-8")
+            if re.search(pattern, stderr):
+                raise AdbDeviceConnectError(stderr)
+            if not skip_error:
+                raise AdbError(stdout, stderr)
+
+        return stdout
+
+    async def create_connection(self) -> AsyncAdbConnection:
+        """
+        创建一个连接到adb server的socket,adb server未启动时会尝试启动
+
+        Returns:
+            AsyncAdbConnection
+        """
+        try:
+            return await AsyncAdbConnection.open(self.host, self.port)
+        except ConnectionRefusedError:
+            await self.cmd('start-server', devices=False)
+            return await AsyncAdbConnection.open(self.host, self.port)
+
+    async def host_request(self, service: str, devices: Optional[bool] = False,
+                           response: Optional[bool] = True) -> Optional[str]:
+        """
+        通过socket向adb server发送host请求
+
+        Args:
+            service: 请求内容, devices为False时需要自带'host:'前缀
+            devices: 如果为True,则需要指定device-id,请求会以'host-serial:<device_id>:'开头
+            response: 是否读取adb server返回的字符串
+
+        Returns:
+            adb server返回的字符串
+        """
+        if devices:
+            if not self.device_id:
+                raise NoDeviceSpecifyError('must set device_id')
+            service = f'host-serial:{self.device_id}:{service}'
+
+        async with await self.create_connection() as conn:
+            await conn.request(service)
+            if response:
+                return await conn.read_string()
+            ret = await conn.read_until_close()
+            if ret.startswith(AdbConnection.FAIL):
+                AdbConnection.raise_fail(ret[8:].decode('utf-8', errors='replace'))
+            return None
+
+    async def transport_connection(self, service: str) -> AsyncAdbConnection:
+        """
+        创建一个切换到当前设备的连接,并打开设备上的服务
+
+        Args:
+            service: 设备服务,例如'shell:ls'/'sync:'/'exec:screencap'
+
+        Returns:
+            AsyncAdbConnection
+        """
+        if not self.device_id:
+            raise NoDeviceSpecifyError('must set device_id')
+
+        conn = await self.create_connection()
+        try:
+            await conn.request(f'host:transport:{self.device_id}')
+            await conn.request(service)
+        except BaseException:
+            await conn.close()
+            raise
+        return conn
+
+
+class AsyncADBShell(AsyncADBClient):
+    SHELL_ENCODING: Final[str] = 'utf-8'  # adb shell的编码
+    PROP_TTL: Optional[float] = ADBDevice.PROP_TTL  # getprop缓存有效时间(秒),为None时不过期
+
+    async def raw_shell(self, cmds: Union[list, str], decode: Optional[bool] = True,
+                        skip_error: Optional[bool] = False) -> Union[str, bytes]:
+        """
+        request 'shell:'
+
+        Args:
+            cmds (list): 需要运行的参数
+            decode (bool): 是否解码stdout
+            skip_error (bool): 是否跳过报错
+        Returns:
+            命令返回结果
+        """
+        stdout, stderr, returncode = await self.socket_shell(cmds)
+        if returncode and not skip_error:
+            raise AdbError(stdout, stderr)
+        if not decode:
+            return stdout
+
+        try:
+            return stdout.decode(self.SHELL_ENCODING)
+        except UnicodeDecodeError:
+            return str(repr(stdout))
+
+    async def shell(self, cmds: Union[list, str], decode: Optional[bool] = True,
+                    skip_error: Optional[bool] = False) -> Union[str, bytes]:
+        """
+        request 'shell:', 设备不支持shell_v2时通过echo获取退出码
+
+        Args:
+            cmds (list,str): 需要运行的参数
+            decode (bool): 是否解码stdout
+            skip_error (bool): 是否跳过报错
+        Raises:
+            AdbShellError:指定shell命令时出错
+        Returns:
+            命令返回结果
+        """
+        if 'shell_v2' in await self.features():
+            try:
+                return await self.raw_shell(cmds, decode=decode, skip_error=skip_error)
+            except AdbError as err:
+                raise AdbShellError(err.stdout, err.stderr)
+
+        cmds = split_cmd(cmds) + [';', 'echo', '---$?---']
+        ret = (await self.raw_shell(cmds, decode=decode)).rstrip()
+        pattern = decode and r"(.*)---(\d+)---$" or rb"(.*)---(\d+)---$"
+        if m := re.match(pattern, ret, re.DOTALL):
+            stdout, returncode = m.group(1), int(m.group(2))
+        else:
+            stdout, returncode = ret, 0
+
+        if returncode > 0 and not skip_error:
+            raise AdbShellError(stdout, stderr=None)
+        return stdout
+
+    async def socket_shell(self, cmds: Union[list, str]) -> Tuple[bytes, bytes, Optional[int]]:
+        """
+        通过socket运行shell命令
+
+        Args:
+            cmds: 需要运行的参数
+
+        Returns:
+            (stdout, stderr, 退出码),不支持shell_v2时stderr为空,退出码为None
+        """
+        cmds = ' '.join(split_cmd(cmds))
+        if 'shell_v2' in await self.features():
+            conn = await self.transport_connection(f'shell,v2,raw:{cmds}')
+            async with conn:
+                return await conn.read_shell_v2()
+
+        conn = await self.transport_connection(f'shell:{cmds}')
+        async with conn:
+            return await conn.read_until_close(), b'', None
+
+    async def exec_out(self, cmds: Union[list, str]) -> bytes:
+        """
+        request 'exec:', 以二进制读取命令的stdout
+
+        Args:
+            cmds: 需要运行的参数
+
+        Returns:
+            stdout
+        """
+        conn = await self.transport_connection(f"exec:{' '.join(split_cmd(cmds))}")
+        async with conn:
+            return await conn.read_until_close()
+
+    async def getprop(self, key: str, strip: Optional[bool] = True) -> Optional[str]:
+        """
+        command 'adb shell getprop <key>
+
+        Args:
+            key: 需要查询的参数
+            strip: 删除文本头尾空格
+
+        Returns:
+            getprop获取到的参数
+        """
+        ret = await self.raw_shell(['getprop', key])
+        return strip and ret.rstrip() or ret
+
+    async def props(self) -> Dict[str, str]:
+        """
+        command 'adb shell getprop', 一次获取设备的全部属性
+        结果会被缓存,超过PROP_TTL秒后再次访问时重新获取
+
+        Returns:
+            属性字典 key[属性名]-value[属性值]
+        """
+        props_time = getattr(self, '_props_time', None)
+        if props_time is None or (self.PROP_TTL is not None and time.time() - props_time > self.PROP_TTL):
+            return await self.refresh_props()
+
+        return getattr(self, '_props')
+
+    async def refresh_props(self) -> Dict[str, str]:
+        """
+        重新获取设备的全部属性
+
+        Returns:
+            属性字典 key[属性名]-value[属性值]
+        """
+        props = ADBDevice.parse_props(await self.raw_shell(['getprop']))
+        setattr(self, '_props', props)
+        setattr(self, '_props_time', time.time())
+        return props
+
+    async def _cached_prop(self, key: str) -> str:
+        return (await self.props()).get(key, '')
+
+    async def model(self) -> str:
+        """
+        获取手机型号
+
+        Returns:
+            手机型号
+        """
+        return await self._cached_prop('ro.product.model')
+
+    async def manufacturer(self) -> str:
+        """
+        获取手机厂商名
+
+        Returns:
+            手机厂商名
+        """
+        return await self._cached_prop('ro.product.manufacturer')
+
+    async def android_version(self) -> str:
+        """
+        获取系统安卓版本
+
+        Returns:
+            安卓版本
+        """
+        return await self._cached_prop('ro.build.version.release')
+
+    async def sdk_version(self) -> int:
+        """
+        获取sdk版本
+
+        Returns:
+            sdk版本号
+        """
+        return int(await self._cached_prop('ro.build.version.sdk'))
+
+    async def abi_version(self) -> str:
+        """
+        获取abi版本
+
+        Returns:
+            abi版本
+        """
+        return await self._cached_prop('ro.product.cpu.abi')
+
+    async def cpu_abi(self) -> str:
+        """
+        获取cpu构架
+
+        Returns:
+            cpu构建
+        """
+        return await self.abi_version()
+
+    async def dpi(self) -> Optional[int]:
+        """
+        获取屏幕dpi
+
+        Returns:
+            dpi
+        """
+        if ret := await self._cached_prop('ro.sf.lcd_density'):
+            return int(ret)
+
+    async def cpu_coreNum(self) -> int:
+        """
+        获取cpu核心数量
+
+        Returns:
+            cpu核心数量
+        """
+        if not hasattr(self, '_cpu_coreNum'):
+            setattr(self, '_cpu_coreNum', (await self.shell('cat /proc/cpuinfo')).strip().count('processor'))
+
+        return getattr(self, '_cpu_coreNum')
+
+
+class AsyncADBDevice(AsyncADBShell):
+    async def screenshot(self, rect: Union[Rect, Tuple[int, int, int, int], List[int]] = None) -> np.ndarray:
+        """
+        request 'exec:screencap', 直接读取截图数据,不经过文件
+
+        Args:
+            rect: 自定义截取范围 Rect/(x, y, width, height)
+
+        Returns:
+            图像数据
+        """
+        raw = await self.exec_out('screencap')
+        return ADBDevice.parse_screencap(raw, rect)
+
+    async def tap(self, point: Tuple[int, int]) -> None:
+        """
+        command 'adb shell input tap' 点击屏幕
+
+        Args:
+            point: 坐标(x,y)
+
+        Returns:
+            None
+        """
+        await self.shell(f'input tap {point[0]} {point[1]}')
+
+    async def keyevent(self, keycode: Union[str, int]) -> None:
+        """
+        command 'adb shell input keyevent'
+
+        Args:
+            keycode: key code number or name
+
+        Returns:
+            None
+        """
+        await self.shell(['input', 'keyevent', str(keycode)])
+
+    async def start_app(self, package: str, activity: Optional[str] = None) -> None:
+        """
+        if not activity command 'adb shell monkey'
+        if activity command 'adb shell am start
+
+        Args:
+            package: package name
+            activity: activity name
+
+        Returns:
+            None
+        """
+        if not activity:
+            cmds = ['monkey', '-p', package, '-c', 'android.intent.category.LAUNCHER', '1']
+        else:
+            cmds = ['am', 'start', '-n', f'{package}/{package}.{activity}']
+        await self.shell(cmds)
+
+    async def stop_app(self, package: str) -> None:
+        """
+        command 'adb shell am force-stop' to force stop the application
+
+        Args:
+            package: package name
+
+        Returns:
+            None
+        """
+        await self.shell(['am', 'force-stop', package])
+
+
+__all__ = ['AsyncADBClient', 'AsyncADBShell', 'AsyncADBDevice']
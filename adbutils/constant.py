@@ -16,6 +16,9 @@ ANDROID_ADB_SERVER_HOST = '127.0.0.1'
 ANDROID_ADB_SERVER_PORT = 5037
 
 ANDROID_TMP_PATH = '/data/local/tmp/'
+# 设备静态信息的本地缓存目录,可以通过环境变量ADBUTILS_PROFILE_PATH修改
+ADB_PROFILE_PATH = os.environ.get('ADBUTILS_PROFILE_PATH',
+                                  os.path.join(os.path.expanduser('~'), '.adbutils', 'profile'))
 ADB_CAP_RAW_REMOTE_PATH = os.path.join(ANDROID_TMP_PATH, 'screencap.raw')
 
 ADB_CAP_RAW_LOCAL_PATH = './{device_id}.raw'
@@ -106,3 +109,6 @@ MNC_SO_LOCAL_PATH = os.path.join(STATICPATH, 'stf_libs', 'minicap-shared', 'aosp
 MNT_REMOTE_PATH = os.path.join(ANDROID_TMP_PATH, 'minitouch')
 MNT_LOCAL_NAME = 'minitouch_{device_id}'
 MNT_LOCAL_PATH = os.path.join(STATICPATH, 'stf_libs', '{abi_version}', 'minitouch')
+
+# event replay
+SENDEVENT_SCRIPT_REMOTE_PATH = os.path.join(ANDROID_TMP_PATH, 'adbutils_sendevent.sh')
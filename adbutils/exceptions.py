@@ -43,6 +43,9 @@ class AdbDeviceConnectError(AdbBaseError):
                     r"(device \'\S+\' not found)|" \
                     r"(cannot connect to daemon at [\w\:\s\.]+ Connection timed out)|" \
                     r"(device offline))"
+    # adb server通过socket返回的FAIL信息
+    SERVER_FAIL = r"(device \'\S+\' not found)|(device offline)|(device unauthorized)|" \
+                  r"(device still authorizing)|(no devices/emulators found)"
 
 
 class AdbInstallError(AdbBaseError):
@@ -1,11 +1,17 @@
 # -*- coding: utf-8 -*-
 from .apk import Apk
 from .minicap import Minicap
+from .minitouch import Minitouch
 from .rotation import Rotation
 from .performance.fps import Fps
 from .performance.cpu import Cpu
 from .performance.meminfo import Meminfo
-from .performance import DeviceWatcher
+from .performance import DeviceWatcher, PerformanceSampler, CpuStream
+from .fleet import DeviceFleet
+from .screen import ScreenStream
+from .event import EventRecorder, EventReplayer
 
 
-__all__ = ['Apk', 'Minicap', 'Rotation', 'Fps', 'Cpu', 'Meminfo', 'DeviceWatcher']
\ No newline at end of file
+__all__ = ['Apk', 'Minicap', 'Minitouch', 'Rotation', 'Fps', 'Cpu', 'Meminfo', 'DeviceWatcher', 'DeviceFleet',
+           'ScreenStream', 'EventRecorder', 'EventReplayer', 'PerformanceSampler',
+           'CpuStream']
\ No newline at end of file
@@ -220,9 +220,7 @@ class Apk(object):
         """
         if not self.device.check_file(ANDROID_TMP_PATH, 'aapt'):
             aapt_local_path = AAPT_LOCAL_PATH.format(abi_version=self.device.abi_version)
-            self.device.push(local=aapt_local_path, remote=AAPT_REMOTE_PATH)
-            time.sleep(1)
-            self.device.shell(['chmod', '755', AAPT_REMOTE_PATH])
+            self.device.push(local=aapt_local_path, remote=AAPT_REMOTE_PATH, mode=0o755)
 
     def _install_aapt2(self) -> None:
         """
@@ -233,8 +231,7 @@ class Apk(object):
         """
         if not self.device.check_file(ANDROID_TMP_PATH, 'aapt2'):
             aapt2_local_path = AAPT2_LOCAL_PATH.format(abi_version=self.device.abi_version)
-            self.device.push(local=aapt2_local_path, remote=AAPT2_REMOTE_PATH)
-            self.device.shell(['chmod', '755', AAPT2_REMOTE_PATH])
+            self.device.push(local=aapt2_local_path, remote=AAPT2_REMOTE_PATH, mode=0o755)
 
     def _install_busyBox(self) -> None:
         """
@@ -257,8 +254,7 @@ class Apk(object):
             else:
                 local = BUSYBOX_LOCAL_PATH.format('v8l')
 
-            self.device.push(local=local, remote=BUSYBOX_REMOTE_PATH)
-            self.device.shell(['chmod', '755', BUSYBOX_REMOTE_PATH])
+            self.device.push(local=local, remote=BUSYBOX_REMOTE_PATH, mode=0o755)
 
     def install(self) -> None:
         """
@@ -0,0 +1,428 @@
+# -*- coding: utf-8 -*-
+import itertools
+import re
+import struct
+import threading
+
+from loguru import logger
+
+from adbutils import ADBDevice
+from adbutils.constant import SENDEVENT_SCRIPT_REMOTE_PATH
+from adbutils.exceptions import AdbBaseError, AdbSDKVersionError
+from adbutils._utils import reg_cleanup
+
+from typing import NamedTuple, Optional, List, Dict, Tuple, Iterable, Final, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from adbutils.extra.minitouch import Minitouch
+
+
+# linux/input-event-codes.h
+EV_SYN: Final[int] = 0x00
+EV_ABS: Final[int] = 0x03
+SYN_REPORT: Final[int] = 0x00
+ABS_MT_SLOT: Final[int] = 0x2f
+ABS_MT_POSITION_X: Final[int] = 0x35
+ABS_MT_POSITION_Y: Final[int] = 0x36
+ABS_MT_TRACKING_ID: Final[int] = 0x39
+ABS_MT_PRESSURE: Final[int] = 0x3a
+
+# 文件格式:
+#   MAGIC + <2字节设备数量> + 每个设备<2字节长度><utf-8路径> + 多条事件记录
+#   事件记录为 <8字节double时间戳><1字节设备序号><2字节type><2字节code><4字节有符号value>
+MAGIC: Final[bytes] = b'ADBEVT01'
+EVENT_RECORD: Final[struct.Struct] = struct.Struct('<dBHHi')
+
+# getevent -t 的输出, like:
+#   [   86475.470302] /dev/input/event2: 0003 0039 000003e1
+EVENT_LINE: Final[re.Pattern] = re.compile(
+    rb'^\[\s*(\d+\.\d+)\]\s+(/dev/input/event\d+):\s+([0-9a-f]{4})\s+([0-9a-f]{4})\s+([0-9a-f]{8})')
+
+# linux/input.h struct input_event, 时间戳由内核填写,写入时为0
+INPUT_EVENT_32: Final[struct.Struct] = struct.Struct('<llHHi')
+INPUT_EVENT_64: Final[struct.Struct] = struct.Struct('<qqHHi')
+
+
+class InputEvent(NamedTuple):
+    timestamp: float  # 设备内核时间(秒)
+    device: str  # 输入设备路径
+    type: int
+    code: int
+    value: int
+
+
+def parse_event_line(line: bytes) -> Optional[InputEvent]:
+    """
+    解析一行getevent -t的输出
+
+    Args:
+        line: getevent输出的一行
+
+    Returns:
+        InputEvent, 不是事件的行(例如设备列表)返回None
+    """
+    if not (m := EVENT_LINE.match(line)):
+        return None
+    value = int(m.group(5), 16)
+    if value & 0x80000000:
+        value -= 1 << 32
+    return InputEvent(float(m.group(1)), m.group(2).decode('ascii'), int(m.group(3), 16), int(m.group(4), 16),
+                      value)
+
+
+def save_events(events: Iterable[InputEvent], path: str) -> int:
+    """
+    把事件保存为二进制文件
+
+    Args:
+        events: 事件列表
+        path: 保存路径
+
+    Returns:
+        保存的事件数量
+    """
+    events = list(events)
+    devices = sorted({event.device for event in events})
+    device_index = {device: index for index, device in enumerate(devices)}
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<H', len(devices)))
+        for device in devices:
+            name = device.encode('utf-8')
+            f.write(struct.pack('<H', len(name)))
+            f.write(name)
+        for event in events:
+            f.write(EVENT_RECORD.pack(event.timestamp, device_index[event.device], event.type, event.code,
+                                      event.value))
+    return len(events)
+
+
+def load_events(path: str) -> List[InputEvent]:
+    """
+    读取save_events保存的文件
+
+    Args:
+        path: 文件路径
+
+    Raises:
+        AdbBaseError: 文件格式错误
+    Returns:
+        事件列表
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        raise AdbBaseError(f'{path} is not an input event record')
+
+    offset = len(MAGIC)
+    count, = struct.unpack_from('<H', data, offset)
+    offset += 2
+    devices = []
+    for _ in range(count):
+        length, = struct.unpack_from('<H', data, offset)
+        offset += 2
+        devices.append(data[offset:offset + length].decode('utf-8'))
+        offset += length
+
+    end = offset + (len(data) - offset) // EVENT_RECORD.size * EVENT_RECORD.size
+    return [InputEvent(timestamp, devices[index], _type, code, value)
+            for timestamp, index, _type, code, value in EVENT_RECORD.iter_unpack(data[offset:end])]
+
+
+class EventRecorder(object):
+    def __init__(self, device: ADBDevice):
+        """
+        通过getevent -t录制设备上的输入事件
+
+        Examples:
+            with EventRecorder(device) as recorder:
+                time.sleep(10)
+            recorder.save('touch.evt')
+
+        Args:
+            device: 设备类
+        """
+        self.device = device
+        self.events: List[InputEvent] = []
+        self.touch_range: Optional[Tuple[int, int]] = None  # 录制设备触摸屏的(max_x, max_y)
+        self._proc = None
+        self._t: Optional[threading.Thread] = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def __str__(self):
+        return f"<EventRecorder ({self.running and 'Start' or 'Close'})> events:{len(self.events)}"
+
+    @property
+    def running(self) -> bool:
+        return self._t is not None and self._t.is_alive()
+
+    def start(self) -> None:
+        """
+        开始录制, 会清空之前录制的事件
+
+        Returns:
+            None
+        """
+        if self.running:
+            return
+        self.events = []
+        max_x, max_y = self.device.getMaxXY()
+        self.touch_range = (max_x, max_y) if max_x and max_y else None
+        # 使用数字格式(-t而不是-lt), 可以直接用于sendevent回放
+        self._proc = self.device.start_shell(['getevent', '-t'])
+        reg_cleanup(self._proc.kill)
+        self._t = threading.Thread(target=self._run, args=(self._proc,), name='event_recorder', daemon=True)
+        self._t.start()
+
+    def stop(self) -> None:
+        """
+        停止录制
+
+        Returns:
+            None
+        """
+        if self._proc:
+            self._proc.kill()
+            self._proc = None
+        if self._t and self._t is not threading.current_thread():
+            self._t.join()
+        self._t = None
+
+    def save(self, path: str) -> int:
+        """
+        保存录制的事件
+
+        Args:
+            path: 保存路径
+
+        Returns:
+            保存的事件数量
+        """
+        return save_events(self.events, path)
+
+    def _run(self, proc) -> None:
+        append = self.events.append
+        for line in iter(proc.stdout.readline, b''):
+            if event := parse_event_line(line):
+                append(event)
+        logger.debug(f'{self} getevent finished')
+
+
+class EventReplayer(object):
+    def __init__(self, device: ADBDevice, events: Iterable[InputEvent],
+                 touch_range: Optional[Tuple[int, int]] = None):
+        """
+        回放录制的输入事件, 事件之间的等待在设备上完成
+
+        Args:
+            device: 设备类
+            events: 录制的事件, 可以是EventRecorder.events或者load_events的结果
+            touch_range: 录制设备触摸屏的(max_x, max_y), 即EventRecorder.touch_range;
+                         为None时认为在录制的设备上回放, 使用当前设备的触摸屏范围
+        """
+        self.device = device
+        self.events = sorted(events, key=lambda event: event.timestamp)
+        self.touch_range = touch_range
+
+    def __str__(self):
+        return f"<EventReplayer> events:{len(self.events)}"
+
+    def replay(self, minitouch: Optional['Minitouch'] = None) -> None:
+        """
+        回放事件, 传入minitouch时通过minitouch回放触摸事件,否则通过sendevent脚本回放全部事件
+
+        Args:
+            minitouch: Minitouch
+
+        Returns:
+            None
+        """
+        if minitouch is not None:
+            self.replay_by_minitouch(minitouch)
+        else:
+            self.replay_by_sendevent()
+
+    def replay_by_sendevent(self) -> None:
+        """
+        生成回放脚本,通过sync发送到设备后运行
+        同一帧(SYN_REPORT之间)的事件打包成input_event结构体,一次写入/dev/input/eventX;
+        每一帧按照相对脚本开始的绝对时间等待,误差不会累积
+
+        Raises:
+            AdbSDKVersionError: sdk版本低于23, sleep不支持小数
+        Returns:
+            None
+        """
+        if (version := self.device.sdk_version) < 23:
+            raise AdbSDKVersionError(f'replay_by_sendevent: API < 23 not supported (version={version})')
+        if not self.events:
+            return
+
+        script = self.build_sendevent_script('64' in self.device.abi_version)
+        with self.device.sync() as sync:
+            sync.push(script.encode('utf-8'), SENDEVENT_SCRIPT_REMOTE_PATH, mode=0o755)
+        self.device.shell(['sh', SENDEVENT_SCRIPT_REMOTE_PATH])
+
+    def replay_by_minitouch(self, minitouch: 'Minitouch') -> None:
+        """
+        把多点触控事件转换为minitouch命令后一次发送, 只回放触摸屏的事件
+        坐标从录制设备的触摸屏范围(touch_range)缩放到minitouch的坐标范围
+
+        Args:
+            minitouch: Minitouch
+
+        Returns:
+            None
+        """
+        if cmds := self.build_minitouch_cmds(minitouch):
+            minitouch.send(cmds)
+
+    def build_sendevent_script(self, is_64bit: bool = True) -> str:
+        """
+        生成回放脚本
+
+        每一帧先等待到相对开始时间的偏移(毫秒), 再用printf把整帧的input_event一次写入设备
+        当前时间通过shell内置的read读取/proc/uptime, 精度为10ms;
+        只比较与开始时间的差值,避免mksh的32位整数溢出
+
+        Args:
+            is_64bit: 设备是否为64位, 决定input_event中timeval的大小
+
+        Returns:
+            脚本内容
+        """
+        input_event = INPUT_EVENT_64 if is_64bit else INPUT_EVENT_32
+        lines = [
+            'read -r up _ < /proc/uptime; S0=${up%.*}; c=${up#*.}; C0=$((${c#0} * 10))',
+            # wait <ms>: 等待到开始后的第ms毫秒
+            'wait_until() { read -r up _ < /proc/uptime; c=${up#*.}; '
+            'd=$(($1 - ((${up%.*} - S0) * 1000 + ${c#0} * 10 - C0))); '
+            'if [ $d -gt 0 ]; then m=$((d % 1000 + 1000)); sleep $((d / 1000)).${m#1}; fi; }',
+        ]
+        start = None
+        for frame in self._split_frames(self.events):
+            if start is None:
+                start = frame[0].timestamp
+            lines.append(f'wait_until {int(round((frame[0].timestamp - start) * 1000))}')
+            # 同一帧中可能包含多个输入设备的事件, 按设备连续的部分分别写入
+            for device, events in itertools.groupby(frame, key=lambda event: event.device):
+                data = b''.join(input_event.pack(0, 0, event.type, event.code, event.value) for event in events)
+                escaped = ''.join('\\%03o' % b for b in data)
+                lines.append(f"printf '{escaped}' > {device}")
+        return '\n'.join(lines) + '\n'
+
+    def build_minitouch_cmds(self, minitouch: 'Minitouch') -> str:
+        """
+        把触摸屏事件转换为minitouch命令, 支持Type B多点触控协议(ABS_MT_SLOT/ABS_MT_TRACKING_ID)
+
+        Args:
+            minitouch: Minitouch
+
+        Returns:
+            minitouch命令
+        """
+        if not (touch_device := self._get_touch_device()):
+            logger.warning(f'{self} no touch event found')
+            return ''
+        if minitouch.max_contacts is None:
+            minitouch.start_server()
+        scale = self._get_minitouch_scale(minitouch)
+
+        slot = 0
+        contacts: Dict[int, dict] = {}  # slot: {x, y, pressure, state, active}
+        changed = set()
+        cmds = []
+        last_ms = None
+        for event in self.events:
+            if event.device != touch_device:
+                continue
+            if event.type == EV_ABS:
+                if event.code == ABS_MT_SLOT:
+                    slot = event.value
+                    continue
+                contact = contacts.setdefault(slot, {'x': None, 'y': None, 'pressure': None, 'state': None,
+                                                            'active': False})
+                if event.code == ABS_MT_TRACKING_ID:
+                    contact['state'] = 'up' if event.value == -1 else 'down'
+                elif event.code == ABS_MT_POSITION_X:
+                    contact['x'] = event.value
+                elif event.code == ABS_MT_POSITION_Y:
+                    contact['y'] = event.value
+                elif event.code == ABS_MT_PRESSURE:
+                    contact['pressure'] = event.value
+                changed.add(slot)
+            elif event.type == EV_SYN and event.code == SYN_REPORT:
+                frame = self._minitouch_frame(minitouch, contacts, changed, scale)
+                changed.clear()
+                if not frame:
+                    continue
+                ms = int(round(event.timestamp * 1000))
+                if last_ms is not None and ms > last_ms:
+                    cmds.append(f'w {ms - last_ms}\n')
+                last_ms = ms
+                cmds += frame
+                cmds.append('c\n')
+        return ''.join(cmds)
+
+    def _minitouch_frame(self, minitouch: 'Minitouch', contacts: Dict[int, dict],
+                         changed: set, scale: Tuple[float, float]) -> List[str]:
+        frame = []
+        for slot in sorted(changed):
+            contact = contacts[slot]
+            if slot >= minitouch.max_contacts:
+                logger.warning(f'{self} slot {slot} exceeds max contacts {minitouch.max_contacts}, skip')
+                continue
+            if contact['state'] == 'up':
+                if contact['active']:
+                    frame.append(f'u {slot}\n')
+                contacts.pop(slot)
+                continue
+            if contact['x'] is None or contact['y'] is None:
+                continue
+            action = 'm' if contact['active'] else 'd'
+            contact['active'] = True
+            frame.append(f"{action} {slot} {int(contact['x'] * scale[0])} {int(contact['y'] * scale[1])} "
+                         f"{minitouch._get_pressure(contact['pressure'])}\n")
+        return frame
+
+    def _get_minitouch_scale(self, minitouch: 'Minitouch') -> Tuple[float, float]:
+        """
+        录制坐标到minitouch坐标的缩放比例
+
+        Raises:
+            AdbBaseError: 无法获取录制设备的触摸屏范围
+        Returns:
+            (x缩放比例, y缩放比例)
+        """
+        max_x, max_y = self.touch_range or self.device.getMaxXY()
+        if not max_x or not max_y:
+            raise AdbBaseError(f'{self} unknown touch range of the recorded events, set touch_range')
+        return minitouch.max_x / max_x, minitouch.max_y / max_y
+
+    def _get_touch_device(self) -> Optional[str]:
+        for event in self.events:
+            if event.type == EV_ABS and event.code in (ABS_MT_POSITION_X, ABS_MT_POSITION_Y):
+                return event.device
+        return None
+
+    @staticmethod
+    def _split_frames(events: List[InputEvent]) -> List[List[InputEvent]]:
+        """ 按SYN_REPORT切分为帧, 帧的时间为第一个事件的时间 """
+        frames, frame = [], []
+        for event in events:
+            frame.append(event)
+            if event.type == EV_SYN and event.code == SYN_REPORT:
+                frames.append(frame)
+                frame = []
+        if frame:
+            frames.append(frame)
+        return frames
+
+
+__all__ = ['EventRecorder', 'EventReplayer', 'InputEvent', 'parse_event_line', 'save_events', 'load_events']
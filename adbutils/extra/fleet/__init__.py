@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+
+from loguru import logger
+
+from adbutils import ADBClient, ADBDevice, DeviceTracker
+from adbutils.exceptions import AdbTimeout
+from adbutils.constant import ANDROID_ADB_SERVER_HOST, ANDROID_ADB_SERVER_PORT, IP_PATTERN
+
+from typing import Union, Optional, Callable, Dict, List, Any, Iterable, NamedTuple, Final
+
+
+# FleetResult.status
+STATUS_OK: Final[str] = 'ok'
+STATUS_ERROR: Final[str] = 'error'
+STATUS_SKIPPED: Final[str] = 'skipped'  # 被device_filter过滤, 没有运行
+STATUS_TIMEOUT: Final[str] = 'timeout'  # map等待超时时还没有完成
+
+
+class FleetResult(NamedTuple):
+    """ 单台设备的运行结果 """
+    device_id: str
+    result: Any
+    error: Optional[BaseException]
+    elapsed: float  # 运行耗时,单位秒,不包含排队等待时间
+    status: str  # STATUS_OK/STATUS_ERROR/STATUS_SKIPPED/STATUS_TIMEOUT
+
+    @property
+    def ok(self) -> bool:
+        return self.status == STATUS_OK
+
+    @property
+    def skipped(self) -> bool:
+        return self.status == STATUS_SKIPPED
+
+
+class DeviceFleet(object):
+    def __init__(self, adb_path: Optional[str] = None,
+                 host: Optional[str] = ANDROID_ADB_SERVER_HOST,
+                 port: Optional[int] = ANDROID_ADB_SERVER_PORT,
+                 use_socket: Optional[bool] = False,
+                 max_workers: int = 16, max_per_host: int = 4,
+                 host_key: Optional[Callable[[str], str]] = None):
+        """
+        多设备调度, 每台设备一个工作线程, 按全局/按主机限制同时运行的数量
+
+        Args:
+            adb_path: 指定adb路径
+            host: adb server地址
+            port: adb server端口
+            use_socket: 创建的ADBDevice是否通过socket与adb server通讯
+            max_workers: 全局最多同时运行的设备数量
+            max_per_host: 同一个主机(adb server/USB hub或网络设备所在ip)最多同时运行的设备数量
+            host_key: 根据device_id返回主机名的函数,默认网络设备使用ip,
+                      usb设备使用所在的USB hub(adb devices -l中的usb路径),获取不到usb路径时每台设备单独计算
+        """
+        self.client = ADBClient(adb_path=adb_path, host=host, port=port, use_socket=use_socket)
+        self.use_socket = use_socket
+        self.max_per_host = max_per_host
+        self.host_key = host_key or self._default_host_key
+
+        self._global_semaphore = threading.BoundedSemaphore(max_workers)
+        self._host_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._workers: Dict[str, ThreadPoolExecutor] = {}
+        self._devices: Dict[str, Future] = {}
+        self._usb_paths: Dict[str, str] = {}  # device_id: adb devices -l中的usb路径, like: 1-1.2
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __str__(self):
+        return f"<DeviceFleet devices:{len(self._workers)}> adb server:{self.client.host}:{self.client.port}"
+
+    @property
+    def device_ids(self) -> List[str]:
+        """
+        当前已发现的设备
+
+        Returns:
+            device_id列表
+        """
+        with self._lock:
+            return list(self._workers)
+
+    def discover(self) -> List[str]:
+        """
+        command 'adb devices', 为新设备创建工作线程, 移除已经断开的设备
+
+        Returns:
+            在线的device_id列表
+        """
+        devices = self._list_devices()
+        online = [device_id for device_id, info in devices.items() if info['state'] == 'device']
+        with self._lock:
+            self._usb_paths = {device_id: info['usb'] for device_id, info in devices.items() if info.get('usb')}
+            for device_id in list(self._workers):
+                if device_id not in online:
+                    logger.info(f'fleet remove device: {device_id}')
+                    self._workers.pop(device_id).shutdown(wait=False)
+                    self._devices.pop(device_id, None)
+
+            for device_id in online:
+                if device_id not in self._workers:
+                    logger.info(f'fleet add device: {device_id}')
+                    worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'fleet_{device_id}')
+                    self._workers[device_id] = worker
+                    # 设备在自己的工作线程里初始化,多台设备可以并行初始化
+                    self._devices[device_id] = worker.submit(self._create_device, device_id)
+        return online
+
+    def get_device(self, device_id: str) -> ADBDevice:
+        """
+        获取设备对象, 设备还在初始化时会等待初始化完成
+
+        Args:
+            device_id: 设备名
+
+        Returns:
+            ADBDevice
+        """
+        with self._lock:
+            future = self._devices[device_id]
+        return future.result()
+
+    def submit(self, func: Union[str, Callable[..., Any]], *args,
+               device_ids: Optional[Iterable[str]] = None,
+               device_filter: Optional[Callable[[ADBDevice], bool]] = None, **kwargs) -> Dict[str, Future]:
+        """
+        向设备的工作线程提交任务
+
+        Args:
+            func: ADBDevice的方法名/属性名,或者是一个以ADBDevice为第一个参数的函数
+            *args: 传给func的参数
+            device_ids: 需要运行的device_id,默认为所有已发现设备
+            device_filter: 过滤函数,返回False的设备会跳过运行,结果为STATUS_SKIPPED; 与func一样受并发数量限制
+            **kwargs: 传给func的参数
+
+        Returns:
+            以device_id为键的Future字典, Future的结果为FleetResult
+        """
+        if not self._workers:
+            self.discover()
+
+        with self._lock:
+            device_ids = list(device_ids) if device_ids is not None else list(self._workers)
+            futures = {}
+            for device_id in device_ids:
+                if device_id not in self._workers:
+                    raise KeyError(f"device '{device_id}' not found in fleet")
+                futures[device_id] = self._workers[device_id].submit(
+                    self._run, device_id, func, args, kwargs, device_filter)
+        return futures
+
+    def map(self, func: Union[str, Callable[..., Any]], *args,
+            device_ids: Optional[Iterable[str]] = None,
+            device_filter: Optional[Callable[[ADBDevice], bool]] = None,
+            wait_timeout: Optional[float] = None, **kwargs) -> Dict[str, FleetResult]:
+        """
+        在多台设备上运行同一个任务, 并等待全部完成
+
+        Examples:
+            fleet.map('screenshot')
+            fleet.map('install', 'app.apk', device_filter=lambda d: d.sdk_version >= 24)
+            fleet.map(lambda device, package: device.stop_app(package), 'com.xx.xx')
+
+        Args:
+            func: ADBDevice的方法名/属性名,或者是一个以ADBDevice为第一个参数的函数
+            *args: 传给func的参数
+            device_ids: 需要运行的device_id,默认为所有已发现设备
+            device_filter: 过滤函数,返回False的设备会跳过运行
+            wait_timeout: 等待超时时间, 超时未完成的设备结果为STATUS_TIMEOUT, 还没有开始运行的任务会被取消
+            **kwargs: 传给func的参数
+
+        Returns:
+            以device_id为键的FleetResult字典
+        """
+        futures = self.submit(func, *args, device_ids=device_ids, device_filter=device_filter, **kwargs)
+        done, _ = wait(futures.values(), timeout=wait_timeout)
+        results = {}
+        for device_id, future in futures.items():
+            if future in done:
+                results[device_id] = future.result()
+            else:
+                future.cancel()
+                results[device_id] = FleetResult(device_id, None, AdbTimeout(f'fleet {device_id} wait timeout'),
+                                                 wait_timeout, STATUS_TIMEOUT)
+        return results
+
+    def close(self) -> None:
+        """
+        关闭所有工作线程
+
+        Returns:
+            None
+        """
+        with self._lock:
+            for worker in self._workers.values():
+                worker.shutdown(wait=False)
+            self._workers.clear()
+            self._devices.clear()
+
+    def _create_device(self, device_id: str) -> ADBDevice:
+        with self._semaphore(device_id):
+            return ADBDevice(device_id=device_id, adb_path=self.client.adb_path, host=self.client.host,
+                             port=self.client.port, use_socket=self.use_socket)
+
+    def _run(self, device_id: str, func: Union[str, Callable[..., Any]], args: tuple, kwargs: dict,
+             device_filter: Optional[Callable[[ADBDevice], bool]] = None) -> FleetResult:
+        try:
+            device = self._devices[device_id].result()
+        except Exception as err:
+            return FleetResult(device_id, None, err, 0.0, STATUS_ERROR)
+
+        with self._semaphore(device_id):
+            start_time = time.time()
+            try:
+                # 过滤函数通常也需要与设备通讯, 同样受并发数量限制
+                if device_filter and not device_filter(device):
+                    return FleetResult(device_id, None, None, time.time() - start_time, STATUS_SKIPPED)
+            except Exception as err:
+                return FleetResult(device_id, None, err, time.time() - start_time, STATUS_ERROR)
+
+            try:
+                if callable(func):
+                    ret = func(device, *args, **kwargs)
+                else:
+                    ret = getattr(device, func)
+                    if callable(ret):
+                        ret = ret(*args, **kwargs)
+            except Exception as err:
+                logger.error(f'fleet {device_id} {getattr(func, "__name__", func)} error: {err!r}')
+                return FleetResult(device_id, None, err, time.time() - start_time, STATUS_ERROR)
+            return FleetResult(device_id, ret, None, time.time() - start_time, STATUS_OK)
+
+    def _semaphore(self, device_id: str) -> '_FleetSemaphore':
+        host = self.host_key(device_id)
+        with self._lock:
+            if host not in self._host_semaphores:
+                self._host_semaphores[host] = threading.BoundedSemaphore(self.max_per_host)
+            host_semaphore = self._host_semaphores[host]
+        return _FleetSemaphore(self._global_semaphore, host_semaphore)
+
+    def _list_devices(self) -> Dict[str, Dict[str, str]]:
+        """ command 'adb devices -l', 返回包含state/usb等字段的设备信息 """
+        if self.use_socket:
+            ret = self.client.host_request('host:devices-l')
+        else:
+            ret = self.client.cmd(['devices', '-l'], devices=False)
+            # 去掉'List of devices attached'
+            ret = '\n'.join(line for line in ret.splitlines() if not line.startswith('List of devices'))
+        return DeviceTracker._parse(ret)
+
+    def _default_host_key(self, device_id: str) -> str:
+        if ':' in device_id and IP_PATTERN.match(device_id):
+            return device_id.split(':')[0]
+        if usb_path := self._usb_paths.get(device_id):
+            # 1-1.2 为1号总线1号口hub上的2号口, 1-2 为1号总线根hub的2号口; 同一个hub上的设备共享带宽
+            hub = usb_path.rpartition('.')[0] if '.' in usb_path else usb_path.partition('-')[0]
+            return f'{self.client.host}/usb:{hub}'
+        return f'{self.client.host}/{device_id}'
+
+
+class _FleetSemaphore(object):
+    """ 先获取主机信号量,再获取全局信号量,避免同一主机的任务占满全局名额 """
+    def __init__(self, global_semaphore: threading.BoundedSemaphore, host_semaphore: threading.BoundedSemaphore):
+        self.global_semaphore = global_semaphore
+        self.host_semaphore = host_semaphore
+
+    def __enter__(self):
+        self.host_semaphore.acquire()
+        self.global_semaphore.acquire()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.global_semaphore.release()
+        self.host_semaphore.release()
+
+
+__all__ = ['DeviceFleet', 'FleetResult', 'STATUS_OK', 'STATUS_ERROR', 'STATUS_SKIPPED', 'STATUS_TIMEOUT']
@@ -6,11 +6,15 @@ from loguru import logger
 from adbutils.constant import (ANDROID_TMP_PATH, MNC_REMOTE_PATH, MNC_SO_REMOTE_PATH, MNC_CMD, MNC_CAP_LOCAL_PATH,
                                MNC_LOCAL_NAME, MNC_LOCAL_PATH, MNC_SO_LOCAL_PATH)
 from adbutils.extra.minicap.exceptions import MinicapStartError, MinicapServerConnectError
+from adbutils.extra.minicap.stream import MinicapStream, MinicapBanner
+from adbutils.extra.minicap.decoder import FrameDecoder, decode_frame
+from adbutils.extra.minicap.broadcaster import MinicapBroadcaster, Subscription
+from adbutils.extra.minicap.recorder import MjpegRecorder, MjpegReader
 from adbutils import ADBDevice
 from adbutils._utils import NonBlockingStreamReader, reg_cleanup, SafeSocket
 from adbutils._wraps import threadsafe_generator
 
-from typing import Tuple
+from typing import Tuple, Optional
 import struct
 import subprocess
 
@@ -18,15 +22,24 @@ import subprocess
 class Minicap(object):
     RECVTIMEOUT = None
 
-    def __init__(self, device: ADBDevice, rotation_watcher=None):
+    def __init__(self, device: ADBDevice, rotation_watcher=None,
+                 size: Optional[Tuple[int, int]] = None, scale: Optional[float] = None,
+                 quality: Optional[int] = None, max_fps: Optional[int] = None, skip_frames: bool = False):
         """
         初始化minicap
 
         Args:
             device: 设备类
             rotation_watcher: 方向监控函数
+            size: 输出图像的分辨率(width, height),以竖屏方向为准,默认为屏幕分辨率
+            scale: 输出图像相对屏幕分辨率的缩放比例,指定size时无效
+            quality: jpg质量0-100,默认使用minicap的默认值
+            max_fps: 最大帧率,默认不限制
+            skip_frames: 读取速度跟不上时丢弃旧的帧(minicap -S), 只保留最新的画面
         """
         self.device = device
+        self.size, self.scale, self.quality, self.max_fps = self._check_params(size, scale, quality, max_fps)
+        self.skip_frames = skip_frames
         self.MNC_LOCAL_NAME = MNC_LOCAL_NAME.format(device_id=self.device.device_id)  # minicap在设备上的转发名
         self.MNC_PORT = None  # minicap在电脑上使用的端口
         self.quirk_flag = 0
@@ -54,8 +67,14 @@ class Minicap(object):
         """
         self._set_minicap_forward()
         param = self._get_params()
-        proc = self.device.start_shell([MNC_CMD, f"-n '{self.MNC_LOCAL_NAME}'", '-P',
-                                        "%dx%d@%dx%d/%d 2>&1" % param])
+        cmds = [MNC_CMD, f"-n '{self.MNC_LOCAL_NAME}'", '-P', "%dx%d@%dx%d/%d" % param]
+        if self.quality is not None:
+            cmds += ['-Q', str(self.quality)]
+        if self.max_fps:
+            cmds += ['-r', str(self.max_fps)]
+        if self.skip_frames:
+            cmds += ['-S']
+        proc = self.device.start_shell(cmds + ['2>&1'])
 
         nbsp = NonBlockingStreamReader(proc.stdout)
         while True:
@@ -72,8 +91,8 @@ class Minicap(object):
             raise MinicapStartError('minicap server quit immediately')
         reg_cleanup(proc.kill)
         time.sleep(.5)
-        # self.proc = proc
-        # self.nbsp = nbsp
+        self.proc = proc
+        self.nbsp = nbsp
         self.server_flag = True
 
     def teardown(self) -> None:
@@ -86,9 +105,11 @@ class Minicap(object):
         logger.debug('minicap server teardown')
         if self.proc:
             self.proc.kill()
+            self.proc = None
 
         if self.nbsp:
             self.nbsp.kill()
+            self.nbsp = None
 
         if self.MNC_PORT and self.device.get_forward_port(remote=self.MNC_LOCAL_NAME):
             self.device.remove_forward(local=f'tcp:{self.MNC_PORT}')
@@ -120,33 +141,88 @@ class Minicap(object):
         """
         if not self.device.check_file(ANDROID_TMP_PATH, 'minicap'):
             self.device.push(local=MNC_LOCAL_PATH.format(abi_version=self.device.abi_version),
-                             remote=MNC_REMOTE_PATH)
-            time.sleep(1)
-            self.device.shell(['chmod', '755', MNC_REMOTE_PATH])
+                             remote=MNC_REMOTE_PATH, mode=0o755)
 
         if not self.device.check_file(ANDROID_TMP_PATH, 'minicap.so'):
             self.device.push(local=MNC_SO_LOCAL_PATH.format(abi_version=self.device.abi_version,
                                                             sdk_version=self.device.sdk_version),
-                             remote=MNC_SO_REMOTE_PATH)
-            time.sleep(1)
-            self.device.shell(['chmod', '755', MNC_SO_REMOTE_PATH])
+                             remote=MNC_SO_REMOTE_PATH, mode=0o755)
+
+    def set_params(self, size: Optional[Tuple[int, int]] = None, scale: Optional[float] = None,
+                   quality: Optional[int] = None, max_fps: Optional[int] = None,
+                   skip_frames: Optional[bool] = None) -> None:
+        """
+        修改minicap参数,服务已经启动时会重启服务, 为None的参数保持当前值
+
+        Args:
+            size: 输出图像的分辨率(width, height),以竖屏方向为准
+            scale: 输出图像相对屏幕分辨率的缩放比例, 只传入scale时会清除当前的size
+            quality: jpg质量0-100
+            max_fps: 最大帧率
+            skip_frames: 读取速度跟不上时丢弃旧的帧(minicap -S)
+
+        Raises:
+            ValueError: 参数错误
+        Returns:
+            None
+        """
+        if size is None and scale is None:
+            # size优先于scale, 只传入scale时需要清除size,新的scale才会生效
+            size = self.size
+        params = self._check_params(size,
+                                    self.scale if scale is None else scale,
+                                    self.quality if quality is None else quality,
+                                    self.max_fps if max_fps is None else max_fps)
+        skip_frames = self.skip_frames if skip_frames is None else skip_frames
+        if params == (self.size, self.scale, self.quality, self.max_fps) and skip_frames == self.skip_frames:
+            return
+
+        self.size, self.scale, self.quality, self.max_fps = params
+        self.skip_frames = skip_frames
+        if self.server_flag:
+            logger.info('minicap params changed, restart server')
+            self.teardown()
+            self.start_server()
+
+    @staticmethod
+    def _check_params(size: Optional[Tuple[int, int]], scale: Optional[float],
+                      quality: Optional[int], max_fps: Optional[int]) -> \
+            Tuple[Optional[Tuple[int, int]], Optional[float], Optional[int], Optional[int]]:
+        if size is not None:
+            size = tuple(int(v) for v in size)
+            if len(size) != 2 or min(size) <= 0:
+                raise ValueError(f'size must be (width, height), got {size}')
+        if scale is not None and not 0 < scale <= 1:
+            raise ValueError(f'scale must be in (0, 1], got {scale}')
+        if quality is not None and not 0 <= quality <= 100:
+            raise ValueError(f'quality must be in [0, 100], got {quality}')
+        if max_fps is not None and max_fps <= 0:
+            raise ValueError(f'max_fps must be positive, got {max_fps}')
+        return size, scale, quality, max_fps
 
     def _get_params(self) -> Tuple[int, int, int, int, int]:
         """
         获取minicap命令需要的屏幕分辨率参数
 
         Returns:
-            None
+            (real_width, real_height, virtual_width, virtual_height, rotation)
         """
         display_info = self.device.displayInfo
         real_width = display_info['width']
         real_height = display_info['height']
         real_rotation = display_info['rotation']
 
+        if self.size:
+            virtual_width, virtual_height = self.size
+        elif self.scale:
+            virtual_width, virtual_height = int(real_width * self.scale), int(real_height * self.scale)
+        else:
+            virtual_width, virtual_height = real_width, real_height
+
         if self.quirk_flag & 2 and real_rotation in (90, 270):
-            params = real_height, real_width, real_height, real_width, 0
+            params = real_height, real_width, virtual_height, virtual_width, 0
         else:
-            params = real_width, real_height, real_width, real_height, real_rotation
+            params = real_width, real_height, virtual_width, virtual_height, real_rotation
 
         return params
 
@@ -163,18 +239,40 @@ class Minicap(object):
         logger.debug("minicap update_rotation: {}", rotation)
         self._update_rotation_event.set()
 
-    def get_frame(self):
+    def check_rotation(self) -> bool:
         """
-        获取屏幕截图
+        屏幕方向变化后,重启minicap服务
 
         Returns:
-            图像数据
+            是否重启了服务
         """
         if self._update_rotation_event.is_set():
             logger.info('minicap update_rotation')
             self.teardown()
             self.start_server()
             self._update_rotation_event.clear()
+            return True
+        return False
+
+    def get_stream(self) -> MinicapStream:
+        """
+        创建一个与minicap保持长连接的帧读取器
+
+        Returns:
+            已经启动的MinicapStream
+        """
+        stream = MinicapStream(self)
+        stream.start()
+        return stream
+
+    def get_frame(self):
+        """
+        获取屏幕截图
+
+        Returns:
+            图像数据
+        """
+        self.check_rotation()
 
         try:
             return self._get_frame()
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+import threading
+from collections import deque
+
+from loguru import logger
+
+from adbutils.exceptions import AdbTimeout
+from adbutils.extra.minicap.stream import MinicapStream
+
+from typing import Optional, Tuple, Deque, List, Iterator, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from adbutils.extra.minicap import Minicap
+
+
+Frame = Tuple[bytearray, int, float]  # (jpg数据, 帧序号, 接收时间)
+
+
+class Subscription(object):
+    def __init__(self, broadcaster: 'MinicapBroadcaster', maxsize: int = 2, max_fps: Optional[float] = None):
+        """
+        订阅者的帧队列, 队列满时丢弃最旧的帧
+
+        Args:
+            broadcaster: 所属的广播器
+            maxsize: 队列长度
+            max_fps: 最大帧率,超过时跳过帧,默认不限制
+        """
+        if maxsize <= 0:
+            raise ValueError(f'maxsize must be positive, got {maxsize}')
+        self.broadcaster = broadcaster
+        self.max_fps = max_fps
+        self._queue: Deque[Frame] = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self._last_timestamp = 0.0
+        self._dropped = 0
+        self.closed = False
+
+    def __iter__(self) -> Iterator[Frame]:
+        while True:
+            try:
+                yield self.get()
+            except AdbTimeout:
+                return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __str__(self):
+        return f"<Subscription ({self.closed and 'Closed' or 'Open'})> " \
+               f"queue:{len(self._queue)}/{self._queue.maxlen} dropped:{self._dropped}"
+
+    @property
+    def dropped(self) -> int:
+        """ 因为队列已满而丢弃的帧数量, 不包含因为帧率限制跳过的帧 """
+        return self._dropped
+
+    def get(self, timeout: Optional[float] = None) -> Frame:
+        """
+        获取队列中最旧的一帧, 队列为空时等待
+
+        Args:
+            timeout: 等待超时时间
+
+        Raises:
+            AdbTimeout: 等待超时,或者订阅已经关闭
+        Returns:
+            (jpg数据, 帧序号, 接收时间), jpg数据被所有订阅者共享,不要修改
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._queue or self.closed, timeout):
+                raise AdbTimeout(f'{self} wait frame timeout')
+            if not self._queue:
+                raise AdbTimeout(f'{self} closed')
+            return self._queue.popleft()
+
+    def close(self) -> None:
+        """
+        取消订阅
+
+        Returns:
+            None
+        """
+        self.broadcaster.unsubscribe(self)
+
+    def _put(self, frame: Frame) -> None:
+        timestamp = frame[2]
+        if self.max_fps and timestamp - self._last_timestamp < 1 / self.max_fps:
+            return
+        self._last_timestamp = timestamp
+
+        with self._cond:
+            if len(self._queue) == self._queue.maxlen:
+                self._dropped += 1
+            self._queue.append(frame)
+            self._cond.notify_all()
+
+    def _close(self) -> None:
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class MinicapBroadcaster(object):
+    def __init__(self, minicap: 'Minicap'):
+        """
+        持有设备唯一的minicap连接,把每一帧分发给所有订阅者
+        帧数据在订阅者之间共享,不会复制
+
+        Args:
+            minicap: 已经安装好的Minicap
+        """
+        self.minicap = minicap
+        self.stream = MinicapStream(minicap)
+        self._subscriptions: List[Subscription] = []
+        self._lock = threading.Lock()
+        self._kill_event = threading.Event()
+        self._t: Optional[threading.Thread] = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def __str__(self):
+        return f"<MinicapBroadcaster ({self.running and 'Start' or 'Close'})> " \
+               f"subscribers:{len(self._subscriptions)}"
+
+    @property
+    def running(self) -> bool:
+        return self._t is not None and self._t.is_alive()
+
+    def subscribe(self, maxsize: int = 2, max_fps: Optional[float] = None) -> Subscription:
+        """
+        添加一个订阅者
+
+        Args:
+            maxsize: 队列长度,队列满时丢弃最旧的帧
+            max_fps: 最大帧率,默认不限制
+
+        Returns:
+            Subscription
+        """
+        subscription = Subscription(self, maxsize=maxsize, max_fps=max_fps)
+        with self._lock:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """
+        移除订阅者
+
+        Args:
+            subscription: subscribe返回的订阅
+
+        Returns:
+            None
+        """
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+        subscription._close()
+
+    def start(self) -> None:
+        """
+        启动minicap连接和分发线程
+
+        Returns:
+            None
+        """
+        if self.running:
+            return
+        self.stream.start()
+        self._kill_event.clear()
+        self._t = threading.Thread(target=self._run, name='minicap_broadcaster', daemon=True)
+        self._t.start()
+
+    def stop(self) -> None:
+        """
+        停止分发并断开minicap连接, 所有订阅会被关闭
+
+        Returns:
+            None
+        """
+        self._kill_event.set()
+        self.stream.stop()
+        if self._t and self._t is not threading.current_thread():
+            self._t.join()
+        self._t = None
+
+        with self._lock:
+            subscriptions, self._subscriptions = self._subscriptions, []
+        for subscription in subscriptions:
+            subscription._close()
+
+    def _run(self) -> None:
+        while not self._kill_event.is_set():
+            try:
+                frame = self.stream.next(timeout=1)
+            except AdbTimeout:
+                if not self.stream.running:
+                    self._kill_event.wait(1)
+                continue
+
+            with self._lock:
+                subscriptions = list(self._subscriptions)
+            for subscription in subscriptions:
+                try:
+                    subscription._put(frame)
+                except Exception as err:
+                    logger.error(f'{self} publish to {subscription} error: {err!r}')
+
+
+__all__ = ['MinicapBroadcaster', 'Subscription']
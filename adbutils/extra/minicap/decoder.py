@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+
+import cv2
+import numpy as np
+from loguru import logger
+
+from adbutils.exceptions import AdbTimeout
+
+from typing import Optional, Tuple, Deque, Union, Final, Dict, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from adbutils.extra.minicap.stream import MinicapStream
+
+
+# 解码时缩小的倍数-imdecode参数, libjpeg在解码阶段直接缩小,比解码后再resize快
+REDUCE_FLAGS: Final[Dict[int, int]] = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+def decode_frame(frame: Union[bytes, bytearray, memoryview], reduce: int = 1) -> Optional[np.ndarray]:
+    """
+    把jpg数据解码为BGR图像
+
+    Args:
+        frame: jpg数据
+        reduce: 解码时缩小的倍数,可选1/2/4/8
+
+    Raises:
+        ValueError: reduce参数错误
+    Returns:
+        BGR图像,解码失败时为None
+    """
+    if reduce not in REDUCE_FLAGS:
+        raise ValueError(f'reduce must be one of {list(REDUCE_FLAGS)}, got {reduce}')
+    return cv2.imdecode(np.frombuffer(frame, dtype=np.uint8), REDUCE_FLAGS[reduce])
+
+
+class FrameDecoder(object):
+    def __init__(self, stream: 'MinicapStream', workers: int = 2, reduce: int = 1,
+                 max_pending: Optional[int] = None, executor: Optional[ThreadPoolExecutor] = None):
+        """
+        在线程池中解码MinicapStream的jpg帧,只保留最新解码完成的一帧
+        等待解码的帧超过max_pending时丢弃最旧的帧,解码速度跟不上时不会积压延迟
+
+        Args:
+            stream: 帧数据来源
+            workers: 解码线程数量,传入executor时无效
+            reduce: 解码时缩小的倍数,可选1/2/4/8
+            max_pending: 最多等待解码的帧数量,默认与workers相同
+            executor: 共享的线程池,多个设备可以共用一个线程池
+        """
+        if reduce not in REDUCE_FLAGS:
+            raise ValueError(f'reduce must be one of {list(REDUCE_FLAGS)}, got {reduce}')
+        self.stream = stream
+        self.reduce = reduce
+        self.max_pending = max_pending or workers
+        self._own_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=workers, thread_name_prefix='minicap_decode')
+
+        self._cond = threading.Condition()
+        self._image: Optional[np.ndarray] = None
+        self._timestamp = 0.0
+        self._seq = 0  # 最新解码完成的帧序号
+        self._read_seq = 0  # next()已经返回的帧序号
+        self._pending: Deque[Future] = deque()
+        self._dropped = 0
+        self._kill_event = threading.Event()
+        self._t: Optional[threading.Thread] = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def __str__(self):
+        return f"<FrameDecoder ({self.running and 'Start' or 'Close'})> reduce:{self.reduce} " \
+               f"decoded:{self._seq} dropped:{self._dropped}"
+
+    @property
+    def running(self) -> bool:
+        return self._t is not None and self._t.is_alive()
+
+    @property
+    def dropped(self) -> int:
+        """ 因为解码速度不足而丢弃的帧数量 """
+        return self._dropped
+
+    def start(self) -> None:
+        """
+        启动解码, stream没有启动时会同时启动stream
+
+        Returns:
+            None
+        """
+        if self.running:
+            return
+        self.stream.start()
+        self._kill_event.clear()
+        self._t = threading.Thread(target=self._run, name='minicap_decoder', daemon=True)
+        self._t.start()
+
+    def stop(self) -> None:
+        """
+        停止解码,不会停止stream
+
+        Returns:
+            None
+        """
+        self._kill_event.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._t and self._t is not threading.current_thread():
+            self._t.join()
+        self._t = None
+        for future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        if self._own_executor:
+            self._executor.shutdown(wait=False)
+
+    def latest(self) -> Tuple[Optional[np.ndarray], int, float]:
+        """
+        获取最新解码完成的一帧,不会等待
+
+        Returns:
+            (BGR图像, 帧序号, 接收时间), 还没有解码完成的帧时为(None, 0, 0.0)
+        """
+        with self._cond:
+            return self._image, self._seq, self._timestamp
+
+    def next(self, timeout: Optional[float] = None) -> Tuple[np.ndarray, int, float]:
+        """
+        等待一帧还没有通过next()获取过的新图像
+
+        Args:
+            timeout: 等待超时时间
+
+        Raises:
+            AdbTimeout: 等待超时,或者解码已经停止
+        Returns:
+            (BGR图像, 帧序号, 接收时间)
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > self._read_seq or self._kill_event.is_set(), timeout):
+                raise AdbTimeout(f'{self} wait next frame timeout')
+            if self._seq <= self._read_seq:
+                raise AdbTimeout(f'{self} stopped')
+            self._read_seq = self._seq
+            return self._image, self._seq, self._timestamp
+
+    def _run(self) -> None:
+        while not self._kill_event.is_set():
+            try:
+                frame, seq, timestamp = self.stream.next(timeout=1)
+            except AdbTimeout:
+                if not self.stream.running:
+                    self._kill_event.wait(1)
+                continue
+
+            while self._pending and self._pending[0].done():
+                self._pending.popleft()
+            # 丢弃最旧的还没有开始解码的帧
+            while len(self._pending) >= self.max_pending:
+                if self._pending.popleft().cancel():
+                    with self._cond:
+                        self._dropped += 1
+            self._pending.append(self._executor.submit(self._decode, frame, seq, timestamp))
+
+    def _decode(self, frame: bytearray, seq: int, timestamp: float) -> None:
+        image = decode_frame(frame, self.reduce)
+        if image is None:
+            logger.warning(f'{self} decode frame {seq} error')
+            return
+
+        with self._cond:
+            # 解码完成的顺序可能与接收顺序不同,只保留更新的帧
+            if seq > self._seq:
+                self._image, self._seq, self._timestamp = image, seq, timestamp
+                self._cond.notify_all()
+            else:
+                self._dropped += 1
+
+
+__all__ = ['FrameDecoder', 'decode_frame']
@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+import bisect
+import os
+import struct
+import threading
+
+from loguru import logger
+
+from adbutils.exceptions import AdbTimeout, AdbBaseError
+
+from typing import Optional, Tuple, List, Iterator, Final, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from adbutils.extra.minicap.broadcaster import MinicapBroadcaster, Subscription
+
+
+# 文件格式:
+#   数据文件: MAGIC + 多个帧记录, 帧记录为 <4字节小端长度><8字节double时间戳><jpg数据>
+#   索引文件(数据文件路径+'.idx'): 每一帧一条 <8字节小端偏移量><8字节double时间戳>
+MAGIC: Final[bytes] = b'ADBMJPG1'
+FRAME_HEADER: Final[struct.Struct] = struct.Struct('<Id')
+INDEX_ENTRY: Final[struct.Struct] = struct.Struct('<Qd')
+
+
+class MjpegRecorder(object):
+    def __init__(self, broadcaster: 'MinicapBroadcaster', path: str, queue_size: int = 64):
+        """
+        把minicap的jpg帧原样写入文件,不重新编码; 写入在后台线程中进行
+
+        Args:
+            broadcaster: 帧数据来源
+            path: 数据文件路径, 索引文件为path+'.idx'
+            queue_size: 等待写入的最大帧数,磁盘写入跟不上时丢弃最旧的帧
+        """
+        self.broadcaster = broadcaster
+        self.path = path
+        self.index_path = path + '.idx'
+        self.queue_size = queue_size
+        self.frames = 0  # 已经写入的帧数
+
+        self._subscription: Optional['Subscription'] = None
+        self._kill_event = threading.Event()
+        self._t: Optional[threading.Thread] = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def __str__(self):
+        return f"<MjpegRecorder ({self.running and 'Start' or 'Close'})> {self.path} frames:{self.frames}"
+
+    @property
+    def running(self) -> bool:
+        return self._t is not None and self._t.is_alive()
+
+    @property
+    def dropped(self) -> int:
+        """ 因为写入速度不足而丢弃的帧数量 """
+        return self._subscription.dropped if self._subscription else 0
+
+    def start(self) -> None:
+        """
+        开始录制, 文件已经存在时会被覆盖
+
+        Returns:
+            None
+        """
+        if self.running:
+            return
+        self.frames = 0
+        self._kill_event.clear()
+        self._subscription = self.broadcaster.subscribe(maxsize=self.queue_size)
+        self.broadcaster.start()
+        self._t = threading.Thread(target=self._run, name='mjpeg_recorder', daemon=True)
+        self._t.start()
+
+    def stop(self) -> None:
+        """
+        停止录制,写入队列中剩余的帧后关闭文件
+
+        Returns:
+            None
+        """
+        self._kill_event.set()
+        if self._subscription:
+            self._subscription.close()
+        if self._t and self._t is not threading.current_thread():
+            self._t.join()
+        self._t = None
+
+    def _run(self) -> None:
+        with open(self.path, 'wb') as data_file, open(self.index_path, 'wb') as index_file:
+            data_file.write(MAGIC)
+            offset = len(MAGIC)
+            # 订阅关闭后get会在队列取空时抛出AdbTimeout
+            while True:
+                try:
+                    frame, _, timestamp = self._subscription.get(timeout=1)
+                except AdbTimeout:
+                    if self._kill_event.is_set() or self._subscription.closed:
+                        break
+                    continue
+
+                try:
+                    data_file.write(FRAME_HEADER.pack(len(frame), timestamp))
+                    data_file.write(frame)
+                    index_file.write(INDEX_ENTRY.pack(offset, timestamp))
+                except OSError as err:
+                    logger.error(f'{self} write error: {err!r}')
+                    break
+                offset += FRAME_HEADER.size + len(frame)
+                self.frames += 1
+        logger.info(f'{self} finished')
+
+
+class MjpegReader(object):
+    def __init__(self, path: str):
+        """
+        读取MjpegRecorder录制的文件, 通过索引快速定位任意一帧
+        索引文件缺失、不完整(例如录制被中断)或者与数据文件不一致时,会从第一条错误的索引开始扫描数据文件重建索引
+
+        Args:
+            path: 数据文件路径
+
+        Raises:
+            AdbBaseError: 文件格式错误
+        """
+        self.path = path
+        self.index_path = path + '.idx'
+        self._file = open(path, 'rb')
+        if self._file.read(len(MAGIC)) != MAGIC:
+            self._file.close()
+            raise AdbBaseError(f'{path} is not a minicap mjpeg record')
+
+        self._offsets, self.timestamps = self._load_index()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __getitem__(self, index: int) -> Tuple[bytes, float]:
+        return self.read(index)
+
+    def __iter__(self) -> Iterator[Tuple[bytes, float]]:
+        for index in range(len(self)):
+            yield self.read(index)
+
+    def __str__(self):
+        return f"<MjpegReader> {self.path} frames:{len(self)}"
+
+    @property
+    def duration(self) -> float:
+        """ 录制时长(秒) """
+        return self.timestamps[-1] - self.timestamps[0] if self.timestamps else 0.0
+
+    def read(self, index: int) -> Tuple[bytes, float]:
+        """
+        读取第index帧
+
+        Args:
+            index: 帧序号,从0开始,支持负数
+
+        Returns:
+            (jpg数据, 时间戳)
+        """
+        self._file.seek(self._offsets[index])
+        length, timestamp = FRAME_HEADER.unpack(self._file.read(FRAME_HEADER.size))
+        return self._file.read(length), timestamp
+
+    def find(self, timestamp: float) -> int:
+        """
+        查找时间戳之前(包含)的最后一帧
+
+        Args:
+            timestamp: 时间戳
+
+        Returns:
+            帧序号, 时间戳早于第一帧时返回0
+        """
+        return max(bisect.bisect_right(self.timestamps, timestamp) - 1, 0)
+
+    def extract(self, index: int, path: str) -> str:
+        """
+        把第index帧保存为jpg文件
+
+        Args:
+            index: 帧序号
+            path: 保存路径
+
+        Returns:
+            保存路径
+        """
+        frame, _ = self.read(index)
+        with open(path, 'wb') as f:
+            f.write(frame)
+        return path
+
+    def close(self) -> None:
+        self._file.close()
+
+    def _load_index(self) -> Tuple[List[int], List[float]]:
+        data_size = os.path.getsize(self.path)
+        offsets, timestamps = [], []
+        # 逐条检查索引: 每条索引需要指向上一帧的结尾,且帧头的时间戳一致,帧数据完整; 遇到第一条错误的索引时停止
+        offset = len(MAGIC)
+        if os.path.isfile(self.index_path):
+            with open(self.index_path, 'rb') as f:
+                data = f.read()
+            for index_offset, index_timestamp in INDEX_ENTRY.iter_unpack(
+                    data[:len(data) - len(data) % INDEX_ENTRY.size]):
+                if index_offset != offset or offset + FRAME_HEADER.size > data_size:
+                    break
+                self._file.seek(offset)
+                length, timestamp = FRAME_HEADER.unpack(self._file.read(FRAME_HEADER.size))
+                if timestamp != index_timestamp or offset + FRAME_HEADER.size + length > data_size:
+                    break
+                offsets.append(offset)
+                timestamps.append(timestamp)
+                offset += FRAME_HEADER.size + length
+
+        if offset == data_size:
+            return offsets, timestamps
+
+        logger.warning(f'{self.path} index incomplete, scanning frames')
+        while offset + FRAME_HEADER.size <= data_size:
+            self._file.seek(offset)
+            length, timestamp = FRAME_HEADER.unpack(self._file.read(FRAME_HEADER.size))
+            if offset + FRAME_HEADER.size + length > data_size:
+                break
+            offsets.append(offset)
+            timestamps.append(timestamp)
+            offset += FRAME_HEADER.size + length
+        return offsets, timestamps
+
+
+__all__ = ['MjpegRecorder', 'MjpegReader']
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+import socket
+import struct
+import threading
+import time
+
+from loguru import logger
+
+from adbutils._utils import SafeSocket
+from adbutils.exceptions import AdbTimeout
+
+from typing import Optional, Tuple, NamedTuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from adbutils.extra.minicap import Minicap
+
+
+class MinicapBanner(NamedTuple):
+    """ Global header binary format https://github.com/openstf/minicap#global-header-binary-format """
+    version: int
+    header_size: int
+    pid: int
+    real_width: int
+    real_height: int
+    virtual_width: int
+    virtual_height: int
+    orientation: int
+    quirks: int
+
+
+class MinicapStream(object):
+    RETRY_DELAY = 1  # 连接断开后的重连间隔
+
+    def __init__(self, minicap: 'Minicap'):
+        """
+        与minicap保持一个长连接,在后台线程中持续读取帧数据,只保留最新的一帧
+
+        Args:
+            minicap: 已经安装好的Minicap
+        """
+        self.minicap = minicap
+        self.banner: Optional[MinicapBanner] = None
+
+        self._cond = threading.Condition()
+        self._frame: Optional[bytearray] = None
+        self._timestamp = 0.0
+        self._seq = 0  # 已经读取的帧序号
+        self._read_seq = 0  # next()已经返回的帧序号
+        self._sock: Optional[SafeSocket] = None
+        self._kill_event = threading.Event()
+        self._t: Optional[threading.Thread] = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def __str__(self):
+        return f"<MinicapStream ({self.running and 'Start' or 'Close'})> port:{self.minicap.MNC_PORT} " \
+               f"frames:{self._seq}"
+
+    @property
+    def running(self) -> bool:
+        return self._t is not None and self._t.is_alive()
+
+    @property
+    def seq(self) -> int:
+        """ 最新一帧的序号,从1开始,还没有收到帧时为0 """
+        return self._seq
+
+    def start(self) -> None:
+        """
+        启动读取线程, minicap服务没有启动时会先启动服务
+
+        Returns:
+            None
+        """
+        if self.running:
+            return
+        self._kill_event.clear()
+        self._t = threading.Thread(target=self._run, name='minicap_stream', daemon=True)
+        self._t.start()
+
+    def stop(self) -> None:
+        """
+        停止读取线程并断开连接
+
+        Returns:
+            None
+        """
+        self._kill_event.set()
+        self._close_socket()
+        with self._cond:
+            self._cond.notify_all()
+        if self._t and self._t is not threading.current_thread():
+            self._t.join()
+        self._t = None
+
+    def latest(self) -> Tuple[Optional[bytearray], int, float]:
+        """
+        获取最新的一帧,不会等待
+
+        Returns:
+            (jpg数据, 帧序号, 接收时间), 还没有收到帧时为(None, 0, 0.0)
+        """
+        with self._cond:
+            return self._frame, self._seq, self._timestamp
+
+    def next(self, timeout: Optional[float] = None) -> Tuple[bytearray, int, float]:
+        """
+        等待一帧还没有通过next()获取过的新图像, 中间错过的帧会被丢弃
+
+        Args:
+            timeout: 等待超时时间
+
+        Raises:
+            AdbTimeout: 等待超时,或者读取线程已经停止
+        Returns:
+            (jpg数据, 帧序号, 接收时间)
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > self._read_seq or self._kill_event.is_set(), timeout):
+                raise AdbTimeout(f'{self} wait next frame timeout')
+            if self._seq <= self._read_seq:
+                raise AdbTimeout(f'{self} stopped')
+            self._read_seq = self._seq
+            return self._frame, self._seq, self._timestamp
+
+    def _run(self) -> None:
+        while not self._kill_event.is_set():
+            try:
+                self._connect()
+                while not self._kill_event.is_set():
+                    if self.minicap.check_rotation():
+                        # 屏幕方向变化后服务已经重启,需要重新连接
+                        break
+                    self._read_frame()
+            except Exception as err:
+                if self._kill_event.is_set():
+                    # stop()关闭了socket, 读取中断属于正常退出
+                    logger.debug(f'{self} stopped: {err!r}')
+                    return
+                if isinstance(err, (socket.error, struct.error, OSError)):
+                    logger.warning(f'{self} read error: {err!r}')
+                    # 服务可能正在被其他线程重启(例如修改参数),只在进程已经退出时清理
+                    if (proc := self.minicap.proc) is None or proc.poll() is not None:
+                        self.minicap.teardown()
+                else:
+                    logger.error(f'{self} error: {err!r}')
+                self._kill_event.wait(self.RETRY_DELAY)
+            finally:
+                self._close_socket()
+
+    def _connect(self) -> None:
+        if not self.minicap.server_flag:
+            self.minicap.start_server()
+
+        sock = SafeSocket()
+        sock.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.connect((self.minicap.device.host, self.minicap.MNC_PORT))
+        self._sock = sock
+
+        self.banner = MinicapBanner(*struct.unpack('<2B5I2B', sock.recv(24)))
+        self.minicap.quirk_flag = self.banner.quirks
+        logger.debug(f'{self} banner: {self.banner}')
+
+    def _read_frame(self) -> None:
+        frame_size, = struct.unpack('<I', self._sock.recv(4))
+        frame = self._sock.recv_exact(frame_size)
+        with self._cond:
+            self._frame, self._timestamp = frame, time.time()
+            self._seq += 1
+            self._cond.notify_all()
+
+    def _close_socket(self) -> None:
+        if sock := self._sock:
+            self._sock = None
+            try:
+                # 先shutdown,唤醒阻塞在recv上的读取线程
+                sock.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
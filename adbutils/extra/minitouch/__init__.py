@@ -1 +1,366 @@
 # -*- coding: utf-8 -*-
+import re
+import socket
+import threading
+import time
+
+from loguru import logger
+from baseImage import Point
+
+from adbutils import ADBDevice
+from adbutils.constant import ANDROID_TMP_PATH, MNT_REMOTE_PATH, MNT_LOCAL_NAME, MNT_LOCAL_PATH
+from adbutils.extra.minitouch.exceptions import MinitouchStartError, MinitouchServerConnectError
+from adbutils.extra.minitouch.gesture import Gesture
+from adbutils._utils import NonBlockingStreamReader, reg_cleanup, SafeSocket
+
+from typing import Tuple, Union, Optional
+
+
+class Minitouch(object):
+    DEFAULT_PRESSURE = 50
+    CONNECT_RETRIES = 10
+
+    def __init__(self, device: ADBDevice, rotation_watcher=None):
+        """
+        初始化minitouch
+
+        Args:
+            device: 设备类
+            rotation_watcher: 方向监控函数
+        """
+        self.device = device
+        self.MNT_LOCAL_NAME = MNT_LOCAL_NAME.format(device_id=self.device.device_id)  # minitouch在设备上的转发名
+        self.MNT_PORT = None  # minitouch在电脑上使用的端口
+        self.server_flag = False  # 判断minitouch服务是否启动
+        self.proc = None
+        self.nbsp = None
+        self.sock: Optional[SafeSocket] = None
+
+        # banner信息
+        self.version = None
+        self.max_contacts = None
+        self.max_x = None
+        self.max_y = None
+        self.max_pressure = None
+        self.pid = None
+
+        self.display_size: Optional[Tuple[int, int]] = None  # 自然方向(竖屏)的屏幕分辨率
+        self.orientation = 0
+        self._lock = threading.Lock()
+
+        if rotation_watcher:
+            rotation_watcher.reg_callback(self.update_rotation)
+        self._install_minitouch()
+
+    def __str__(self):
+        return f"<minitouch ({self.server_flag and 'Start' or 'Close'})> port:{self.MNT_PORT}" \
+               f"\tlocal_name:{self.MNT_LOCAL_NAME}"
+
+    def start_server(self) -> None:
+        """
+        开启minitouch服务,并建立连接
+
+        Raises:
+            MinitouchStartError: minitouch server start error
+        Returns:
+            None
+        """
+        self._set_minitouch_forward()
+        display_info = self.device.displayInfo
+        self.display_size = display_info['width'], display_info['height']
+        self.orientation = display_info['orientation']
+
+        proc = self.device.start_shell([MNT_REMOTE_PATH, '-n', f"'{self.MNT_LOCAL_NAME}'", '2>&1'])
+        nbsp = NonBlockingStreamReader(proc.stdout)
+        while True:
+            line = nbsp.readline(timeout=5)
+            if line is None:
+                raise MinitouchStartError("minitouch server setup timeout")
+            if b'Unable to' in line or b'not found' in line:
+                raise MinitouchStartError(f"minitouch server setup error: {line.strip()!r}")
+            if b'detected on' in line:
+                logger.info('minitouch server setup')
+                break
+
+        if proc.poll() is not None:
+            raise MinitouchStartError('minitouch server quit immediately')
+        reg_cleanup(proc.kill)
+        self.proc = proc
+        self.nbsp = nbsp
+        self._connect()
+        self.server_flag = True
+
+    def teardown(self) -> None:
+        """
+        关闭minitouch服务
+
+        Returns:
+            None
+        """
+        logger.debug('minitouch server teardown')
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+
+        if self.proc:
+            self.proc.kill()
+            self.proc = None
+
+        if self.nbsp:
+            self.nbsp.kill()
+            self.nbsp = None
+
+        if self.MNT_PORT and self.device.get_forward_port(remote=f'localabstract:{self.MNT_LOCAL_NAME}'):
+            self.device.remove_forward(local=f'tcp:{self.MNT_PORT}')
+
+        self.server_flag = False
+
+    def update_rotation(self, orientation: int) -> None:
+        """
+        更新屏幕方向
+
+        Args:
+            orientation: 屏幕方向 0/1/2/3
+
+        Returns:
+            None
+        """
+        logger.debug("minitouch update_rotation: {}", orientation)
+        self.orientation = orientation
+
+    def send(self, cmds: str) -> None:
+        """
+        发送minitouch命令, 连接断开时会重启服务并重试一次
+
+        Args:
+            cmds: minitouch命令,可以包含多行
+
+        Raises:
+            MinitouchServerConnectError: 无法连接minitouch服务
+        Returns:
+            None
+        """
+        if not self.server_flag:
+            self.start_server()
+
+        data = cmds.encode('ascii')
+        with self._lock:
+            try:
+                self.sock.send(data)
+            except (socket.error, AttributeError) as err:
+                logger.warning(f'{self} send error: {err!r}, restart server')
+                self.teardown()
+                self.start_server()
+                try:
+                    self.sock.send(data)
+                except socket.error as err:
+                    self.teardown()
+                    raise MinitouchServerConnectError(f'{err}')
+        self.device.invalidate_input_dumpsys()
+
+    def down(self, point: Union[Tuple[int, int], Point], contact: int = 0,
+             pressure: Optional[int] = None) -> None:
+        """
+        按下
+
+        Args:
+            point: 屏幕坐标
+            contact: 触点编号
+            pressure: 压力值,默认为DEFAULT_PRESSURE
+
+        Returns:
+            None
+        """
+        self.send(self.down_cmd(point, contact, pressure) + 'c\n')
+
+    def move(self, point: Union[Tuple[int, int], Point], contact: int = 0,
+             pressure: Optional[int] = None) -> None:
+        """
+        移动到指定坐标
+
+        Args:
+            point: 屏幕坐标
+            contact: 触点编号
+            pressure: 压力值,默认为DEFAULT_PRESSURE
+
+        Returns:
+            None
+        """
+        self.send(self.move_cmd(point, contact, pressure) + 'c\n')
+
+    def up(self, contact: int = 0) -> None:
+        """
+        抬起
+
+        Args:
+            contact: 触点编号
+
+        Returns:
+            None
+        """
+        self.send(f'u {contact}\nc\n')
+
+    def tap(self, point: Union[Tuple[int, int], Point], duration: float = 0.05) -> None:
+        """
+        点击, 按下和抬起之间的等待在设备上完成
+
+        Args:
+            point: 屏幕坐标
+            duration: 按下的时长(秒)
+
+        Returns:
+            None
+        """
+        self.send(f'{self.down_cmd(point)}c\nw {int(duration * 1000)}\nu 0\nc\n')
+
+    def swipe(self, start_point: Union[Tuple[int, int], Point], end_point: Union[Tuple[int, int], Point],
+              duration: float = 0.5, steps: int = 10) -> None:
+        """
+        滑动, 所有命令一次发送,移动间隔在设备上完成
+
+        Args:
+            start_point: 起点坐标
+            end_point: 终点坐标
+            duration: 滑动时长(秒)
+            steps: 中间移动的次数
+
+        Returns:
+            None
+        """
+        start_x, start_y = self._get_xy(start_point)
+        end_x, end_y = self._get_xy(end_point)
+        interval = int(duration * 1000 / steps)
+
+        cmds = [self.down_cmd((start_x, start_y)), 'c\n']
+        for i in range(1, steps + 1):
+            x = start_x + (end_x - start_x) * i / steps
+            y = start_y + (end_y - start_y) * i / steps
+            cmds += [f'w {interval}\n', self.move_cmd((x, y)), 'c\n']
+        cmds.append('u 0\nc\n')
+        self.send(''.join(cmds))
+
+    def reset(self) -> None:
+        """
+        抬起所有触点
+
+        Returns:
+            None
+        """
+        self.send('r\n')
+
+    def down_cmd(self, point: Union[Tuple[int, int], Point], contact: int = 0,
+                 pressure: Optional[int] = None) -> str:
+        x, y = self.transform_xy(*self._get_xy(point))
+        return f'd {contact} {x} {y} {self._get_pressure(pressure)}\n'
+
+    def move_cmd(self, point: Union[Tuple[int, int], Point], contact: int = 0,
+                 pressure: Optional[int] = None) -> str:
+        x, y = self.transform_xy(*self._get_xy(point))
+        return f'm {contact} {x} {y} {self._get_pressure(pressure)}\n'
+
+    def transform_xy(self, x: float, y: float) -> Tuple[int, int]:
+        """
+        把当前屏幕方向下的坐标转换为minitouch坐标
+
+        Args:
+            x: 屏幕x坐标
+            y: 屏幕y坐标
+
+        Returns:
+            minitouch坐标
+        """
+        if not self.display_size or self.max_x is None:
+            self.start_server()
+
+        width, height = self.display_size
+        if self.orientation == 1:
+            x, y = width - y, x
+        elif self.orientation == 2:
+            x, y = width - x, height - y
+        elif self.orientation == 3:
+            x, y = y, height - x
+
+        return int(x * self.max_x / width), int(y * self.max_y / height)
+
+    def _get_pressure(self, pressure: Optional[int]) -> int:
+        pressure = self.DEFAULT_PRESSURE if pressure is None else pressure
+        return min(pressure, self.max_pressure) if self.max_pressure else 0
+
+    @staticmethod
+    def _get_xy(point: Union[Tuple[float, float], Point]) -> Tuple[float, float]:
+        if isinstance(point, Point):
+            return point.x, point.y
+        return point[0], point[1]
+
+    def _connect(self) -> None:
+        """
+        连接minitouch并解析banner
+
+        like:
+            v 1
+            ^ 10 1079 2339 255
+            $ 12345
+
+        Raises:
+            MinitouchServerConnectError: 无法连接minitouch服务
+        Returns:
+            None
+        """
+        for _ in range(self.CONNECT_RETRIES):
+            sock = SafeSocket()
+            sock.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            try:
+                sock.connect((self.device.host, self.MNT_PORT))
+                banner = b''
+                while b'$' not in banner or not banner.endswith(b'\n'):
+                    banner += sock.recv(1)
+                break
+            except socket.error:
+                sock.close()
+                time.sleep(0.2)
+        else:
+            raise MinitouchServerConnectError(f'{self} connect error')
+
+        banner = banner.decode('ascii', errors='replace')
+        if m := re.search(r'^v (\d+)', banner, re.M):
+            self.version = int(m.group(1))
+        if m := re.search(r'^\^ (\d+) (\d+) (\d+) (\d+)', banner, re.M):
+            self.max_contacts, self.max_x, self.max_y, self.max_pressure = (int(v) for v in m.groups())
+        if m := re.search(r'^\$ (\d+)', banner, re.M):
+            self.pid = int(m.group(1))
+        logger.debug(f'{self} banner: max_contacts={self.max_contacts} max_x={self.max_x} max_y={self.max_y} '
+                     f'max_pressure={self.max_pressure} pid={self.pid}')
+        self.sock = sock
+
+    def _set_minitouch_forward(self):
+        """
+        设置minitouch开放的端口
+
+        Returns:
+            None
+        """
+        # teardown服务后,保留端口信息,用于下次启动
+        remote = f'localabstract:{self.MNT_LOCAL_NAME}'
+        if port := self.device.get_forward_port(remote=remote, device_id=self.device.device_id):
+            self.MNT_PORT = port
+            return
+
+        self.MNT_PORT = self.MNT_PORT or self.device.get_available_forward_local()
+        self.device.forward(local=f'tcp:{self.MNT_PORT}', remote=remote)
+
+    def _install_minitouch(self) -> None:
+        """
+        check if minitouch installed
+
+        Returns:
+            None
+        """
+        if not self.device.check_file(ANDROID_TMP_PATH, 'minitouch'):
+            local = MNT_LOCAL_PATH.format(abi_version=self.device.abi_version)
+            if self.device.sdk_version < 16:
+                # android 4.1以下不支持PIE
+                local += '-nopie'
+            self.device.push(local=local, remote=MNT_REMOTE_PATH, mode=0o755)
+
+
+__all__ = ['Minitouch', 'Gesture']
@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+from adbutils.exceptions import AdbBaseError
+
+
+class MinitouchStartError(AdbBaseError):
+    """ An error while minitouch server start error """
+
+
+class MinitouchServerConnectError(AdbBaseError):
+    """ An error while minitouch server connect error """
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+import math
+
+from adbutils.extra.minitouch.exceptions import MinitouchServerConnectError
+
+from typing import List, Tuple, Sequence, Optional, Callable, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from adbutils.extra.minitouch import Minitouch
+
+
+Keyframe = Tuple[float, float, float]  # (x, y, 时间(秒))
+
+
+class _Path(object):
+    """ 单个触点的轨迹, position(t)返回t时刻的坐标 """
+    def __init__(self, contact: int, start: float, end: float, position: Callable[[float], Tuple[float, float]],
+                 pressure: Optional[int] = None):
+        self.contact = contact
+        self.start = start
+        self.end = end
+        self.position = position
+        self.pressure = pressure
+
+
+class Gesture(object):
+    def __init__(self, rate: float = 60):
+        """
+        多点触控手势, 每个触点有独立的轨迹, 按照rate对轨迹采样后生成一整段minitouch命令
+        命令中的等待由设备执行, 时间精度不受python调度影响
+
+        Examples:
+            Gesture().add_path([(100, 500, 0), (300, 500, 0.2), (300, 800, 0.5)]).perform(minitouch)
+            Gesture.pinch((540, 1170), 400, 100, duration=0.5).perform(minitouch)
+
+        Args:
+            rate: 每秒发送的事件数量
+        """
+        if rate <= 0:
+            raise ValueError(f'rate must be positive, got {rate}')
+        self.rate = rate
+        self._paths: List[_Path] = []
+
+    def __str__(self):
+        return f"<Gesture> paths:{len(self._paths)} duration:{self.duration:.3f}s rate:{self.rate}"
+
+    @property
+    def duration(self) -> float:
+        """ 手势总时长(秒) """
+        return max((path.end for path in self._paths), default=0.0)
+
+    def add_path(self, keyframes: Sequence[Keyframe], contact: Optional[int] = None,
+                 pressure: Optional[int] = None) -> 'Gesture':
+        """
+        添加一条由关键帧组成的轨迹, 关键帧之间线性插值
+
+        Args:
+            keyframes: 关键帧列表[(x, y, t)], t为相对手势开始的时间(秒),需要递增
+            contact: 触点编号,默认自动分配
+            pressure: 压力值
+
+        Raises:
+            ValueError: 关键帧错误
+        Returns:
+            self, 可以链式调用
+        """
+        keyframes = [(float(x), float(y), float(t)) for x, y, t in keyframes]
+        if not keyframes:
+            raise ValueError('keyframes is empty')
+        if any(b[2] < a[2] for a, b in zip(keyframes, keyframes[1:])):
+            raise ValueError('keyframes time must be increasing')
+
+        def position(t: float) -> Tuple[float, float]:
+            for (x0, y0, t0), (x1, y1, t1) in zip(keyframes, keyframes[1:]):
+                if t <= t1:
+                    ratio = (t - t0) / (t1 - t0) if t1 > t0 else 1.0
+                    return x0 + (x1 - x0) * ratio, y0 + (y1 - y0) * ratio
+            return keyframes[-1][:2]
+
+        return self._add(position, keyframes[0][2], keyframes[-1][2], contact, pressure)
+
+    def add_bezier(self, points: Sequence[Tuple[float, float]], duration: float, start: float = 0,
+                   contact: Optional[int] = None, pressure: Optional[int] = None) -> 'Gesture':
+        """
+        添加一条贝塞尔曲线轨迹, 支持任意阶数
+
+        Args:
+            points: 控制点列表, 第一个点为起点,最后一个点为终点
+            duration: 轨迹时长(秒)
+            start: 开始时间(秒)
+            contact: 触点编号,默认自动分配
+            pressure: 压力值
+
+        Raises:
+            ValueError: 控制点错误
+        Returns:
+            self, 可以链式调用
+        """
+        points = [(float(x), float(y)) for x, y in points]
+        if not points:
+            raise ValueError('points is empty')
+
+        def position(t: float) -> Tuple[float, float]:
+            ratio = min(max((t - start) / duration, 0.0), 1.0) if duration > 0 else 1.0
+            # de Casteljau
+            _points = points
+            while len(_points) > 1:
+                _points = [(x0 + (x1 - x0) * ratio, y0 + (y1 - y0) * ratio)
+                           for (x0, y0), (x1, y1) in zip(_points, _points[1:])]
+            return _points[0]
+
+        return self._add(position, start, start + duration, contact, pressure)
+
+    @classmethod
+    def swipe(cls, start_point: Tuple[float, float], end_point: Tuple[float, float], duration: float = 0.5,
+              fingers: int = 1, spacing: float = 100, rate: float = 60) -> 'Gesture':
+        """
+        单指/多指滑动, 多个手指沿垂直于滑动方向排列
+
+        Args:
+            start_point: 起点坐标
+            end_point: 终点坐标
+            duration: 滑动时长(秒)
+            fingers: 手指数量
+            spacing: 手指间距
+            rate: 每秒发送的事件数量
+
+        Returns:
+            Gesture
+        """
+        gesture = cls(rate=rate)
+        dx, dy = end_point[0] - start_point[0], end_point[1] - start_point[1]
+        length = math.hypot(dx, dy) or 1.0
+        # 垂直于滑动方向的单位向量
+        nx, ny = -dy / length, dx / length
+        for i in range(fingers):
+            offset = (i - (fingers - 1) / 2) * spacing
+            gesture.add_path([(start_point[0] + nx * offset, start_point[1] + ny * offset, 0),
+                              (end_point[0] + nx * offset, end_point[1] + ny * offset, duration)])
+        return gesture
+
+    @classmethod
+    def pinch(cls, center: Tuple[float, float], start_radius: float, end_radius: float, duration: float = 0.5,
+              angle: float = 45, rate: float = 60) -> 'Gesture':
+        """
+        双指缩放, start_radius大于end_radius时为捏合,否则为张开
+
+        Args:
+            center: 中心点坐标
+            start_radius: 手指到中心的起始距离
+            end_radius: 手指到中心的结束距离
+            duration: 时长(秒)
+            angle: 两指连线与x轴的夹角(度)
+            rate: 每秒发送的事件数量
+
+        Returns:
+            Gesture
+        """
+        gesture = cls(rate=rate)
+        cos, sin = math.cos(math.radians(angle)), math.sin(math.radians(angle))
+        for direction in (1, -1):
+            gesture.add_path([(center[0] + direction * start_radius * cos, center[1] + direction * start_radius * sin, 0),
+                              (center[0] + direction * end_radius * cos, center[1] + direction * end_radius * sin,
+                               duration)])
+        return gesture
+
+    def build(self, minitouch: 'Minitouch') -> str:
+        """
+        生成minitouch命令
+
+        Args:
+            minitouch: 用于坐标转换的Minitouch
+
+        Raises:
+            MinitouchServerConnectError: 触点数量超过设备支持的数量
+        Returns:
+            minitouch命令
+        """
+        if not self._paths:
+            return ''
+        if minitouch.max_contacts is None:
+            minitouch.start_server()
+        if (contacts := max(path.contact for path in self._paths) + 1) > minitouch.max_contacts:
+            raise MinitouchServerConnectError(f'gesture needs {contacts} contacts, '
+                                              f'device supports {minitouch.max_contacts}')
+
+        interval = 1 / self.rate
+        ticks = {round(i * interval, 6) for i in range(int(self.duration * self.rate) + 1)}
+        ticks.update(round(t, 6) for path in self._paths for t in (path.start, path.end))
+        ticks = sorted(ticks)
+
+        cmds = []
+        state = {id(path): 'pending' for path in self._paths}
+        last_ms = None
+        while True:
+            for t in ticks:
+                frame = []
+                for path in self._paths:
+                    key = id(path)
+                    if state[key] == 'pending' and t >= path.start:
+                        frame.append(minitouch.down_cmd(path.position(t), path.contact, path.pressure))
+                        state[key] = 'down'
+                    elif state[key] == 'down':
+                        frame.append(minitouch.move_cmd(path.position(min(t, path.end)), path.contact,
+                                                        path.pressure))
+                        if t >= path.end:
+                            frame.append(f'u {path.contact}\n')
+                            state[key] = 'up'
+                if not frame:
+                    continue
+
+                ms = int(round(t * 1000))
+                if last_ms is not None and ms > last_ms:
+                    cmds.append(f'w {ms - last_ms}\n')
+                last_ms = ms
+                cmds += frame
+                cmds.append('c\n')
+
+            if all(v == 'up' for v in state.values()):
+                break
+            # 开始和结束时间相同的轨迹(点击)需要在下一帧抬起
+            ticks = [ticks[-1] + interval]
+        return ''.join(cmds)
+
+    def perform(self, minitouch: 'Minitouch') -> None:
+        """
+        把整个手势一次发送给minitouch
+
+        Args:
+            minitouch: Minitouch
+
+        Returns:
+            None
+        """
+        minitouch.send(self.build(minitouch))
+
+    def _add(self, position: Callable[[float], Tuple[float, float]], start: float, end: float,
+             contact: Optional[int], pressure: Optional[int]) -> 'Gesture':
+        if contact is None:
+            used = {path.contact for path in self._paths}
+            contact = next(i for i in range(len(used) + 1) if i not in used)
+        self._paths.append(_Path(contact, start, end, position, pressure))
+        return self
+
+
+__all__ = ['Gesture']
@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 import time
-from threading import Thread, Event
-from queue import Queue
+import threading
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
 
 from loguru import logger
 
@@ -10,12 +12,34 @@ from adbutils.exceptions import AdbBaseError
 from adbutils.extra.performance.cpu import Cpu
 from adbutils.extra.performance.fps import Fps
 from adbutils.extra.performance.meminfo import Meminfo
+from adbutils.extra.performance.sampler import PerformanceSampler, PerformanceSample
+from adbutils.extra.performance.cpu_stream import CpuStream
 
-__all__ = ['DeviceWatcher']
+from typing import Optional, Dict, Tuple, Deque, List, Callable, Any, Final
+
+__all__ = ['DeviceWatcher', 'PerformanceSampler', 'PerformanceSample', 'CpuStream']
 
 
 class DeviceWatcher(object):
-    def __init__(self, device: ADBDevice, package_name: str = None, surfaceView_name: str = None):
+    METRICS: Final[Tuple[str, ...]] = ('cpu', 'mem', 'fps')
+    DEFAULT_INTERVAL: Final[float] = 1.0
+
+    def __init__(self, device: ADBDevice, package_name: str = None, surfaceView_name: str = None,
+                 intervals: Optional[Dict[str, float]] = None, maxlen: int = 60,
+                 executor: Optional[ThreadPoolExecutor] = None):
+        """
+        按固定频率在后台采集cpu/内存/fps, 每个指标有独立的采集间隔和有界的历史记录
+        一个调度线程负责计时,采集在线程池中运行;同一个指标上一次采集还没有结束时跳过本次
+
+        Args:
+            device: 设备类
+            package_name: 需要监控的包名
+            surfaceView_name: 计算fps的SurfaceView名, 为None时根据包名自动查找
+            intervals: 各指标的采集间隔(秒), 例如{'cpu': 0.5, 'mem': 2}, 未设置的使用DEFAULT_INTERVAL,
+                       设置为None或0时不采集该指标
+            maxlen: 每个指标保留的历史记录数量
+            executor: 共享的线程池,多个设备可以共用一个线程池
+        """
         self._surfaceView_name = surfaceView_name
         self._package_name = package_name
         self._device = device
@@ -24,152 +48,179 @@ class DeviceWatcher(object):
         self._fps_watcher = Fps(self._device)
         self._mem_watcher = Meminfo(self._device)
 
-        self._kill_event = Event()
-
-        self._cpu_usage_queue = Queue()
-        self._cpu_wait_event = Event()
-        self._cpu_wait_event.set()
-        self._cpu_watcher_thread: Thread = self.create_cpu_watcher()
-
-        self._mem_usage_queue = Queue()
-        self._mem_wait_event = Event()
-        self._mem_wait_event.set()
-        self._mem_watcher_thread: Thread = self.create_mem_watcher()
-
-        self._fps_usage_queue = Queue()
-        self._fps_wait_event = Event()
-        self._fps_wait_event.set()
-        self._fps_watcher_thread: Thread = self.create_fps_watcher()
+        intervals = {**{metric: self.DEFAULT_INTERVAL for metric in self.METRICS}, **(intervals or {})}
+        if unknown := set(intervals) - set(self.METRICS):
+            raise ValueError(f'unknown metrics: {unknown}, expected {self.METRICS}')
+        self.intervals: Dict[str, float] = {metric: interval for metric, interval in intervals.items() if interval}
+        self._collectors: Dict[str, Callable[[], Any]] = {
+            'cpu': self._get_cpu_usage,
+            'mem': self._get_mem_usage,
+            'fps': self._get_fps_usage,
+        }
+
+        # 每个指标的历史记录 (采集时间, 数据)
+        self._samples: Dict[str, Deque[Tuple[float, Any]]] = {metric: deque(maxlen=maxlen) for metric in self.METRICS}
+        self._running: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        # 没有传入线程池时, 每次start都创建自己的线程池,在stop时关闭
+        self._own_executor = executor is None
+        self._executor: Optional[ThreadPoolExecutor] = executor
+        self._kill_event = threading.Event()
+        self._t: Optional[threading.Thread] = None
 
         if not self._surfaceView_name and self._package_name:
             if layers := self._fps_watcher.get_possible_activity():
                 surfaceViews = self._fps_watcher.check_activity_usable(layers)
-                if self._package_name in surfaceViews:
+                if surfaceViews and self._package_name in surfaceViews:
                     self._surfaceView_name = surfaceViews
             logger.debug(f'自动设置监控activity={self._surfaceView_name}')
 
-    def create_cpu_watcher(self) -> Thread:
-        """
-        创建cpu监控线程
+    def __enter__(self):
+        self.start()
+        return self
 
-        Returns:
-            cpu监控线程
-        """
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def __str__(self):
+        return f"<DeviceWatcher ({self.running and 'Start' or 'Close'})> device:{self._device.device_id} " \
+               f"intervals:{self.intervals}"
 
-        def _get_cpu_usage():
-            try:
-                # total_cpu_usage, cpu_core_usage, app_usage_ret
-                return self._cpu_watcher.get_cpu_usage(self._package_name)
-            except AdbBaseError as err:
-                logger.error(err)
-            return None
-
-        def _run(kill_event: Event, wait_event: Event, q: Queue):
-            while not kill_event.is_set():
-                if not wait_event.is_set():
-                    if cpu_usage := _get_cpu_usage():
-                        q.put(cpu_usage)
-                    else:
-                        q.put(None)
-                    wait_event.set()
-
-        _t = Thread(target=_run, name='cpu_watcher',
-                    args=(self._kill_event, self._cpu_wait_event, self._cpu_usage_queue))
-        _t.daemon = True
-        return _t
-
-    def create_mem_watcher(self) -> Thread:
+    @property
+    def running(self) -> bool:
+        return self._t is not None and self._t.is_alive()
+
+    def start(self) -> None:
         """
-        创建内存监控线程
+        启动调度线程
 
         Returns:
-            内存监控线程
+            None
         """
-
-        def _get_mem_usage():
-            try:
-                if self._package_name:
-                    return self._mem_watcher.get_app_summary(self._package_name)
-                else:
-                    return None
-            except AdbBaseError as err:
-                logger.error(err)
-            return None
-
-        def _run(kill_event: Event, wait_event: Event, q: Queue):
-            while not kill_event.is_set():
-                if not wait_event.is_set():
-                    if app_mem := _get_mem_usage():
-                        q.put(app_mem)
-                    else:
-                        q.put(None)
-                    wait_event.set()
-
-        _t = Thread(target=_run, name='mem_watcher',
-                    args=(self._kill_event, self._mem_wait_event, self._mem_usage_queue))
-        _t.daemon = True
-        return _t
-
-    def create_fps_watcher(self) -> Thread:
+        if self.running:
+            return
+        if 'fps' in self.intervals:
+            self._fps_watcher.clear_surfaceFlinger_latency()
+        if self._own_executor:
+            self._executor = ThreadPoolExecutor(max_workers=len(self.METRICS),
+                                                thread_name_prefix=f'watcher_{self._device.device_id}')
+        self._kill_event.clear()
+        self._t = threading.Thread(target=self._run, name=f'device_watcher_{self._device.device_id}', daemon=True)
+        self._t.start()
+
+    def stop(self) -> None:
         """
-        创建fps监控线程
+        停止采集, 正在运行的采集会在完成后丢弃
 
         Returns:
-            fps监控线程
+            None
         """
-
-        def _get_fps_usage():
-            try:
-                if self._surfaceView_name:
-                    return self._fps_watcher.get_fps_surfaceView(f"{self._surfaceView_name}")
-                return None
-            except AdbBaseError as err:
-                logger.error(err)
-            return None
-
-        def _run(kill_event: Event, wait_event: Event, q: Queue):
-            while not kill_event.is_set():
-                if not wait_event.is_set():
-                    if fps_info := _get_fps_usage():
-                        q.put(fps_info)
-                    else:
-                        q.put(None)
-                    wait_event.set()
-
-        _t = Thread(target=_run, name='mem_watcher',
-                    args=(self._kill_event, self._fps_wait_event, self._fps_usage_queue))
-        _t.daemon = True
-        return _t
-
-    def stop(self):
         self._kill_event.set()
+        if self._t and self._t is not threading.current_thread():
+            self._t.join()
+        self._t = None
+        if self._own_executor and self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def get(self) -> Tuple[Any, Any, Any]:
+        """
+        获取各指标最新的一次采集结果,不会等待
 
-    def start(self):
-        if not self._cpu_watcher_thread.is_alive():
-            self._cpu_watcher_thread.start()
-
-        if not self._mem_watcher_thread.is_alive():
-            self._mem_watcher_thread.start()
-
-        if not self._fps_watcher_thread.is_alive():
-            self._fps_watcher.clear_surfaceFlinger_latency()
-            self._fps_watcher_thread.start()
+        Returns:
+            (cpu_usage, mem_usage, fps_info), 还没有采集到的指标为None
+        """
+        snapshot = self.snapshot()
+        return tuple(snapshot[metric][1] if snapshot.get(metric) else None for metric in self.METRICS)
 
-    def get(self):
+    def snapshot(self, timestamp: Optional[float] = None) -> Dict[str, Optional[Tuple[float, Any]]]:
         """
+        获取各指标在timestamp时刻之前(包含)最新的一次采集结果, 用于对齐不同指标的数据
 
-        Returns:
+        Args:
+            timestamp: 对齐的时间, 默认为最新
 
+        Returns:
+            {指标: (采集时间, 数据)}, 没有数据的指标为None
+        """
+        ret = {}
+        with self._lock:
+            for metric, samples in self._samples.items():
+                ret[metric] = next((sample for sample in reversed(samples)
+                                    if timestamp is None or sample[0] <= timestamp), None)
+        return ret
+
+    def history(self, metric: str) -> List[Tuple[float, Any]]:
         """
-        self._mem_wait_event.clear()
-        self._cpu_wait_event.clear()
-        self._fps_wait_event.clear()
+        获取指标的历史记录
 
-        cpu_usage = self._cpu_usage_queue.get()
-        mem_usage = self._mem_usage_queue.get()
-        fps_info = self._fps_usage_queue.get()
+        Args:
+            metric: cpu/mem/fps
 
-        return cpu_usage, mem_usage, fps_info
+        Returns:
+            [(采集时间, 数据)], 按时间排序
+        """
+        with self._lock:
+            return list(self._samples[metric])
+
+    def _run(self) -> None:
+        now = time.monotonic()
+        next_time = {metric: now for metric in self.intervals}
+        while next_time and not self._kill_event.is_set():
+            now = time.monotonic()
+            for metric, interval in self.intervals.items():
+                if now < next_time[metric]:
+                    continue
+                # 固定频率, 落后超过一个周期时跳过错过的周期
+                next_time[metric] += interval
+                if next_time[metric] <= now:
+                    next_time[metric] = now + interval
+                if (future := self._running.get(metric)) and not future.done():
+                    continue
+                try:
+                    self._running[metric] = self._executor.submit(self._collect, metric)
+                except RuntimeError:
+                    # 共享的线程池已经关闭
+                    return
+            self._kill_event.wait(max(min(next_time.values()) - time.monotonic(), 0))
+
+    def _collect(self, metric: str) -> None:
+        timestamp = time.time()
+        try:
+            value = self._collectors[metric]()
+        except Exception as err:
+            # 在线程池中运行, 没有人获取Future的结果, 异常需要在这里记录
+            logger.error(f'{self} collect {metric} error: {err!r}')
+            traceback.print_exc()
+            return
+        if self._kill_event.is_set():
+            return
+        with self._lock:
+            self._samples[metric].append((timestamp, value))
+
+    def _get_cpu_usage(self):
+        try:
+            # total_cpu_usage, cpu_core_usage, app_usage_ret
+            return self._cpu_watcher.get_cpu_usage(self._package_name)
+        except AdbBaseError as err:
+            logger.error(err)
+        return None
+
+    def _get_mem_usage(self):
+        try:
+            if self._package_name:
+                return self._mem_watcher.get_app_summary(self._package_name)
+        except AdbBaseError as err:
+            logger.error(err)
+        return None
+
+    def _get_fps_usage(self):
+        try:
+            if self._surfaceView_name:
+                return self._fps_watcher.get_fps_surfaceView(f"{self._surfaceView_name}")
+        except AdbBaseError as err:
+            logger.error(err)
+        return None
 
 
 if __name__ == '__main__':
@@ -181,9 +232,7 @@ if __name__ == '__main__':
     a.start()
 
     while True:
-        start_time = time.time()
         cpu_usage, mem_usage, fps_info = a.get()
-        delay_time = time.time() - start_time
 
         log = []
         if cpu_usage:
@@ -201,7 +250,4 @@ if __name__ == '__main__':
         log.append(f'fps={fps:.1f}, 最大延迟={fTime:.2f}ms')
 
         logger.debug('\t'.join(log))
-        if (sleep := (1 - delay_time)) > 0:
-            time.sleep(sleep)
-        else:
-            time.sleep(1)
+        time.sleep(1)
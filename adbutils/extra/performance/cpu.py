@@ -5,7 +5,6 @@ from typing import Union, Tuple, List, Optional, Dict
 
 from adbutils import ADBDevice
 from adbutils.constant import ANDROID_TMP_PATH, BUSYBOX_LOCAL_PATH, BUSYBOX_REMOTE_PATH
-from adbutils._utils import get_std_encoding
 from adbutils.extra.performance.exceptions import AdbNoInfoReturn
 
 from loguru import logger
@@ -21,7 +20,7 @@ class Cpu(object):
     def __init__(self, device: ADBDevice):
         self.device = device
         self._total_cpu_stat = []
-        self._core_cpu_stat = []
+        self._core_cpu_stat = {}
         self._app_cpu_stat = {}
 
     def get_cpu_usage(self, name: Union[str, int, List[Union[int, str]], Tuple[Union[str, int], ...], None] = None):
@@ -34,7 +33,7 @@ class Cpu(object):
         Returns:
             (total_cpu_usage, core_cpu_usage, app_cpu_usage)
             app_cpu_usage: 是一个以pid为索引的字典
-            core_cpu_usage: 是一个列表,索引对应cpu核心
+            core_cpu_usage: 是一个列表,索引对应cpu核心编号, 离线或刚上线的核心为0
             total_cpu_usage: 一个float或int
         """
         # step1: 转换name为pid
@@ -49,6 +48,26 @@ class Cpu(object):
             logger.warning(err)
             return self.get_cpu_usage(name)
 
+        if (cpu_usage := self.calc_cpu_usage(name, pid_list, total_cpu_stat, core_cpu_stat, app_cpu_stat)) is None:
+            return self.get_cpu_usage(name)
+        return cpu_usage
+
+    def calc_cpu_usage(self, name: Optional[List[Union[str, int]]], pid_list: List[Optional[int]],
+                       total_cpu_stat: List[int], core_cpu_stat: Dict[int, List[int]],
+                       app_cpu_stat: Dict[int, Optional[List[str]]]):
+        """
+        根据本次与上次的cpu数据计算使用率, 第一次获取到的数据只用于记录
+
+        Args:
+            name: get_cpu_usage传入的name列表
+            pid_list: name对应的pid列表
+            total_cpu_stat: 总cpu数据
+            core_cpu_stat: 各核心cpu数据, key为cpu核心编号
+            app_cpu_stat: 各pid的stat数据
+
+        Returns:
+            (total_cpu_usage, core_cpu_usage, app_cpu_usage), 没有上次的数据时返回None
+        """
         _return_flag = 0
         if not self._total_cpu_stat or not self._core_cpu_stat:
             self._total_cpu_stat = total_cpu_stat
@@ -62,7 +81,7 @@ class Cpu(object):
                     _return_flag = 2
 
         if _return_flag > 0:
-            return self.get_cpu_usage(name)
+            return None
 
         # step3: 计算总使用率
         total_idle = total_cpu_stat[3] - self._total_cpu_stat[3]
@@ -70,11 +89,17 @@ class Cpu(object):
         total_cpu_usage = 100 * (total_cpu_time - total_idle) / total_cpu_time
 
         # step4: 计算各核心使用率
-        cpu_core_usage = []
-        for cpu_index, core_stat in enumerate(core_cpu_stat):
-            idle = core_stat[3] - self._core_cpu_stat[cpu_index][3]
-            core_cpu_time = sum(core_stat) - sum(self._core_cpu_stat[cpu_index])
-            cpu_core_usage.append(100 * (core_cpu_time - idle) / core_cpu_time)
+        # 核心可能随时上线/离线, 离线的核心不会出现在/proc/stat中,需要按核心编号对应
+        # 刚上线(没有上次数据)或者计数被重置的核心没有办法计算,使用率记为0
+        cpu_core_usage = [0.0] * (max(core_cpu_stat) + 1)
+        for cpu_index, core_stat in core_cpu_stat.items():
+            if not (last_core_stat := self._core_cpu_stat.get(cpu_index)):
+                continue
+            idle = core_stat[3] - last_core_stat[3]
+            core_cpu_time = sum(core_stat) - sum(last_core_stat)
+            if core_cpu_time <= 0 or idle < 0:
+                continue
+            cpu_core_usage[cpu_index] = 100 * (core_cpu_time - idle) / core_cpu_time
 
         self._total_cpu_stat = total_cpu_stat
         self._core_cpu_stat = core_cpu_stat
@@ -93,34 +118,42 @@ class Cpu(object):
         return total_cpu_usage, cpu_core_usage, app_usage_ret
 
     def _get_cpu_stat(self, name: Optional[List[int]] = None) -> \
-            Tuple[List[int], List[List[int]], Dict[int, Optional[List[str]]]]:
+            Tuple[List[int], Dict[int, List[int]], Dict[int, Optional[List[str]]]]:
         cmds = self._create_command(name)
-        proc = self.device.start_shell(cmds)
+        stat, *app_ret = self.device.batch(cmds)
+        return self.parse_cpu_stat(stat, app_ret, name)
 
-        stdout, stderr = proc.communicate()
+    def parse_cpu_stat(self, stat: Tuple[str, int], app_ret: List[Tuple[str, int]],
+                       name: Optional[List[int]] = None) -> \
+            Tuple[List[int], Dict[int, List[int]], Dict[int, Optional[List[str]]]]:
+        """
+        处理batch返回的'cat /proc/stat'和'cat /proc/<pid>/stat'结果
 
-        stdout = stdout.decode(get_std_encoding(stdout))
-        stderr = stderr.decode(get_std_encoding(stdout))
+        Args:
+            stat: /proc/stat的(stdout, 退出码)
+            app_ret: 按name顺序对应每个pid的(stdout, 退出码)
+            name: 包含pid的列表
 
+        Raises:
+            AdbNoInfoReturn: 没有获取到cpu信息
+        Returns:
+            总cpu数据, 各核心cpu数据(key为cpu核心编号), 各pid的stat数据
+        """
+        stdout, _ = stat
         app_cpu_stat = name and {pid: None for pid in name} or {}
-        if ret := self.app_stat_pattern.findall(stdout):
-            pattern = re.compile(r'(\S+)\s*')
-            for v in ret:
-                pid = int(v[1])
-                app_cpu_stat[pid] = pattern.findall(v[0])
-                stdout = stdout.replace(v[0], '')
+        pattern = re.compile(r'(\S+)\s*')
+        for pid, (app_stat, returncode) in zip(name or [], app_ret):
+            # 进程已经退出时cat失败,对应的值为None
+            if not returncode and (m := self.app_stat_pattern.search(app_stat)):
+                app_cpu_stat[pid] = pattern.findall(m.group(1))
 
         if not stdout:
             raise AdbNoInfoReturn(f'cpu信息获取异常')
 
         total_cpu_stat, core_cpu_stat = self._pares_cpu_stat(stdout)
-
-        if not total_cpu_stat or not core_cpu_stat:
-            return self._get_cpu_stat(name)
-
         return total_cpu_stat, core_cpu_stat, app_cpu_stat
 
-    def _pares_cpu_stat(self, stat: str) -> Tuple[List[int], List[List[int]]]:
+    def _pares_cpu_stat(self, stat: str) -> Tuple[List[int], Dict[int, List[int]]]:
         """
         处理cpu信息数据
 
@@ -128,10 +161,10 @@ class Cpu(object):
             stat: cpu数据
 
         Returns:
-            总cpu数据和每个核心的数据
+            总cpu数据和每个核心的数据, 核心数据的key为cpu核心编号
         """
         total_cpu_stat = None
-        core_cpu_stat = []
+        core_cpu_stat = {}
 
         if total_stat := self.total_cpu_pattern.findall(stat):
             total_stat = self.cpu_jiffies_pattern.findall(total_stat[0])
@@ -140,7 +173,7 @@ class Cpu(object):
         if core_stat_list := self.core_stat_pattern.findall(stat):
             for core_stat in core_stat_list:
                 _core_stat = self.cpu_jiffies_pattern.findall(core_stat[1].strip())
-                core_cpu_stat.append([int(v) for v in _core_stat])
+                core_cpu_stat[int(core_stat[0])] = [int(v) for v in _core_stat]
 
         if not total_cpu_stat or not core_cpu_stat:
             raise AdbNoInfoReturn('cpu信息获取异常')
@@ -148,7 +181,7 @@ class Cpu(object):
         return total_cpu_stat, core_cpu_stat
 
     @staticmethod
-    def _create_command(name: Optional[List[int]] = None):
+    def _create_command(name: Optional[List[int]] = None) -> List[str]:
         """
         根据pid创建cmd命令
 
@@ -156,14 +189,14 @@ class Cpu(object):
             name: 包含pid的列表
 
         Returns:
-            cmd命令
+            cmd命令列表,第一条为/proc/stat,之后按顺序对应每个pid
         """
         cmds = ['cat /proc/stat']
         if name:
             for pid in name:
                 cmds += [f'cat /proc/{pid}/stat']
 
-        return '&'.join(cmds)
+        return cmds
 
     def _transform_name_to_pid(self, name: Union[List, Tuple]) -> Optional[List[int]]:
         """
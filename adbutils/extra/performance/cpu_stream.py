@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+import shlex
+import threading
+from collections import deque
+
+from loguru import logger
+
+from adbutils import ADBDevice
+from adbutils.exceptions import AdbTimeout, AdbSDKVersionError, AdbBaseError
+from adbutils.extra.performance.cpu import Cpu
+from adbutils._utils import reg_cleanup
+
+from typing import Optional, Union, Tuple, List, Deque, Final
+
+
+# (设备/proc/uptime, (total_cpu_usage, core_cpu_usage, app_cpu_usage))
+CpuSample = Tuple[float, Tuple[float, List[float], dict]]
+
+
+class CpuStream(object):
+    FRAME_BEGIN: Final[str] = '__ADBUTILS_CPU_BEGIN__'
+    FRAME_END: Final[str] = '__ADBUTILS_CPU_END__'
+
+    def __init__(self, device: ADBDevice, name: Union[str, int, None] = None, interval: float = 0.1,
+                 maxlen: int = 600):
+        """
+        在设备上运行一个常驻的shell循环,按interval输出/proc/uptime、/proc/stat和/proc/<pid>/stat,
+        电脑端逐行解析计算cpu使用率, 采样精度不受adb往返时间影响
+
+        循环只使用shell内置的read读取/proc,每次采样只有sleep会创建进程
+        name为包名时,读取不到/proc/<pid>/stat(应用未运行或者已经重启)才会在设备上用pidof重新查找pid
+        时间戳使用设备的/proc/uptime,精度为10ms
+
+        Examples:
+            with CpuStream(device, device.foreground_package, interval=0.05) as stream:
+                while True:
+                    uptime, (total, cores, apps) = stream.next(timeout=1)
+
+        Args:
+            device: 设备类
+            name: 需要监控的包名或pid, 为None时只计算整机cpu
+            interval: 采样间隔(秒)
+            maxlen: 保留的历史记录数量
+        """
+        self.device = device
+        self.name = name
+        self.interval = interval
+        self.pid: Optional[int] = None
+
+        self._cpu_watcher = Cpu(device)
+        self._samples: Deque[CpuSample] = deque(maxlen=maxlen)
+        self._cond = threading.Condition()
+        self._seq = 0  # 已经计算出的采样序号
+        self._read_seq = 0  # next()已经返回的采样序号
+        self._finished = True  # 设备上的循环已经退出
+        self._proc = None
+        self._t: Optional[threading.Thread] = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def __str__(self):
+        return f"<CpuStream ({self.running and 'Start' or 'Close'})> device:{self.device.device_id} " \
+               f"pid:{self.pid} interval:{self.interval}"
+
+    @property
+    def running(self) -> bool:
+        return self._t is not None and self._t.is_alive()
+
+    @property
+    def samples(self) -> List[CpuSample]:
+        """ 历史记录, 按时间排序 """
+        with self._cond:
+            return list(self._samples)
+
+    def start(self) -> None:
+        """
+        启动设备上的采样循环
+
+        Raises:
+            AdbSDKVersionError: sdk版本低于23, sleep不支持小数
+        Returns:
+            None
+        """
+        if self.running:
+            return
+        if (version := self.device.sdk_version) < 23:
+            raise AdbSDKVersionError(f'CpuStream: API < 23 not supported (version={version})')
+
+        self.pid = self._get_pid()
+        self._cpu_watcher = Cpu(self.device)
+        self._finished = False
+        self._proc = self.device.start_shell([self._create_script()])
+        reg_cleanup(self._proc.kill)
+        self._t = threading.Thread(target=self._run, args=(self._proc,), name='cpu_stream', daemon=True)
+        self._t.start()
+
+    def stop(self) -> None:
+        """
+        停止采样
+
+        Returns:
+            None
+        """
+        if self._proc:
+            self._proc.kill()
+            self._proc = None
+        if self._t and self._t is not threading.current_thread():
+            self._t.join()
+        self._t = None
+
+    def latest(self) -> Optional[CpuSample]:
+        """
+        获取最新的一次采样,不会等待
+
+        Returns:
+            (uptime, (total_cpu_usage, core_cpu_usage, app_cpu_usage)), 还没有数据时为None
+        """
+        with self._cond:
+            return self._samples[-1] if self._samples else None
+
+    def next(self, timeout: Optional[float] = None) -> CpuSample:
+        """
+        等待一次还没有通过next()获取过的新采样
+
+        Args:
+            timeout: 等待超时时间
+
+        Raises:
+            AdbTimeout: 等待超时,或者采样已经停止
+        Returns:
+            (uptime, (total_cpu_usage, core_cpu_usage, app_cpu_usage))
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > self._read_seq or self._finished, timeout):
+                raise AdbTimeout(f'{self} wait next sample timeout')
+            if self._seq <= self._read_seq:
+                raise AdbTimeout(f'{self} stopped')
+            self._read_seq = self._seq
+            return self._samples[-1]
+
+    def _get_pid(self) -> Optional[int]:
+        if isinstance(self.name, int):
+            return self.name
+        if self.name:
+            if pid := self.device.get_pid_by_name(self.name):
+                return pid[0][0]
+            logger.warning(f"应用:'{self.name}'未运行")
+        return None
+
+    def _create_script(self) -> str:
+        # /proc/stat中cpu开头的行在最前面, 读到其他行时停止,避免输出很长的intr行
+        if isinstance(self.name, str):
+            # 应用重启后pid会变化, 读取失败时在设备上重新查找pid, 电脑端根据stat第一列得知新的pid
+            pid_stat = (f'if [ -z "$pid" ] || ! {{ read -r st < /proc/$pid/stat; }} 2>/dev/null; then '
+                        f'pid=$(pidof -s {shlex.quote(self.name)}); '
+                        f'[ -n "$pid" ] && {{ read -r st < /proc/$pid/stat; }} 2>/dev/null || st=; fi; '
+                        f'[ -n "$st" ] && echo "$st"; ')
+        else:
+            pid_stat = f'read -r st < /proc/{self.pid}/stat && echo "$st"; ' if self.pid else ''
+        return (f'pid={self.pid or ""}; '
+                f'while true; do '
+                f'echo {self.FRAME_BEGIN}; '
+                f'read -r up _ < /proc/uptime; echo "$up"; '
+                f'while read -r line; do case "$line" in cpu*) echo "$line";; *) break;; esac; done < /proc/stat; '
+                f'{pid_stat}'
+                f'echo {self.FRAME_END}; '
+                f'sleep {self.interval}; '
+                f'done')
+
+    def _run(self, proc) -> None:
+        frame: Optional[List[str]] = None
+        try:
+            for line in iter(proc.stdout.readline, b''):
+                line = line.decode('utf-8', errors='replace').strip()
+                if line == self.FRAME_BEGIN:
+                    frame = []
+                elif line == self.FRAME_END:
+                    if frame:
+                        try:
+                            self._parse_frame(frame)
+                        except Exception as err:
+                            # 一帧数据异常不影响后续采样
+                            logger.error(f'{self} parse frame error: {err!r}')
+                    frame = None
+                elif frame is not None:
+                    frame.append(line)
+        finally:
+            logger.debug(f'{self} finished')
+            with self._cond:
+                self._finished = True
+                self._cond.notify_all()
+
+    def _parse_frame(self, frame: List[str]) -> None:
+        try:
+            uptime = float(frame[0])
+        except ValueError:
+            return
+
+        stat = '\n'.join(line for line in frame[1:] if line.startswith('cpu'))
+        app_stat = [line for line in frame[1:] if not line.startswith('cpu')]
+        if app_stat and (pid := self._parse_stat_pid(app_stat[0])) and pid != self.pid:
+            logger.info(f"{self} pid changed to {pid}")
+            self.pid = pid
+        pid_list = [self.pid] if self.pid else []
+        app_ret = [(app_stat[0], 0) if app_stat else ('', 1)] if pid_list else []
+        try:
+            total_cpu_stat, core_cpu_stat, app_cpu_stat = self._cpu_watcher.parse_cpu_stat(
+                (stat, 0), app_ret, pid_list)
+        except AdbBaseError as err:
+            logger.error(f'{self} {err!r}')
+            return
+
+        try:
+            cpu_usage = self._cpu_watcher.calc_cpu_usage([self.name] if pid_list else None, pid_list,
+                                                         total_cpu_stat, core_cpu_stat, app_cpu_stat)
+        except ZeroDivisionError:
+            # 采样间隔小于jiffies精度时cpu时间可能没有变化
+            return
+        if cpu_usage is None:
+            return
+        with self._cond:
+            self._samples.append((uptime, cpu_usage))
+            self._seq += 1
+            self._cond.notify_all()
+
+    @staticmethod
+    def _parse_stat_pid(line: str) -> Optional[int]:
+        pid, _, _ = line.partition(' ')
+        return int(pid) if pid.isdigit() else None
+
+
+__all__ = ['CpuStream']
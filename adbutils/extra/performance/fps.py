@@ -18,7 +18,17 @@ class Fps(object):
         self.device = device
         self._last_drawEnd_timestamps = None
 
-    def get_fps_surfaceView(self, surface_name: str):
+    def get_fps_surfaceView(self, surface_name: str, stat: Optional[str] = None):
+        """
+        根据'dumpsys SurfaceFlinger --latency'计算fps
+
+        Args:
+            surface_name: SurfaceView名
+            stat: 已经获取到的'dumpsys SurfaceFlinger --latency'输出,为None时从设备获取
+
+        Returns:
+            (fps, 最大帧耗时(ms), jank, bigJank, stutter), 数据不足时返回None
+        """
         _Fps = 0
         _FTime = 0
         _Jank = 0
@@ -26,7 +36,7 @@ class Fps(object):
         _Stutter = 0
 
         # step1: 根据window名,获取帧数信息
-        stat = self._get_surfaceFlinger_stat(surface_name)
+        stat = stat or self._get_surfaceFlinger_stat(surface_name)
 
         # step2: 提取帧数信息,分别得到刷新周期/绘制图像开始时间列表/绘制耗时列表/绘制结束列表
         refresh_period, _drawStart_timestamps, _vsync_timestamps, _drawEnd_timestamps = \
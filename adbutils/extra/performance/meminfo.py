@@ -146,16 +146,28 @@ class Meminfo(object):
         """
         if not package:
             return None
-        ret = {}
         if meminfo := self._get_app_meminfo(package):
-            meminfo = self._parse_app_meminfo(meminfo)
-            meminfo = meminfo.group('app_summary').strip()
-            pattern = re.compile(r'\s*(\S+\s?\S*\s?\S*):\s*(\d+)')
-            for v in pattern.findall(meminfo):
-                name = v[0].strip().lower().replace(' ', '_')
-                memory = int(v[1])
-                ret[name] = memory
-            return ret
+            return self.parse_app_summary(meminfo)
+
+    def parse_app_summary(self, meminfo: str) -> Optional[Dict[str, int]]:
+        """
+        处理'dumpsys meminfo <packageName|pid>'的输出,获取app summary pss
+
+        Args:
+            meminfo: 内存信息
+
+        Returns:
+            app内存信息概要, 无法解析时返回None
+        """
+        if not (m := self._parse_app_meminfo(meminfo)):
+            return None
+        ret = {}
+        pattern = re.compile(r'\s*(\S+\s?\S*\s?\S*):\s*(\d+)')
+        for v in pattern.findall(m.group('app_summary').strip()):
+            name = v[0].strip().lower().replace(' ', '_')
+            memory = int(v[1])
+            ret[name] = memory
+        return ret
 
     @staticmethod
     def _pares_memory(memory: str):
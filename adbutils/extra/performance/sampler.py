@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+import time
+from typing import NamedTuple, Optional, Tuple, List, Dict, Iterable, Final
+
+from loguru import logger
+
+from adbutils import ADBDevice
+from adbutils.exceptions import AdbBaseError
+from adbutils.extra.performance.cpu import Cpu
+from adbutils.extra.performance.fps import Fps
+from adbutils.extra.performance.meminfo import Meminfo
+
+
+class PerformanceSample(NamedTuple):
+    timestamp: float  # 采样时的电脑时间
+    uptime: Optional[float]  # 采样时设备的/proc/uptime
+    cpu: Optional[Tuple[float, List[float], Dict]]  # Cpu.get_cpu_usage的返回值
+    mem: Optional[Dict[str, int]]  # Meminfo.get_app_summary的返回值
+    fps: Optional[Tuple[float, float, int, int, float]]  # Fps.get_fps_surfaceView的返回值
+
+
+class PerformanceSampler(object):
+    METRICS: Final[Tuple[str, ...]] = ('cpu', 'mem', 'fps')
+    PID_RETRY_TICKS: Final[int] = 5  # 应用没有运行时, 每隔几次采样重新查找一次pid
+
+    def __init__(self, device: ADBDevice, package_name: Optional[str] = None, surfaceView_name: Optional[str] = None,
+                 metrics: Iterable[str] = METRICS):
+        """
+        在一次adb shell中获取所有指标的原始数据,再分别交给Cpu/Meminfo/Fps解析
+        各指标的数据来自同一时刻,每次采样只有一次adb往返
+
+        Examples:
+            sampler = PerformanceSampler(device, package_name=device.foreground_package)
+            while True:
+                sample = sampler.sample()
+                time.sleep(1)
+
+        Args:
+            device: 设备类
+            package_name: 需要监控的包名, 为None时只获取整机cpu
+            surfaceView_name: 计算fps的SurfaceView名, 为None时根据包名自动查找
+            metrics: 需要采样的指标, 可选cpu/mem/fps
+        """
+        self.metrics = tuple(metrics)
+        if unknown := set(self.metrics) - set(self.METRICS):
+            raise ValueError(f'unknown metrics: {unknown}, expected {self.METRICS}')
+
+        self.device = device
+        self.package_name = package_name
+        self.surfaceView_name = surfaceView_name
+        self._pid: Optional[int] = None
+        self._pid_retry = 0  # 距离下次查找pid还需要跳过的采样次数
+
+        self._cpu_watcher = Cpu(device)
+        self._mem_watcher = Meminfo(device)
+        self._fps_watcher = Fps(device)
+
+        if 'fps' in self.metrics:
+            if not self.surfaceView_name and self.package_name:
+                if layers := self._fps_watcher.get_possible_activity():
+                    surfaceViews = self._fps_watcher.check_activity_usable(layers)
+                    if surfaceViews and self.package_name in surfaceViews:
+                        self.surfaceView_name = surfaceViews
+                logger.debug(f'自动设置监控activity={self.surfaceView_name}')
+            self._fps_watcher.clear_surfaceFlinger_latency()
+
+    def __str__(self):
+        return f"<PerformanceSampler> device:{self.device.device_id} package:{self.package_name} " \
+               f"metrics:{','.join(self.metrics)}"
+
+    def sample(self) -> PerformanceSample:
+        """
+        采样一次
+
+        Returns:
+            PerformanceSample, 无法获取的指标为None; cpu需要两次采样才能计算,第一次为None
+        """
+        pid = self._get_pid()
+        sections: List[Tuple[str, str]] = [('uptime', 'cat /proc/uptime')]
+        if 'cpu' in self.metrics:
+            sections += self._cpu_sections(pid)
+        if 'mem' in self.metrics and pid:
+            sections.append(('mem', f'dumpsys meminfo {pid}'))
+        if 'fps' in self.metrics and self.surfaceView_name:
+            sections.append(('fps', f'dumpsys SurfaceFlinger --latency '
+                                    f'{self._fps_watcher._pares_activity_name(self.surfaceView_name)}'))
+
+        timestamp = time.time()
+        results = self.device.batch([cmd for _, cmd in sections])
+        ret: Dict[str, List[Tuple[str, int]]] = {}
+        for (key, _), result in zip(sections, results):
+            ret.setdefault(key, []).append(result)
+
+        return PerformanceSample(
+            timestamp=timestamp,
+            uptime=self._parse_uptime(ret['uptime'][0]),
+            cpu=self._parse_cpu(ret.get('cpu'), ret.get('cpu_pid'), pid),
+            mem=self._parse_mem(ret.get('mem')),
+            fps=self._parse_fps(ret.get('fps')),
+        )
+
+    def _get_pid(self) -> Optional[int]:
+        """ 包名对应的pid只在进程退出后重新查找, 应用没有运行时每PID_RETRY_TICKS次采样查找一次 """
+        if self._pid is None and self.package_name:
+            if self._pid_retry > 0:
+                self._pid_retry -= 1
+            elif pid := self.device.get_pid_by_name(self.package_name):
+                self._pid = pid[0][0]
+            else:
+                self._pid_retry = self.PID_RETRY_TICKS - 1
+        return self._pid
+
+    @staticmethod
+    def _cpu_sections(pid: Optional[int]) -> List[Tuple[str, str]]:
+        sections = [('cpu', 'cat /proc/stat')]
+        if pid:
+            sections.append(('cpu_pid', f'cat /proc/{pid}/stat'))
+        return sections
+
+    @staticmethod
+    def _parse_uptime(result: Tuple[str, int]) -> Optional[float]:
+        stdout, returncode = result
+        try:
+            return float(stdout.split()[0]) if not returncode else None
+        except (ValueError, IndexError):
+            return None
+
+    def _parse_cpu(self, stat: Optional[List[Tuple[str, int]]], app_ret: Optional[List[Tuple[str, int]]],
+                   pid: Optional[int]):
+        if not stat:
+            return None
+        pid_list = [pid] if app_ret else []
+        try:
+            total_cpu_stat, core_cpu_stat, app_cpu_stat = self._cpu_watcher.parse_cpu_stat(
+                stat[0], app_ret or [], pid_list)
+        except AdbBaseError as err:
+            logger.error(err)
+            return None
+
+        if pid_list and not app_cpu_stat.get(pid):
+            # 进程已经退出, 下次采样重新查找pid
+            self._pid = None
+        return self._cpu_watcher.calc_cpu_usage([self.package_name] if pid_list else None, pid_list,
+                                                total_cpu_stat, core_cpu_stat, app_cpu_stat)
+
+    def _parse_mem(self, ret: Optional[List[Tuple[str, int]]]) -> Optional[Dict[str, int]]:
+        if not ret:
+            return None
+        stdout, _ = ret[0]
+        if 'No process found for:' in stdout:
+            self._pid = None
+            return None
+        return self._mem_watcher.parse_app_summary(stdout)
+
+    def _parse_fps(self, ret: Optional[List[Tuple[str, int]]]):
+        if not ret:
+            return None
+        stdout, _ = ret[0]
+        # 只有刷新周期时说明SurfaceView已经失效
+        if len(stdout.splitlines()) <= 1:
+            return None
+        return self._fps_watcher.get_fps_surfaceView(self.surfaceView_name, stat=stdout)
+
+
+__all__ = ['PerformanceSampler', 'PerformanceSample']
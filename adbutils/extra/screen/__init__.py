@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+import time
+import threading
+
+import numpy as np
+from loguru import logger
+
+from adbutils import ADBDevice
+from adbutils.exceptions import AdbTimeout
+
+from typing import Optional, Callable, Tuple
+
+
+class ScreenStream(object):
+    RETRY_DELAY = 1  # 截图失败后的重试间隔
+
+    def __init__(self, device: ADBDevice, capture: Optional[Callable[[], np.ndarray]] = None,
+                 interval: float = 0):
+        """
+        在后台线程中连续截图,只保留最新的一帧,处理图像的同时进行下一次截图
+
+        Args:
+            device: 设备类
+            capture: 截图函数,默认为device.screenshot
+            interval: 两次截图开始时间的最小间隔(秒)
+        """
+        self.device = device
+        self.capture = capture or device.screenshot
+        self.interval = interval
+
+        self._cond = threading.Condition()
+        self._frame: Optional[np.ndarray] = None
+        self._timestamp = 0.0
+        self._seq = 0  # 已经截取的帧序号
+        self._read_seq = 0  # next()已经返回的帧序号
+        self._kill_event = threading.Event()
+        self._t: Optional[threading.Thread] = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def __str__(self):
+        return f"<ScreenStream ({self.running and 'Start' or 'Close'})> device:{self.device.device_id} " \
+               f"frames:{self._seq}"
+
+    @property
+    def running(self) -> bool:
+        return self._t is not None and self._t.is_alive()
+
+    @property
+    def seq(self) -> int:
+        """ 最新一帧的序号,从1开始,还没有截图时为0 """
+        return self._seq
+
+    def start(self) -> None:
+        """
+        启动截图线程
+
+        Returns:
+            None
+        """
+        if self.running:
+            return
+        self._kill_event.clear()
+        self._t = threading.Thread(target=self._run, name=f'screen_stream_{self.device.device_id}', daemon=True)
+        self._t.start()
+
+    def stop(self) -> None:
+        """
+        停止截图线程,等待正在进行的截图结束
+
+        Returns:
+            None
+        """
+        self._kill_event.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._t and self._t is not threading.current_thread():
+            self._t.join()
+        self._t = None
+
+    def latest(self) -> Tuple[Optional[np.ndarray], float]:
+        """
+        获取最新的一帧,不会等待
+
+        Returns:
+            (图像数据, 截图完成时间), 还没有截图时为(None, 0.0)
+        """
+        with self._cond:
+            return self._frame, self._timestamp
+
+    def next(self, timeout: Optional[float] = None) -> Tuple[np.ndarray, float]:
+        """
+        等待一帧还没有通过next()获取过的新图像, 中间错过的帧会被丢弃
+
+        Args:
+            timeout: 等待超时时间
+
+        Raises:
+            AdbTimeout: 等待超时,或者截图线程已经停止
+        Returns:
+            (图像数据, 截图完成时间)
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > self._read_seq or self._kill_event.is_set(), timeout):
+                raise AdbTimeout(f'{self} wait next frame timeout')
+            if self._seq <= self._read_seq:
+                raise AdbTimeout(f'{self} stopped')
+            self._read_seq = self._seq
+            return self._frame, self._timestamp
+
+    def _run(self) -> None:
+        while not self._kill_event.is_set():
+            start_time = time.time()
+            try:
+                frame = self.capture()
+            except Exception as err:
+                logger.error(f'{self} capture error: {err!r}')
+                self._kill_event.wait(self.RETRY_DELAY)
+                continue
+
+            with self._cond:
+                self._frame, self._timestamp = frame, time.time()
+                self._seq += 1
+                self._cond.notify_all()
+
+            if self.interval and (delay := self.interval - (time.time() - start_time)) > 0:
+                self._kill_event.wait(delay)
+
+
+__all__ = ['ScreenStream']
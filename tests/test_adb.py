@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+import io
+import shutil
+import struct
+import subprocess
+import time
+
+import numpy as np
+import pytest
+
+from adbutils import ADBDevice
+from adbutils.exceptions import AdbBaseError
+
+
+def create_device(sdk_version: int = 30, use_socket: bool = True, raw_shell=None) -> ADBDevice:
+    """ 不连接adb server, 只设置batch需要的属性 """
+    device = ADBDevice.__new__(ADBDevice)
+    device.use_socket = use_socket
+    setattr(device, '_props', {'ro.build.version.sdk': str(sdk_version)})
+    setattr(device, '_props_time', time.time())
+    if raw_shell:
+        device.raw_shell = raw_shell
+    return device
+
+
+def local_shell(cmds, decode=True, skip_error=False) -> bytes:
+    """ 用本地sh运行batch生成的脚本, 代替设备上的shell """
+    return subprocess.run(['sh', '-c', cmds[0]], stdout=subprocess.PIPE).stdout
+
+
+requires_sh = pytest.mark.skipif(shutil.which('sh') is None, reason='sh not found')
+
+
+@requires_sh
+def test_batch_split_results():
+    device = create_device(raw_shell=local_shell)
+    ret = device.batch(['echo hello', ['printf', "'a\\nb'"], 'exit 3', 'true'])
+    assert ret == [('hello\n', 0), ('a\nb', 0), ('', 3), ('', 0)]
+
+
+@requires_sh
+def test_batch_output_like_mark():
+    # 命令输出中出现固定前缀时不能被当作结束标记
+    device = create_device(raw_shell=local_shell)
+    cmd = f"printf '\\n{ADBDevice.BATCH_MARK} 0 0\\n'"
+    ret = device.batch([cmd, 'echo done'])
+    assert ret == [(f'\n{ADBDevice.BATCH_MARK} 0 0\n', 0), ('done\n', 0)]
+
+
+@requires_sh
+def test_batch_legacy_pty_newline():
+    def pty_shell(cmds, decode=True, skip_error=False):
+        return local_shell(cmds).replace(b'\n', b'\r\n')
+
+    device = create_device(sdk_version=23, use_socket=False, raw_shell=pty_shell)
+    assert device.batch(['echo a', 'echo b']) == [('a\n', 0), ('b\n', 0)]
+
+
+@requires_sh
+def test_batch_interrupted():
+    # shell在第二条命令中退出, 只能获取到第一条命令的结果
+    device = create_device(raw_shell=local_shell)
+    with pytest.raises(AdbBaseError):
+        device.batch(['echo a', 'kill -9 $$', 'echo c'])
+    assert device.batch(['echo a', 'kill -9 $$', 'echo c'], skip_error=True) == [('a\n', 0)]
+
+
+def test_batch_empty():
+    device = create_device(raw_shell=lambda *args, **kwargs: pytest.fail('raw_shell should not be called'))
+    assert device.batch([]) == []
+
+
+def test_parse_props():
+    ret = ('[ro.build.version.sdk]: [30]\n'
+           '[ro.product.model]: [Pixel 5]\r\n'
+           '[ro.empty]: []\n'
+           '[persist.sys.multiline]: [line1\n'
+           'line2]\n'
+           'garbage line\n')
+    props = ADBDevice.parse_props(ret)
+    assert props['ro.build.version.sdk'] == '30'
+    assert props['ro.product.model'] == 'Pixel 5'
+    assert props['ro.empty'] == ''
+    assert props['persist.sys.multiline'] == 'line1\nline2'
+    assert len(props) == 4
+
+
+def test_parse_props_empty():
+    assert ADBDevice.parse_props('') == {}
+
+
+def create_screencap(width: int, height: int, header_size: int = 16) -> bytes:
+    pixels = bytes((x * 4 + c) % 256 for x in range(width * height) for c in range(4))
+    header = struct.pack('<3I', width, height, 1) + b'\x00' * (header_size - 12)
+    return header + pixels
+
+
+@pytest.mark.parametrize('header_size', [12, 16])
+def test_parse_screencap(header_size):
+    raw = create_screencap(3, 2, header_size)
+    img = ADBDevice.parse_screencap(raw)
+    assert img.shape == (2, 3, 3)
+    # RGBA转为BGR
+    rgba = np.frombuffer(raw[header_size:], dtype=np.uint8).reshape(2, 3, 4)
+    assert (img == rgba[:, :, 2::-1]).all()
+
+
+def test_parse_screencap_rect():
+    raw = create_screencap(4, 4)
+    full = ADBDevice.parse_screencap(raw)
+    img = ADBDevice.parse_screencap(raw, (1, 1, 2, 3))
+    assert img.shape == (3, 2, 3)
+    assert (img == full[1:4, 1:3]).all()
+
+
+def test_parse_screencap_rect_error():
+    raw = create_screencap(4, 4)
+    with pytest.raises(OverflowError):
+        ADBDevice.parse_screencap(raw, (2, 2, 4, 4))
+    with pytest.raises(ValueError):
+        ADBDevice.parse_screencap(raw, (1, 1))
+
+
+def test_read_screencap():
+    raw = create_screencap(3, 2)
+    stream = io.BytesIO(raw)
+
+    def readinto(view: memoryview) -> int:
+        # 模拟socket每次只返回一部分数据
+        return stream.readinto(view[:5])
+
+    data = ADBDevice._read_screencap(readinto, ADBDevice.SCREENCAP_MAX_SIDE)
+    assert data.tobytes() == raw
+
+
+def test_read_screencap_invalid_header():
+    raw = b'/system/bin/sh: screencap: not found\n'
+
+    readinto = io.BytesIO(raw).readinto
+
+    with pytest.raises(AdbBaseError):
+        ADBDevice._read_screencap(readinto, ADBDevice.SCREENCAP_MAX_SIDE)
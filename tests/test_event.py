@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from adbutils.exceptions import AdbBaseError
+from adbutils.extra.event import (InputEvent, parse_event_line, save_events, load_events, EVENT_RECORD,
+                                  EV_ABS, EV_SYN, ABS_MT_TRACKING_ID, ABS_MT_POSITION_X, SYN_REPORT)
+
+
+EVENTS = [
+    InputEvent(86475.470302, '/dev/input/event2', EV_ABS, ABS_MT_TRACKING_ID, 993),
+    InputEvent(86475.470302, '/dev/input/event2', EV_ABS, ABS_MT_POSITION_X, 540),
+    InputEvent(86475.470302, '/dev/input/event2', EV_SYN, SYN_REPORT, 0),
+    InputEvent(86475.51, '/dev/input/event4', 0x0001, 0x0074, 1),
+    InputEvent(86475.52, '/dev/input/event2', EV_ABS, ABS_MT_TRACKING_ID, -1),
+]
+
+
+def test_parse_event_line():
+    event = parse_event_line(b'[   86475.470302] /dev/input/event2: 0003 0039 000003e1\n')
+    assert event == EVENTS[0]
+
+
+def test_parse_event_line_negative_value():
+    event = parse_event_line(b'[   86475.520000] /dev/input/event2: 0003 0039 ffffffff\r\n')
+    assert event.value == -1
+
+
+@pytest.mark.parametrize('line', [
+    b'add device 1: /dev/input/event2\n',
+    b'  name:     "touchscreen"\n',
+    b'could not get driver version for /dev/input/mice, Not a typewriter\n',
+    b'',
+])
+def test_parse_event_line_ignore(line):
+    assert parse_event_line(line) is None
+
+
+def test_save_load_events(tmp_path):
+    path = str(tmp_path / 'touch.evt')
+    assert save_events(EVENTS, path) == len(EVENTS)
+    assert load_events(path) == EVENTS
+
+
+def test_save_load_empty(tmp_path):
+    path = str(tmp_path / 'empty.evt')
+    assert save_events([], path) == 0
+    assert load_events(path) == []
+
+
+def test_load_events_truncated(tmp_path):
+    # 录制文件最后一条记录不完整时忽略
+    path = tmp_path / 'touch.evt'
+    save_events(EVENTS, str(path))
+    path.write_bytes(path.read_bytes()[:-(EVENT_RECORD.size // 2)])
+    assert load_events(str(path)) == EVENTS[:-1]
+
+
+def test_load_events_invalid(tmp_path):
+    path = tmp_path / 'touch.evt'
+    path.write_bytes(b'not an event record')
+    with pytest.raises(AdbBaseError):
+        load_events(str(path))
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from adbutils.extra.minitouch.exceptions import MinitouchServerConnectError
+from adbutils.extra.minitouch.gesture import Gesture
+
+
+class FakeMinitouch(object):
+    """ 坐标不做转换, 只记录命令 """
+    def __init__(self, max_contacts: int = 10):
+        self.max_contacts = max_contacts
+
+    @staticmethod
+    def down_cmd(point, contact=0, pressure=None):
+        return f'd {contact} {round(point[0])} {round(point[1])} {pressure or 50}\n'
+
+    @staticmethod
+    def move_cmd(point, contact=0, pressure=None):
+        return f'm {contact} {round(point[0])} {round(point[1])} {pressure or 50}\n'
+
+
+def test_build_empty():
+    assert Gesture().build(FakeMinitouch()) == ''
+
+
+def test_build_swipe():
+    cmds = Gesture.swipe((0, 0), (100, 0), duration=0.1, rate=20).build(FakeMinitouch())
+    assert cmds == ('d 0 0 0 50\nc\n'
+                    'w 50\nm 0 50 0 50\nc\n'
+                    'w 50\nm 0 100 0 50\nu 0\nc\n')
+
+
+def test_build_tap():
+    # 开始和结束时间相同的轨迹在下一帧抬起
+    cmds = Gesture(rate=10).add_path([(10, 20, 0)]).build(FakeMinitouch())
+    assert cmds == 'd 0 10 20 50\nc\nw 100\nm 0 10 20 50\nu 0\nc\n'
+
+
+def test_build_multi_contacts():
+    gesture = Gesture(rate=10)
+    gesture.add_path([(0, 0, 0), (0, 100, 0.2)])
+    gesture.add_path([(50, 0, 0.1), (50, 100, 0.2)], pressure=80)
+    cmds = gesture.build(FakeMinitouch())
+    assert cmds == ('d 0 0 0 50\nc\n'
+                    'w 100\nm 0 0 50 50\nd 1 50 0 80\nc\n'
+                    'w 100\nm 0 0 100 50\nu 0\nm 1 50 100 80\nu 1\nc\n')
+
+
+def test_build_too_many_contacts():
+    gesture = Gesture.swipe((0, 0), (100, 0), fingers=3)
+    with pytest.raises(MinitouchServerConnectError):
+        gesture.build(FakeMinitouch(max_contacts=2))
+
+
+def test_add_path_error():
+    with pytest.raises(ValueError):
+        Gesture().add_path([])
+    with pytest.raises(ValueError):
+        Gesture().add_path([(0, 0, 0.2), (1, 1, 0.1)])
+
+
+def test_pinch_contacts():
+    gesture = Gesture.pinch((500, 500), 200, 100, duration=0.2)
+    assert gesture.duration == pytest.approx(0.2)
+    assert sorted(path.contact for path in gesture._paths) == [0, 1]
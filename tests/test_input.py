@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from adbutils._input import InputQueue, _Action
+from adbutils.exceptions import AdbShellError
+
+
+class FakeDevice(object):
+    """ 记录batch调用, 按results依次返回结果 """
+    device_id = 'fake'
+
+    def __init__(self, sdk_version: int = 30, results=None):
+        self.sdk_version = sdk_version
+        self.results = list(results or [])
+        self.calls = []
+        self.invalidated = []
+
+    def batch(self, cmds, skip_error=False):
+        self.calls.append(cmds)
+        ret = self.results.pop(0) if self.results else [('', 0)] * len(cmds)
+        if isinstance(ret, Exception):
+            raise ret
+        return ret
+
+    def invalidate_dumpsys(self, service=None):
+        self.invalidated.append('all')
+
+    def invalidate_input_dumpsys(self):
+        self.invalidated.append('input')
+
+
+def keyevent(*keycodes: str) -> _Action:
+    return _Action([f'input keyevent {keycode}' for keycode in keycodes], keycodes=list(keycodes))
+
+
+def tap(x: int, y: int) -> _Action:
+    return _Action([f'input tap {x} {y}'])
+
+
+def test_merge_keyevents():
+    queue = InputQueue(FakeDevice())
+    actions = [keyevent('HOME'), keyevent('BACK', 'MENU'), tap(1, 2), keyevent('ENTER')]
+    cmds, owners = queue._merge(actions)
+    assert cmds == ['input keyevent HOME BACK MENU', 'input tap 1 2', 'input keyevent ENTER']
+    assert owners == [actions[:2], [actions[2]], [actions[3]]]
+
+
+def test_merge_keyevents_old_sdk():
+    queue = InputQueue(FakeDevice(sdk_version=22))
+    actions = [keyevent('HOME'), keyevent('BACK', 'MENU')]
+    cmds, owners = queue._merge(actions)
+    assert cmds == ['input keyevent HOME', 'input keyevent BACK', 'input keyevent MENU']
+    assert owners == [[actions[0]], [actions[1]], [actions[1]]]
+
+
+def test_execute_success():
+    device = FakeDevice()
+    queue = InputQueue(device)
+    actions = [tap(1, 2), keyevent('HOME')]
+    queue._execute(actions)
+    assert all(action.future.result(timeout=0) is None for action in actions)
+    assert len(device.calls) == 1
+    assert device.invalidated == ['all']
+
+
+def test_execute_command_error():
+    device = FakeDevice(results=[[('', 0), ('Error: unknown command', 1)]])
+    queue = InputQueue(device)
+    actions = [tap(1, 2), tap(3, 4)]
+    queue._execute(actions)
+    assert actions[0].future.result(timeout=0) is None
+    with pytest.raises(AdbShellError):
+        actions[1].future.result(timeout=0)
+    assert device.invalidated == ['input']
+
+
+def test_execute_merged_keyevent_error():
+    # 合并的keyevent失败时, 所有参与合并的操作都失败
+    device = FakeDevice(results=[[('Error', 1)]])
+    queue = InputQueue(device)
+    actions = [keyevent('HOME'), keyevent('BACK')]
+    queue._execute(actions)
+    for action in actions:
+        with pytest.raises(AdbShellError):
+            action.future.result(timeout=0)
+
+
+def test_execute_interrupted_retry():
+    # 第二条命令中断了shell: 第一条成功, 第二条失败且不重试, 之后的操作重新运行
+    device = FakeDevice(results=[[('', 0)], [('', 0)]])
+    queue = InputQueue(device)
+    actions = [tap(1, 2), tap(3, 4), tap(5, 6)]
+    queue._execute(actions)
+    assert actions[0].future.result(timeout=0) is None
+    with pytest.raises(AdbShellError):
+        actions[1].future.result(timeout=0)
+    assert actions[2].future.result(timeout=0) is None
+    assert len(device.calls) == 2
+    assert len(device.calls[1]) == 1 and 'input tap 5 6' in device.calls[1][0]
+
+
+def test_execute_batch_exception():
+    # batch抛出异常时所有操作都失败, 不会重试也不会让后台线程退出
+    error = ConnectionResetError('device offline')
+    device = FakeDevice(results=[error])
+    queue = InputQueue(device)
+    actions = [tap(1, 2), keyevent('HOME')]
+    queue._execute(actions)
+    for action in actions:
+        assert action.future.exception(timeout=0) is error
+    assert len(device.calls) == 1
+    assert device.invalidated == ['all']
+
+
+def test_execute_merge_exception():
+    class BrokenDevice(FakeDevice):
+        @property
+        def sdk_version(self):
+            raise RuntimeError('getprop failed')
+
+        @sdk_version.setter
+        def sdk_version(self, value):
+            pass
+
+    queue = InputQueue(BrokenDevice())
+    actions = [keyevent('HOME')]
+    queue._execute(actions)
+    with pytest.raises(RuntimeError):
+        actions[0].future.result(timeout=0)
+
+
+def test_queue_keeps_running_after_error():
+    device = FakeDevice(results=[ConnectionResetError('device offline')])
+    queue = InputQueue(device)
+    try:
+        failed = queue._submit(tap(1, 2))
+        with pytest.raises(ConnectionResetError):
+            failed.result(timeout=5)
+        assert queue._submit(tap(3, 4)).result(timeout=5) is None
+        assert queue.flush(timeout=5)
+    finally:
+        queue.stop()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from adbutils.exceptions import AdbBaseError
+from adbutils.extra.minicap.recorder import MjpegReader, MAGIC, FRAME_HEADER, INDEX_ENTRY
+
+
+FRAMES = [(b'\xff\xd8frame0\xff\xd9', 1.0), (b'\xff\xd8frame-1\xff\xd9', 1.5), (b'\xff\xd8f2\xff\xd9', 2.25)]
+
+
+def write_record(path, frames=FRAMES, index_entries=None, tail=b''):
+    """ 按MjpegRecorder的格式写入数据文件和索引文件, index_entries为None时写入正确的索引 """
+    entries = []
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        offset = len(MAGIC)
+        for frame, timestamp in frames:
+            f.write(FRAME_HEADER.pack(len(frame), timestamp))
+            f.write(frame)
+            entries.append((offset, timestamp))
+            offset += FRAME_HEADER.size + len(frame)
+        f.write(tail)
+    with open(str(path) + '.idx', 'wb') as f:
+        for entry in (entries if index_entries is None else index_entries(entries)):
+            f.write(INDEX_ENTRY.pack(*entry))
+    return entries
+
+
+def read_all(path):
+    with MjpegReader(str(path)) as reader:
+        return list(reader), reader.timestamps
+
+
+def test_load_index(tmp_path):
+    path = tmp_path / 'record.mjpg'
+    write_record(path)
+    frames, timestamps = read_all(path)
+    assert frames == FRAMES
+    assert timestamps == [timestamp for _, timestamp in FRAMES]
+
+
+def test_load_index_missing(tmp_path):
+    path = tmp_path / 'record.mjpg'
+    write_record(path)
+    (tmp_path / 'record.mjpg.idx').unlink()
+    assert read_all(path)[0] == FRAMES
+
+
+def test_load_index_truncated(tmp_path):
+    # 录制中断: 索引少了最后一条, 并且最后一条不完整
+    path = tmp_path / 'record.mjpg'
+    write_record(path, index_entries=lambda entries: entries[:-1])
+    with open(str(path) + '.idx', 'ab') as f:
+        f.write(b'\x00' * (INDEX_ENTRY.size - 1))
+    assert read_all(path)[0] == FRAMES
+
+
+@pytest.mark.parametrize('corrupt', [
+    lambda entries: [(offset + 1, timestamp) for offset, timestamp in entries],  # 偏移量错误
+    lambda entries: [entries[0], (entries[1][0], 9.9), entries[2]],  # 时间戳与帧头不一致
+    lambda entries: [entries[0], entries[2], entries[1]],  # 顺序错误
+    lambda entries: entries + [(entries[-1][0] + 1000, 3.0)],  # 指向文件之外
+])
+def test_load_index_corrupted(tmp_path, corrupt):
+    path = tmp_path / 'record.mjpg'
+    write_record(path, index_entries=corrupt)
+    assert read_all(path)[0] == FRAMES
+
+
+def test_load_index_incomplete_frame(tmp_path):
+    # 数据文件最后一帧只写入了一部分
+    path = tmp_path / 'record.mjpg'
+    write_record(path, tail=FRAME_HEADER.pack(100, 3.0) + b'\xff\xd8')
+    frames, _ = read_all(path)
+    assert frames == FRAMES
+
+
+def test_find(tmp_path):
+    path = tmp_path / 'record.mjpg'
+    write_record(path)
+    with MjpegReader(str(path)) as reader:
+        assert reader.find(0.5) == 0
+        assert reader.find(1.5) == 1
+        assert reader.find(2.0) == 1
+        assert reader.find(10) == 2
+        assert reader.duration == pytest.approx(1.25)
+
+
+def test_invalid_file(tmp_path):
+    path = tmp_path / 'record.mjpg'
+    path.write_bytes(b'not a record')
+    with pytest.raises(AdbBaseError):
+        MjpegReader(str(path))
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from adbutils._tracker import DeviceTracker
+
+
+def test_parse():
+    payload = ('emulator-5554          device product:sdk_gphone_x86 model:Android_SDK device:generic_x86 '
+               'transport_id:1\n'
+               '1234567890abcdef       unauthorized usb:1-1 transport_id:2\n'
+               '192.168.1.2:5555       offline\n')
+    devices = DeviceTracker._parse(payload)
+    assert devices == {
+        'emulator-5554': {'state': 'device', 'product': 'sdk_gphone_x86', 'model': 'Android_SDK',
+                          'device': 'generic_x86', 'transport_id': '1'},
+        '1234567890abcdef': {'state': 'unauthorized', 'usb': '1-1', 'transport_id': '2'},
+        '192.168.1.2:5555': {'state': 'offline'},
+    }
+
+
+def test_parse_multi_word_state():
+    # 状态可能由多个单词组成, 例如'no permissions'
+    payload = '1234567890abcdef       no permissions (user in plugdev group) usb:1-2 transport_id:3\n'
+    device = DeviceTracker._parse(payload)['1234567890abcdef']
+    assert device['state'] == 'no permissions (user in plugdev group)'
+    assert device['usb'] == '1-2'
+
+
+def test_parse_ignore_invalid_lines():
+    assert DeviceTracker._parse('') == {}
+    assert DeviceTracker._parse('\n\nemulator-5554\n') == {}